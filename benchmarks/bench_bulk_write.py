@@ -0,0 +1,102 @@
+"""
+Rows/sec for the ingest write path: the old per-row get-or-create helpers
+versus etl.bulk.BulkWriter, on a throwaway SQLite file.
+
+    python benchmarks/bench_bulk_write.py --games 300 --players 40
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from statline.models import Base, Team, Player, Game, PlayerGameStat
+from statline.etl.bulk import BulkWriter, ensure_league
+from statline.etl.records import GameRecord, PlayerLine, TeamRecord
+
+
+def synth_games(n_games: int, players_per_game: int, seed: int = 7) -> list[GameRecord]:
+    rng = random.Random(seed)
+    teams = [TeamRecord(str(100 + i), f"Team {i}") for i in range(30)]
+    roster = {t.ext_id: [f"{t.ext_id}-{j}" for j in range(players_per_game)] for t in teams}
+    start = datetime(2025, 3, 27)
+    games = []
+    for g in range(n_games):
+        home, away = rng.sample(teams, 2)
+        rec = GameRecord(str(700000 + g), 2025, start + timedelta(hours=3 * g), "Final", home, away)
+        for team in (home, away):
+            for p in roster[team.ext_id][: players_per_game // 2]:
+                rec.lines.append(PlayerLine(p, "First", "Last", team_ext=team.ext_id, stats={"pts": float(rng.randint(0, 4))}))
+        games.append(rec)
+    return games
+
+
+def legacy_write(s: Session, league_id: int, games: list[GameRecord]) -> None:
+    """The pre-bulk path: one SELECT per entity, flush per new object, commit per game."""
+    def get_or_create(model, **key):
+        obj = s.query(model).filter_by(league_id=league_id, **{k: v for k, v in key.items() if k in ("ext_id",)}).one_or_none()
+        return obj
+
+    for rec in games:
+        ids = {}
+        for t in (rec.home, rec.away):
+            team = get_or_create(Team, ext_id=t.ext_id)
+            if not team:
+                team = Team(league_id=league_id, ext_id=t.ext_id, name=t.name, abbreviation=None)
+                s.add(team); s.flush()
+            ids[t.ext_id] = team.id
+        game = get_or_create(Game, ext_id=rec.ext_id)
+        if not game:
+            game = Game(league_id=league_id, ext_id=rec.ext_id, season=rec.season, date=rec.date,
+                        home_team_id=ids[rec.home.ext_id], visitor_team_id=ids[rec.away.ext_id], status=rec.status)
+            s.add(game); s.flush()
+        for line in rec.lines:
+            player = get_or_create(Player, ext_id=line.ext_id)
+            if not player:
+                player = Player(league_id=league_id, ext_id=line.ext_id, first_name=line.first_name,
+                                last_name=line.last_name, position=None, team_id=ids[line.team_ext])
+                s.add(player); s.flush()
+            exists = s.query(PlayerGameStat).filter_by(league_id=league_id, game_id=game.id, player_id=player.id).one_or_none()
+            if not exists:
+                s.add(PlayerGameStat(league_id=league_id, game_id=game.id, player_id=player.id, pts=line.stats.get("pts")))
+        s.commit()
+
+
+def bulk_write(s: Session, league_id: int, games: list[GameRecord]) -> None:
+    with BulkWriter(s, league_id, update_features=False) as writer:
+        for rec in games:
+            writer.write_game(rec)
+
+
+def run(label: str, write, games: list[GameRecord]) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.sqlite3')}")
+        Base.metadata.create_all(engine)
+        with Session(engine) as s:
+            league = ensure_league(s, "MLB", "Major League Baseball")
+            rows = sum(len(g.lines) for g in games)
+            t0 = time.perf_counter()
+            write(s, league.id, games)
+            elapsed = time.perf_counter() - t0
+        engine.dispose()
+    rate = rows / elapsed
+    print(f"{label:<8} {rows} rows in {elapsed:.2f}s  ->  {rate:,.0f} rows/sec")
+    return rate
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--games", type=int, default=300)
+    ap.add_argument("--players", type=int, default=40, help="box-score lines per game")
+    args = ap.parse_args()
+    games = synth_games(args.games, args.players)
+    before = run("legacy", legacy_write, games)
+    after = run("bulk", bulk_write, games)
+    print(f"speedup  {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Offline end-to-end ingest throughput: backfill_mlb, backfill_nhl and backfill_nba run
+against a local stand-in server (providers.transport) into a fresh SQLite file, and
+report games/sec, provider requests per game and time spent in the DB writer.
+
+Fixtures are synthetic by default (--games per league); pass --archive to replay a
+directory recorded from the live APIs with HTTP_RECORD_DIR, together with the
+seasons it covers. Rate limiting is lifted unless --rate is given, so the numbers
+measure fetch concurrency and the write path rather than API quotas.
+
+    python benchmarks/bench_ingest.py --games 400 --workers 8 --latency 0.03
+    HTTP_RECORD_DIR=fixtures statline ingest MLB --seasons 2024
+    python benchmarks/bench_ingest.py --archive fixtures --leagues mlb --mlb 2024 --out ingest.json
+
+The server runs on a thread of this process and shares its GIL; start
+`statline replay-server` separately and pass --server to keep it out of the numbers.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+from urllib.parse import urlencode
+
+MLB = "https://statsapi.mlb.com/api/v1"
+NHL = "https://statsapi.web.nhl.com/api/v1"
+NBA = "https://api.balldontlie.io/v1"
+TEAMS = 30
+ROSTER = 15       # players per team
+DRESSED = 12      # players per team with a line in each game
+START = datetime(2024, 4, 1, 23, tzinfo=timezone.utc)
+
+
+def synth_archive(archive, games: int, seed: int = 7) -> None:
+    """Schedules, boxscores and stat pages shaped like the three APIs' responses."""
+    rng = random.Random(seed)
+    roster = {t: [t * 1000 + j for j in range(ROSTER)] for t in range(1, TEAMS + 1)}
+    name = lambda pid: f"Player {pid}"
+    when = [(START + timedelta(hours=4 * i)).strftime("%Y-%m-%dT%H:%M:%SZ") for i in range(games)]
+    matchups = [rng.sample(range(1, TEAMS + 1), 2) for _ in range(games)]
+    final = {"abstractGameState": "Final", "detailedState": "Final"}
+
+    # MLB: schedule + boxscore (batting runs/rbi)
+    sched = [{"gamePk": 700000 + i, "gameDate": when[i], "season": "2024", "status": final,
+              "teams": {side: {"team": {"id": t, "name": f"MLB Team {t}"}} for side, t in zip(("home", "away"), matchups[i])}}
+             for i in range(games)]
+    archive.save_json(f"{MLB}/schedule?" + urlencode({"sportId": 1, "season": 2024}), {"dates": [{"games": sched}]})
+    for i, (home, away) in enumerate(matchups):
+        teams = {side: {"players": {
+            f"ID{p}": {"person": {"id": p, "fullName": name(p)},
+                       "stats": {"batting": {"runs": rng.randint(0, 2), "rbi": rng.randint(0, 2)}}}
+            for p in rng.sample(roster[t], DRESSED)}} for side, t in (("home", home), ("away", away))}
+        archive.save_json(f"{MLB}/game/{700000 + i}/boxscore", {"teams": teams})
+
+    # NHL: schedule + boxscore (skater goals/assists)
+    sched = [{**g, "gamePk": 2024020000 + i, "season": "20242025"} for i, g in enumerate(sched)]
+    archive.save_json(f"{NHL}/schedule?" + urlencode({"season": "20242025"}), {"dates": [{"games": sched}]})
+    for i, (home, away) in enumerate(matchups):
+        teams = {}
+        for side, t in (("home", home), ("away", away)):
+            skaters = rng.sample(roster[t], DRESSED)
+            teams[side] = {"team": {"id": t, "name": f"NHL Team {t}"}, "skaters": skaters, "players": {
+                f"ID{p}": {"person": {"id": p, "fullName": name(p)},
+                           "stats": {"skaterStats": {"goals": rng.randint(0, 1), "assists": rng.randint(0, 2)}}}
+                for p in skaters}}
+        archive.save_json(f"{NHL}/game/{2024020000 + i}/boxscore", {"teams": teams})
+
+    # NBA (balldontlie): paginated teams, players, games and per-game stats
+    def pages(endpoint: str, params: dict, items: list) -> None:
+        total = max(1, -(-len(items) // 100))
+        for page in range(1, total + 1):
+            url = f"{NBA}/{endpoint}?" + urlencode({**params, "page": page, "per_page": 100})
+            archive.save_json(url, {"data": items[(page - 1) * 100:page * 100], "meta": {"total_pages": total}})
+
+    nba_teams = [{"id": t, "full_name": f"NBA Team {t}", "abbreviation": f"T{t:02d}"} for t in roster]
+    players = {p: {"id": p, "first_name": "Player", "last_name": str(p), "position": "G"} for ps in roster.values() for p in ps}
+    pages("teams", {}, nba_teams)
+    pages("players", {}, list(players.values()))
+    nba_games = [{"id": 9000 + i, "season": 2024, "date": when[i], "status": "Final",
+                  "home_team": nba_teams[h - 1], "visitor_team": nba_teams[a - 1]} for i, (h, a) in enumerate(matchups)]
+    pages("games", {"seasons[]": 2024}, nba_games)
+    for g, (home, away) in zip(nba_games, matchups):
+        rows = [{"player": players[p], "min": str(rng.randint(5, 40)), "pts": rng.randint(0, 35),
+                 "reb": rng.randint(0, 12), "ast": rng.randint(0, 10), "fg3m": rng.randint(0, 5)}
+                for t in (home, away) for p in rng.sample(roster[t], DRESSED)]
+        pages("stats", {"game_ids[]": g["id"]}, rows)
+
+
+@contextmanager
+def write_timer() -> Iterator[dict[str, float]]:
+    """Wall time spent inside BulkWriter (game writes, commits, feature refresh), outermost calls only."""
+    from statline.etl.bulk import BulkWriter
+    totals = {"seconds": 0.0}
+    depth = [0]
+    originals = {name: getattr(BulkWriter, name) for name in ("write_game", "commit", "refresh_features")}
+
+    def timed(fn):
+        def wrapper(self, *args, **kwargs):
+            depth[0] += 1
+            started = time.perf_counter()
+            try:
+                return fn(self, *args, **kwargs)
+            finally:
+                depth[0] -= 1
+                if depth[0] == 0:
+                    totals["seconds"] += time.perf_counter() - started
+        return wrapper
+
+    for name, fn in originals.items():
+        setattr(BulkWriter, name, timed(fn))
+    try:
+        yield totals
+    finally:
+        for name, fn in originals.items():
+            setattr(BulkWriter, name, fn)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--leagues", default="mlb,nhl,nba")
+    ap.add_argument("--games", type=int, default=300, help="Synthetic games per league")
+    ap.add_argument("--archive", help="Replay this recorded fixture directory instead of synthetic data")
+    ap.add_argument("--mlb", nargs="*", type=int, default=[2024], help="MLB seasons in the archive")
+    ap.add_argument("--nhl", nargs="*", default=["20242025"], help="NHL seasons in the archive")
+    ap.add_argument("--nba", nargs="*", type=int, default=[2024], help="NBA seasons in the archive")
+    ap.add_argument("--workers", type=int, default=1, help="Fetch workers for MLB/NHL")
+    ap.add_argument("--async", dest="use_async", action="store_true", help="Use the asyncio MLB/NHL drivers")
+    ap.add_argument("--latency", type=float, default=0.0)
+    ap.add_argument("--jitter", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--error-status", type=int, default=503)
+    ap.add_argument("--rate", type=float, default=0.0, help="Per-host requests/sec (default: unpaced)")
+    ap.add_argument("--server", help="Use an already running stand-in server at this URL")
+    ap.add_argument("--out", help="Write JSON results here (default: stdout)")
+    args = ap.parse_args()
+    leagues = [x.strip().lower() for x in args.leagues.split(",") if x.strip()]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # statline settings read DATABASE_URL at import time
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'ingest.sqlite3')}"
+        from sqlalchemy import func, select
+        from statline.db import SessionLocal
+        from statline.etl.ingest import backfill_nba
+        from statline.etl.ingest_mlb import backfill_mlb
+        from statline.etl.ingest_nhl import backfill_nhl
+        from statline.models import Game, League
+        from statline.providers.http import set_transport
+        from statline.providers.ratelimit import HOST_RATES, LIMITER
+        from statline.providers.transport import FixtureArchive, Replay, StandInServer
+
+        archive = FixtureArchive(args.archive or os.path.join(tmp, "fixtures"))
+        if not args.archive:
+            synth_archive(archive, args.games)
+        server = None
+        if not args.server:
+            server = StandInServer(archive, latency=args.latency, jitter=args.jitter,
+                                   error_rate=args.error_rate, error_status=args.error_status).start()
+        set_transport(Replay(args.server or server.url))
+        rate = args.rate or 1e9
+        for host in HOST_RATES:
+            LIMITER.set_rate(host, rate, max_rate=rate)
+
+        def run(code: str):
+            if code == "mlb":
+                if args.use_async:
+                    from statline.etl.ingest_async import backfill_mlb_async
+                    return backfill_mlb_async(args.mlb)
+                return backfill_mlb(args.mlb, workers=args.workers)
+            if code == "nhl":
+                if args.use_async:
+                    from statline.etl.ingest_async import backfill_nhl_async
+                    return backfill_nhl_async(args.nhl)
+                return backfill_nhl(args.nhl, workers=args.workers)
+            return backfill_nba(args.nba)
+
+        results = []
+        try:
+            for code in leagues:
+                requests_before = sum(b["requests"] for b in LIMITER.stats().values())
+                served_before = server.stats() if server else None
+                started = time.perf_counter()
+                with write_timer() as writes:
+                    run(code)
+                elapsed = time.perf_counter() - started
+                with SessionLocal() as s:
+                    games = s.scalar(select(func.count(Game.id)).join(League).where(League.code == code.upper()))
+                requests = sum(b["requests"] for b in LIMITER.stats().values()) - requests_before
+                row = {
+                    "league": code, "games": games, "seconds": round(elapsed, 4),
+                    "games_per_sec": round(games / elapsed, 2) if elapsed > 0 else None,
+                    "requests": requests, "requests_per_game": round(requests / games, 3) if games else None,
+                    "db_write_s": round(writes["seconds"], 4),
+                }
+                if server:
+                    row["server"] = {k: v - served_before[k] for k, v in server.stats().items()}
+                results.append(row)
+                print(f"{code}: {games} games in {elapsed:.2f}s ({row['games_per_sec']} games/sec), "
+                      f"{row['requests_per_game']} requests/game, DB writes {writes['seconds']:.2f}s", file=sys.stderr)
+        finally:
+            set_transport(None)
+            if server:
+                server.stop()
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out",)},
+        "results": results,
+    }
+    text = json.dumps(report, indent=1)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Timing and peak-memory suite for the read-side engines, on synthetic leagues of
+several sizes (benchmarks/synth.py). Results are written as JSON so runs can be
+compared across releases; --compare exits 1 when a case got slower than the
+baseline by more than --tolerance.
+
+    python benchmarks/bench_suite.py --sizes tiny,small --out bench.json
+    python benchmarks/bench_suite.py --sizes small --compare bench.json
+
+Each case is timed `--repeat` times (min and median reported), then run once more
+under tracemalloc for peak Python-heap memory (NumPy buffers included; SQLite's own
+page cache is not). Setup such as loading the prop lines a case consumes is not
+timed. New engines join the suite with the @case decorator.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Callable
+from sqlalchemy import Engine
+from statline.db import make_engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from synth import SIZES, build_database  # noqa: E402
+
+SUITE_VERSION = 1
+LOOKUPS = 2000  # prop lines screened by the feature_lookup case
+
+
+@dataclass
+class Context:
+    size: str
+    path: str          # the size's populated database
+    workdir: str       # scratch space for cases that create files
+    engine: Engine     # "read" profile engine on `path`
+    league_id: int = 1
+
+
+# name -> setup(ctx) returning the timed callable, which returns the rows it produced
+CASES: dict[str, Callable[[Context], Callable[[], int]]] = {}
+
+
+def case(name: str):
+    def register(setup: Callable[[Context], Callable[[], int]]):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+@case("db_init")
+def _db_init(ctx: Context) -> Callable[[], int]:
+    from statline.models import Base
+    path = os.path.join(ctx.workdir, "init.sqlite3")
+
+    def run() -> int:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        eng = make_engine(f"sqlite:///{path}", "ingest")
+        Base.metadata.create_all(eng)
+        eng.dispose()
+        return len(Base.metadata.tables)
+    return run
+
+
+@case("last_n_avg_pts")
+def _last_n_avg_pts(ctx: Context) -> Callable[[], int]:
+    from statline.features.rolling import last_n_avg_pts
+    return lambda: len(last_n_avg_pts(10, bind=ctx.engine))
+
+
+@case("simple_over_under")
+def _simple_over_under(ctx: Context) -> Callable[[], int]:
+    from statline.backtest.core import simple_over_under
+    from statline.backtest.engine import load_lines
+    from statline.features.rolling import last_n_avg_pts
+    features = last_n_avg_pts(10, bind=ctx.engine)
+    lines = load_lines(ctx.league_id, ["points"], ctx.engine)[["player_id", "game_id", "line"]]
+    return lambda: len(simple_over_under(features, lines))
+
+
+@case("feature_engine")
+def _feature_engine(ctx: Context) -> Callable[[], int]:
+    from statline.features.engine import build_features, build_specs
+    specs = build_specs(["pts", "reb", "ast"])
+    return lambda: len(build_features(specs, ctx.league_id, bind=ctx.engine).keys)
+
+
+@case("backtest")
+def _backtest(ctx: Context) -> Callable[[], int]:
+    from statline.backtest.engine import run_backtest
+    return lambda: len(run_backtest(ctx.league_id, window=10, bind=ctx.engine).graded)
+
+
+@case("sweep")
+def _sweep(ctx: Context) -> Callable[[], int]:
+    import numpy as np
+    from statline.backtest.sweep import prepare, sweep
+    data = prepare(ctx.league_id, [3, 5, 10, 20], bind=ctx.engine)
+    return lambda: len(sweep(data, np.arange(0.0, 3.01, 0.25), workers=1))
+
+
+@case("feature_lookup")
+def _feature_lookup(ctx: Context) -> Callable[[], int]:
+    from sqlalchemy import select
+    from sqlalchemy.orm import Session
+    from statline.db import read_only_engine
+    from statline.features.lookup import FeatureLookup
+    from statline.features.materialized import rebuild_rolling_features
+    from statline.models import PropLine
+    with Session(ctx.engine) as s:
+        rebuild_rolling_features(s, ctx.league_id)
+        s.commit()
+    with ctx.engine.connect() as conn:
+        pairs = conn.execute(select(PropLine.player_id, PropLine.game_id).limit(LOOKUPS)).all()
+    ro = read_only_engine(f"sqlite:///{ctx.path}")
+
+    def run() -> int:
+        # screening one line at a time through a cold cache, then the same lines again warm
+        lookup = FeatureLookup(ro)
+        for _ in range(2):
+            for player_id, game_id in pairs:
+                lookup.get("NBA", player_id, game_id)
+        return 2 * len(pairs)
+    return run
+
+
+def measure(run: Callable[[], int], repeat: int) -> dict:
+    times = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = run()
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "rows": rows,
+        "seconds_min": round(min(times), 6),
+        "seconds_median": round(statistics.median(times), 6),
+        "peak_mb": round(peak / 2**20, 3),
+    }
+
+
+def run_suite(sizes: list[str], cases: list[str], repeat: int = 3, data_dir: str | None = None) -> dict:
+    """Build (or reuse, under `data_dir`) each size's database and measure `cases` on it."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        for name in sizes:
+            path = os.path.join(data_dir, f"bench_{name}.sqlite3")
+            if not os.path.exists(path):
+                print(f"building {name} ...", file=sys.stderr)
+                build_database(path, SIZES[name])
+            eng = make_engine(f"sqlite:///{path}", "read")
+            ctx = Context(name, path, tmp, eng)
+            try:
+                for case_name in cases:
+                    row = {"case": case_name, "size": name, **measure(CASES[case_name](ctx), repeat)}
+                    print(f"{name:<8} {case_name:<18} {row['rows']:>10,} rows  {row['seconds_min']:>9.3f}s  "
+                          f"{row['peak_mb']:>9.1f} MB", file=sys.stderr)
+                    results.append(row)
+            finally:
+                eng.dispose()
+    return {
+        "suite": SUITE_VERSION,
+        "statline": _package_version(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "repeat": repeat,
+        "sizes": {n: {"players": SIZES[n].players, "stat_rows": SIZES[n].stat_rows} for n in sizes},
+        "results": results,
+    }
+
+
+def regressions(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Cases whose best time grew by more than `tolerance` (0.25 = 25%) over the baseline."""
+    before = {(r["case"], r["size"]): r for r in baseline.get("results", [])}
+    out = []
+    for r in current["results"]:
+        old = before.get((r["case"], r["size"]))
+        if old and r["seconds_min"] > old["seconds_min"] * (1 + tolerance):
+            out.append(f"{r['case']}@{r['size']}: {old['seconds_min']:.3f}s -> {r['seconds_min']:.3f}s")
+    return out
+
+
+def _package_version() -> str | None:
+    try:
+        return version("statline-core")
+    except PackageNotFoundError:
+        return None
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).resolve().parent, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="tiny,small", help=f"Comma-separated presets from {sorted(SIZES)}")
+    ap.add_argument("--cases", help=f"Comma-separated subset of {sorted(CASES)} (default: all)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--data-dir", help="Keep and reuse the generated databases here")
+    ap.add_argument("--out", help="Write the JSON results here (default: stdout)")
+    ap.add_argument("--compare", help="Baseline JSON from an earlier run")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs the baseline (0.25 = 25%%)")
+    args = ap.parse_args()
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    cases = [c.strip() for c in args.cases.split(",")] if args.cases else list(CASES)
+    unknown = [s for s in sizes if s not in SIZES] + [c for c in cases if c not in CASES]
+    if unknown:
+        ap.error(f"unknown sizes/cases: {unknown}")
+    report = run_suite(sizes, cases, max(1, args.repeat), args.data_dir)
+    text = json.dumps(report, indent=1)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        slower = regressions(report, json.loads(Path(args.compare).read_text()), args.tolerance)
+        for line in slower:
+            print(f"⚠️ Regression: {line}", file=sys.stderr)
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
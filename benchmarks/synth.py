@@ -0,0 +1,172 @@
+"""
+Synthetic leagues written straight into the statline schema, for benchmarks.
+
+Players get a stable per-stat mean (gamma distributed) and a team; each game draws
+an active roster from both teams and box-score values around those means, so rolling
+windows and prop lines behave like real data. Rows go in through raw executemany with
+journaling off, which keeps a few million rows to seconds.
+
+    python benchmarks/synth.py data/bench.sqlite3 --players 20000 --stat-rows 2000000
+"""
+from __future__ import annotations
+import argparse
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime
+import numpy as np
+from sqlalchemy import create_engine
+from statline.models import Base
+
+TEAMS = 30
+ACTIVE = 13                 # players per team per game
+GAMES_PER_SEASON = 1230
+MARKETS = {"points": "pts", "rebounds": "reb", "assists": "ast", "threes": "fg3m"}
+# per-player mean of each stat: gamma(shape, scale)
+STAT_MEANS = {"minutes": (6.0, 4.0), "pts": (2.0, 5.5), "reb": (2.0, 2.2), "ast": (1.5, 1.6),
+              "stl": (1.5, 0.5), "blk": (1.2, 0.4), "fg3m": (1.2, 1.0), "turnovers": (1.5, 0.9)}
+_CHUNK = 200_000
+START = datetime(2000, 10, 20, 19)
+
+
+@dataclass(frozen=True)
+class Size:
+    name: str
+    players: int
+    stat_rows: int
+    lines_per_game: int   # prop lines per game across markets
+
+    @property
+    def games(self) -> int:
+        return max(1, self.stat_rows // (2 * ACTIVE))
+
+
+SIZES = {
+    "tiny": Size("tiny", 600, 20_000, 8),
+    "small": Size("small", 5_000, 250_000, 20),
+    "medium": Size("medium", 20_000, 1_000_000, 20),
+    "large": Size("large", 40_000, 3_000_000, 24),
+}
+
+
+def build_database(path: str, size: Size, seed: int = 7, league: str = "NBA") -> dict[str, int]:
+    """Create `path` with the models schema and fill it; returns row counts per table."""
+    if os.path.exists(path):
+        os.remove(path)
+    eng = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(eng)
+    eng.dispose()
+    rng = np.random.default_rng(seed)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        # secondary indexes are cheaper to build once at the end than to maintain per row
+        indexes = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL").fetchall()
+        for name, _ in indexes:
+            conn.execute(f'DROP INDEX "{name}"')
+        counts = _fill(conn, rng, size, league)
+        for _, sql in indexes:
+            conn.execute(sql)
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return counts
+
+
+def _fill(conn: sqlite3.Connection, rng: np.random.Generator, size: Size, league: str) -> dict[str, int]:
+    conn.execute("INSERT INTO leagues (id, code, name) VALUES (1, ?, ?)", (league, f"Synthetic {league}"))
+    conn.executemany(
+        "INSERT INTO teams (id, league_id, ext_id, name, abbreviation) VALUES (?, 1, ?, ?, ?)",
+        [(t + 1, f"T{t}", f"Team {t}", f"T{t:02d}") for t in range(TEAMS)],
+    )
+    player_team = rng.integers(0, TEAMS, size.players)
+    conn.executemany(
+        "INSERT INTO players (id, league_id, ext_id, first_name, last_name, position, team_id) VALUES (?, 1, ?, ?, ?, ?, ?)",
+        [(p + 1, f"P{p}", f"First{p % 997}", f"Last{p}", "GFC"[p % 3], int(player_team[p]) + 1) for p in range(size.players)],
+    )
+    # rosters padded to one (team x slot) array so active players are drawn for a whole chunk at once
+    roster_size = np.bincount(player_team, minlength=TEAMS)
+    if roster_size.min() < ACTIVE:
+        raise ValueError(f"Need at least {ACTIVE * TEAMS} players for {ACTIVE}-man rosters on {TEAMS} teams")
+    roster = np.zeros((TEAMS, roster_size.max()), dtype=np.int64)
+    for t in range(TEAMS):
+        roster[t, :roster_size[t]] = np.flatnonzero(player_team == t)
+    means = {st: rng.gamma(k, theta, size.players) for st, (k, theta) in STAT_MEANS.items()}
+
+    n_games = size.games
+    home = rng.integers(0, TEAMS, n_games)
+    away = (home + rng.integers(1, TEAMS, n_games)) % TEAMS
+    season = 2000 + np.arange(n_games) // GAMES_PER_SEASON
+    # ~7 games a day within a season, seasons a year apart
+    minutes = ((np.arange(n_games) % GAMES_PER_SEASON) / 7.0 + (season - 2000) * 365.0) * 1440.0
+    dates = np.datetime64(START, "us") + minutes.astype(np.int64).astype("timedelta64[m]")
+    conn.executemany(
+        "INSERT INTO games (id, league_id, ext_id, season, date, home_team_id, visitor_team_id, status) "
+        "VALUES (?, 1, ?, ?, ?, ?, ?, 'Final')",
+        zip(range(1, n_games + 1), (f"G{g}" for g in range(n_games)), season.tolist(), _sql_datetimes(dates),
+            (home + 1).tolist(), (away + 1).tolist()),
+    )
+    market_names = list(MARKETS)
+    market_means = np.stack([means[MARKETS[m]] for m in market_names])
+
+    stats = list(STAT_MEANS)
+    stat_rows = 0
+    line_rows = 0
+    for lo in range(0, n_games, _CHUNK // (2 * ACTIVE)):
+        hi = min(n_games, lo + _CHUNK // (2 * ACTIVE))
+        teams = np.stack([home[lo:hi], away[lo:hi]], axis=1).ravel()
+        keys = rng.random((len(teams), roster.shape[1]))
+        keys[np.arange(roster.shape[1]) >= roster_size[teams][:, None]] = np.inf
+        slots = np.argpartition(keys, ACTIVE - 1, axis=1)[:, :ACTIVE]
+        pid = roster[teams[:, None], slots].ravel()
+        gid = np.repeat(np.arange(lo, hi), 2 * ACTIVE)
+        values = {st: rng.poisson(means[st][pid]).astype(np.float64) for st in stats}
+        cols = ", ".join(stats)
+        conn.executemany(
+            f"INSERT INTO player_game_stats (league_id, game_id, player_id, {cols}) VALUES (1, ?, ?, {', '.join('?' * len(stats))})",
+            zip((gid + 1).tolist(), (pid + 1).tolist(), *(values[st].tolist() for st in stats)),
+        )
+        stat_rows += len(pid)
+
+        # prop lines on a random subset of each game's players, priced off the player's mean
+        n_lines = min(len(pid), (hi - lo) * size.lines_per_game)
+        pick = rng.choice(len(pid), n_lines, replace=False)
+        market = rng.integers(0, len(market_names), n_lines)
+        mean = market_means[market, pid[pick]]
+        line = np.maximum(np.round((mean + rng.normal(0.0, 1.0, n_lines)) * 2.0) / 2.0 + 0.5, 0.5)
+        fetched = dates[gid[pick]] - rng.integers(1, 30, n_lines).astype("timedelta64[h]")
+        conn.executemany(
+            "INSERT INTO prop_lines (league_id, player_id, game_id, market, line, source, fetched_at) "
+            "VALUES (1, ?, ?, ?, ?, 'synthetic', ?)",
+            zip((pid[pick] + 1).tolist(), (gid[pick] + 1).tolist(), (market_names[m] for m in market.tolist()),
+                line.tolist(), _sql_datetimes(fetched)),
+        )
+        line_rows += n_lines
+    return {"players": size.players, "games": n_games, "player_game_stats": stat_rows, "prop_lines": line_rows}
+
+
+def _sql_datetimes(values: np.ndarray) -> list[str]:
+    # the "YYYY-MM-DD HH:MM:SS.ffffff" text SQLAlchemy's SQLite DateTime writes
+    return np.char.replace(np.datetime_as_string(values, unit="us"), "T", " ").tolist()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("path")
+    ap.add_argument("--size", choices=sorted(SIZES), default="small")
+    ap.add_argument("--players", type=int, help="Override the preset's player count")
+    ap.add_argument("--stat-rows", type=int, help="Override the preset's player_game_stats rows")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+    size = SIZES[args.size]
+    size = Size(size.name, args.players or size.players, args.stat_rows or size.stat_rows, size.lines_per_game)
+    started = time.perf_counter()
+    counts = build_database(args.path, size, args.seed)
+    print(", ".join(f"{k}={v:,}" for k, v in counts.items()) + f" in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
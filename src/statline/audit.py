@@ -0,0 +1,152 @@
+"""
+Query-plan audit behind `statline db audit`. HOT_QUERIES registers the statements
+the ETL, feature and backtest paths run most, built by the same helpers those
+modules execute; audit() runs SQLite's EXPLAIN QUERY PLAN over each and flags
+
+    full scans      SCAN of a table the query is not meant to read in full
+    missing indexes indexes the query should seek on that the database lacks
+                    (a pending migration in statline.migrations builds them)
+
+Temp b-tree sorts are counted but not flagged: the rolling window queries order
+by games.date, which no index on player_game_stats can provide.
+
+Plans depend on the planner statistics, so audit a database that has been through
+`statline db optimize` (ANALYZE); parameter values do not change them.
+"""
+from __future__ import annotations
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable
+from sqlalchemy import Connection, Executable, inspect
+from .migrations import MIGRATIONS
+from .models import Base
+
+# representative parameters; EXPLAIN QUERY PLAN does not depend on their values
+LEAGUE_ID = 1
+PLAYER_IDS = [1, 2, 3]
+EXT_IDS = ["1", "2", "3"]
+AS_OF = datetime(2025, 1, 1)
+_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    name: str
+    build: Callable[[], Executable]
+    uses: tuple[str, ...] = ()   # indexes the plan should seek on
+    scans: tuple[str, ...] = ()  # tables it reads in full by design
+
+
+HOT_QUERIES: list[HotQuery] = []
+
+
+def hot_query(name: str, uses: tuple[str, ...] = (), scans: tuple[str, ...] = ()):
+    def register(build: Callable[[], Executable]) -> Callable[[], Executable]:
+        HOT_QUERIES.append(HotQuery(name, build, uses, scans))
+        return build
+    return register
+
+
+@dataclass
+class QueryPlan:
+    name: str
+    plan: list[str]
+    scans: list[str] = field(default_factory=list)    # tables scanned in full unexpectedly
+    missing: list[str] = field(default_factory=list)  # `uses` indexes the database lacks
+    sorts: int = 0                                      # USE TEMP B-TREE steps
+
+    @property
+    def flagged(self) -> bool:
+        return bool(self.scans or self.missing)
+
+
+def explain(conn: Connection, stmt: Executable) -> list[str]:
+    """EXPLAIN QUERY PLAN detail lines of a statement, expanding IN lists as executed."""
+    if conn.dialect.name != "sqlite":
+        raise ValueError(f"EXPLAIN QUERY PLAN needs SQLite, not {conn.dialect.name}")
+    compiled = stmt.compile(dialect=conn.dialect)
+    state = compiled.construct_expanded_state(compiled.construct_params(escape_names=False))
+    args = tuple(state.parameters[k] for k in state.positiontup)
+    return [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + state.statement, args)]
+
+
+def audit(conn: Connection, queries: list[HotQuery] | None = None) -> list[QueryPlan]:
+    tables = set(Base.metadata.tables)
+    insp = inspect(conn)
+    indexes = {ix["name"] for t in tables if insp.has_table(t) for ix in insp.get_indexes(t)}
+    out = []
+    for q in queries if queries is not None else HOT_QUERIES:
+        plan = explain(conn, q.build())
+        scanned = [m.group(1) for line in plan if (m := _SCAN.match(line))]
+        out.append(QueryPlan(
+            q.name, plan,
+            scans=[t for t in dict.fromkeys(scanned) if t in tables and t not in q.scans],
+            missing=[ix for ix in q.uses if ix not in indexes],
+            sorts=sum("USE TEMP B-TREE" in line for line in plan),
+        ))
+    return out
+
+
+def providing_migrations(plans: list[QueryPlan]) -> dict[str, int]:
+    """Missing index -> version of the migration that builds it."""
+    versions = {name: m.version for m in MIGRATIONS for name in m.create}
+    return {ix: versions[ix] for p in plans for ix in p.missing if ix in versions}
+
+
+# ---- registry --------------------------------------------------------------------
+
+@hot_query("etl.bulk.id_map")
+def _players_by_ext_id():
+    from .etl.bulk import _id_map_stmt
+    from .models import Player
+    return _id_map_stmt(Player, LEAGUE_ID)
+
+
+@hot_query("etl.bulk.game_states", uses=("ix_games_league_ext_status",))
+def _game_states():
+    from .etl.bulk import _game_states_stmt
+    return _game_states_stmt(LEAGUE_ID)
+
+
+@hot_query("etl.incremental.stored_statuses", uses=("ix_games_league_ext_status",))
+def _stored_statuses():
+    from .etl.incremental import _statuses_stmt
+    return _statuses_stmt(LEAGUE_ID, EXT_IDS)
+
+
+@hot_query("features.rolling.rolling_sql", scans=("games", "player_game_stats"))
+def _rolling():
+    from .features.rolling import rolling_stmt
+    return rolling_stmt("pts", 10, league_id=LEAGUE_ID)
+
+
+@hot_query("features.materialized.load_rolling_features",
+           uses=("ix_rolling_league_stat_window_player_date", "ix_stats_player_game"))
+def _materialized():
+    from .features.materialized import _features_stmt
+    return _features_stmt(LEAGUE_ID, "pts", 10)
+
+
+@hot_query("features.materialized.load_history", uses=("ix_stats_player_game",))
+def _history():
+    from .features.materialized import _history_stmt
+    return _history_stmt(PLAYER_IDS, ["pts"])
+
+
+@hot_query("features.lookup.latest", uses=("ix_rolling_league_stat_window_player_date",))
+def _latest():
+    from .features.lookup import _LATEST
+    return _LATEST.params(league_id=LEAGUE_ID, stat="pts", window=10, player_ids=PLAYER_IDS)
+
+
+@hot_query("features.lookup.latest_before", uses=("ix_rolling_league_stat_window_player_date",))
+def _latest_before():
+    from .features.lookup import _LATEST_BEFORE
+    return _LATEST_BEFORE.params(league_id=LEAGUE_ID, stat="pts", window=10, player_ids=PLAYER_IDS, before=AS_OF)
+
+
+@hot_query("backtest.engine.load_lines", scans=("prop_lines",))
+def _lines():
+    from .backtest.engine import lines_stmt
+    return lines_stmt(LEAGUE_ID, ["points"])
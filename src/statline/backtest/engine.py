@@ -0,0 +1,213 @@
+from __future__ import annotations
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Sequence
+import numpy as np
+import pandas as pd
+from sqlalchemy import Connection, Engine, Select, String, select, type_coerce
+from ..db import get_engine
+from ..defaults import DEFAULT_PRICE
+from ..etl.records import STAT_COLUMNS
+from ..features.rolling import rolling_sql
+from ..models import Game, PropLine
+
+# prop_lines.market -> player_game_stats column; bare column names are accepted as-is
+MARKET_STATS = {
+    "points": "pts", "rebounds": "reb", "assists": "ast", "steals": "stl", "blocks": "blk",
+    "threes": "fg3m", "turnovers": "turnovers", "minutes": "minutes",
+}
+# A game's stats (and the rolling feature that includes them) are treated as known
+# this long after its start time.
+FEATURE_DELAY = timedelta(hours=6)
+CALIBRATION_BINS = 5
+
+
+@dataclass
+class BacktestResult:
+    graded: pd.DataFrame       # one row per line: feature, edge, pick, actual, outcome, profit
+    summary: pd.DataFrame      # per market: lines, bets, wins, losses, pushes, hit_rate, roi, units
+    calibration: pd.DataFrame  # per market and |edge| quantile bin: bets, mean |edge|, hit_rate
+
+
+def market_stat(market: str) -> str | None:
+    m = market.strip().lower()
+    stat = MARKET_STATS.get(m, m)
+    return stat if stat in STAT_COLUMNS else None
+
+
+def payout(price: float) -> float:
+    """Profit per unit staked at American odds."""
+    return 100.0 / -price if price < 0 else price / 100.0
+
+
+def load_lines(
+    league_id: int | None = None,
+    markets: Sequence[str] | None = None,
+    bind: Engine | Connection | None = None,
+) -> pd.DataFrame:
+    """prop_lines joined to their game's start time, with typed columns and a `stat` column."""
+    bind = bind if bind is not None else get_engine()
+    with bind.connect() if isinstance(bind, Engine) else nullcontext(bind) as conn:
+        rows = conn.execute(lines_stmt(league_id, markets)).all()
+    cols = list(zip(*rows)) if rows else [()] * 7
+    lines = pd.DataFrame({
+        "line_id": np.array(cols[0], dtype=np.int64),
+        "player_id": np.array(cols[1], dtype=np.int64),
+        "game_id": np.array(cols[2], dtype=np.int64),
+        "market": pd.Categorical(cols[3]),
+        "line": np.array(cols[4], dtype=np.float64),
+        "fetched_at": pd.to_datetime(pd.Series(cols[5], dtype=object), format="ISO8601"),
+        "game_date": pd.to_datetime(pd.Series(cols[6], dtype=object), format="ISO8601"),
+    })
+    lines["stat"] = lines["market"].astype(str).map(market_stat)
+    return lines
+
+
+def lines_stmt(league_id: int | None = None, markets: Sequence[str] | None = None) -> Select:
+    q = select(
+        PropLine.id, PropLine.player_id, PropLine.game_id, PropLine.market, PropLine.line,
+        type_coerce(PropLine.fetched_at, String), type_coerce(Game.date, String),
+    ).join(Game, Game.id == PropLine.game_id)
+    if league_id is not None:
+        q = q.where(PropLine.league_id == league_id)
+    if markets:
+        q = q.where(PropLine.market.in_(list(markets)))
+    return q
+
+
+def run_backtest(
+    league_id: int | None = None,
+    window: int = 10,
+    threshold: float = 0.0,
+    price: float = DEFAULT_PRICE,
+    markets: Sequence[str] | None = None,
+    bind: Engine | Connection | None = None,
+) -> BacktestResult:
+    """
+    Backtest every stored prop line against a trailing-mean feature: one SQL window query
+    per market stat (features.rolling) supplies both the features and the actual results,
+    then grade() does the rest vectorized.
+    """
+    lines = load_lines(league_id, markets, bind)
+    unknown = lines["stat"].isna()
+    if unknown.any():
+        print(f"⚠️ Skipping {int(unknown.sum())} lines with unmapped markets: {sorted(lines.loc[unknown, 'market'].astype(str).unique())}")
+        lines = lines[~unknown]
+    parts = []
+    for stat, group in lines.groupby("stat", sort=True):
+        feats = rolling_sql(stat, window, league_id=league_id, bind=bind)
+        parts.append(grade(group, feats.rename(columns={stat: "value", f"rolling_{stat}_avg": "feature"}), threshold, price))
+    graded = pd.concat(parts, ignore_index=True) if parts else grade(lines, _empty_features(), threshold, price)
+    return BacktestResult(graded, summarize(graded), calibration(graded))
+
+
+def grade(
+    lines: pd.DataFrame,
+    features: pd.DataFrame,
+    threshold: float = 0.0,
+    price: float = DEFAULT_PRICE,
+    delay: timedelta = FEATURE_DELAY,
+) -> pd.DataFrame:
+    """
+    Point-in-time grading of `lines` (line_id, player_id, game_id, market, line,
+    fetched_at, game_date) against `features` (player_id, game_id, date, value, feature),
+    where `value` is the stat a player actually recorded and `feature` its trailing mean
+    through that game. Picks, outcomes and profit are whole-column operations.
+    """
+    g = attach_features(lines, features, ["feature"], delay)
+    edge, pick, win, loss, push = grade_arrays(
+        g["feature"].to_numpy(), g["line"].to_numpy(), g["actual"].to_numpy(), threshold,
+    )
+    g["edge"] = edge
+    g["pick"] = pick
+    g["bet"] = win | loss | push
+    g["win"] = win
+    g["loss"] = loss
+    g["push"] = push
+    g["profit"] = np.where(win, payout(price), np.where(loss, -1.0, 0.0))
+    return g.sort_values("line_id", kind="stable").reset_index(drop=True)
+
+
+def attach_features(
+    lines: pd.DataFrame,
+    features: pd.DataFrame,
+    columns: Sequence[str],
+    delay: timedelta = FEATURE_DELAY,
+) -> pd.DataFrame:
+    """
+    Give each line the `columns` of the latest feature row known strictly before
+    min(fetched_at, tip-off), a row being known `delay` after its game started
+    (merge_asof per player), so a line never sees its own game or one still in
+    progress; plus `actual`, the stat value recorded in the line's own game.
+    """
+    # merge_asof needs both keys in one datetime unit
+    cutoff = np.minimum(lines["fetched_at"].to_numpy("datetime64[ns]"), lines["game_date"].to_numpy("datetime64[ns]"))
+    lines = lines.assign(cutoff=cutoff)
+    cols = list(columns)
+    known = features.loc[features[cols].notna().any(axis=1), ["player_id", "date", *cols]]
+    known = known.assign(available_at=(known["date"] + delay).to_numpy("datetime64[ns]"))
+    known = known.sort_values("available_at", kind="stable")
+    asof = pd.merge_asof(
+        lines.sort_values("cutoff", kind="stable"),
+        known[["player_id", "available_at", *cols]],
+        left_on="cutoff", right_on="available_at", by="player_id",
+        allow_exact_matches=False, direction="backward",
+    )
+    actual = features[["player_id", "game_id", "value"]].rename(columns={"value": "actual"})
+    return asof.merge(actual, on=["player_id", "game_id"], how="left", validate="many_to_one")
+
+
+def grade_arrays(
+    feature: np.ndarray, line: np.ndarray, actual: np.ndarray, threshold: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """edge, pick (+1 over / -1 under / 0 pass), win, loss, push for aligned arrays."""
+    edge = feature - line
+    with np.errstate(invalid="ignore"):
+        pick = np.where(edge > threshold, 1, np.where(edge < -threshold, -1, 0)).astype(np.int8)
+        diff = actual - line
+    graded = ~np.isnan(diff) & (pick != 0)
+    result = np.sign(np.nan_to_num(diff)) * pick
+    return edge, pick, graded & (result > 0), graded & (result < 0), graded & (result == 0)
+
+
+def summarize(graded: pd.DataFrame) -> pd.DataFrame:
+    """Hit rate (pushes excluded) and ROI per unit staked, per market."""
+    by = graded.groupby(graded["market"].astype(str), observed=True)
+    out = pd.DataFrame({
+        "lines": by.size(),
+        "bets": by["bet"].sum(),
+        "wins": by["win"].sum(),
+        "losses": by["loss"].sum(),
+        "pushes": by["push"].sum(),
+        "units": by["profit"].sum(),
+    })
+    decided = out["wins"] + out["losses"]
+    out["hit_rate"] = out["wins"] / decided.where(decided > 0)
+    out["roi"] = out["units"] / out["bets"].where(out["bets"] > 0)
+    return out.reset_index(names="market")
+
+
+def calibration(graded: pd.DataFrame, bins: int = CALIBRATION_BINS) -> pd.DataFrame:
+    """Hit rate by |edge| quantile bin per market: bigger edges should win more often."""
+    bets = graded.loc[graded["bet"] & ~graded["push"], ["market", "edge", "win"]]
+    if bets.empty:
+        return pd.DataFrame(columns=["market", "bin", "bets", "mean_abs_edge", "hit_rate"])
+    bets = bets.assign(market=bets["market"].astype(str), abs_edge=bets["edge"].abs())
+    bets["bin"] = bets.groupby("market")["abs_edge"].transform(
+        lambda e: pd.qcut(e.rank(method="first"), min(bins, len(e)), labels=False)
+    ).astype(int)
+    by = bets.groupby(["market", "bin"])
+    return pd.DataFrame({
+        "bets": by.size(),
+        "mean_abs_edge": by["abs_edge"].mean(),
+        "hit_rate": by["win"].mean(),
+    }).reset_index()
+
+
+def _empty_features() -> pd.DataFrame:
+    return pd.DataFrame({
+        "player_id": pd.Series(dtype=np.int64), "game_id": pd.Series(dtype=np.int64),
+        "date": pd.Series(dtype="datetime64[ns]"), "value": pd.Series(dtype=np.float64),
+        "feature": pd.Series(dtype=np.float64),
+    })
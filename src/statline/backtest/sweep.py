@@ -0,0 +1,197 @@
+from __future__ import annotations
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Sequence
+import numpy as np
+import pandas as pd
+from sqlalchemy import Connection, Engine
+from ..features.engine import build_specs, compute_features, load_stats
+from .engine import DEFAULT_PRICE, attach_features, load_lines, payout
+
+RESULT_COLUMNS = ["window", "threshold", "market", "bets", "wins", "losses", "pushes", "units", "hit_rate", "roi"]
+COUNT_COLUMNS = ["bets", "wins", "losses", "pushes"]
+# smallest slice of lines worth shipping to another process
+MIN_BLOCK_LINES = 20_000
+
+
+@dataclass
+class SweepData:
+    """Per-line arrays every configuration is graded from."""
+
+    line: np.ndarray       # float64 (n,)
+    actual: np.ndarray     # float64 (n,), NaN when the player has no stat for the game
+    market: np.ndarray     # int16 (n,) index into `markets`
+    features: np.ndarray   # float32 (n, len(windows)) as-of trailing mean per window
+    markets: list[str]
+    windows: list[int]
+
+
+def prepare(
+    league_id: int | None,
+    windows: Sequence[int],
+    markets: Sequence[str] | None = None,
+    bind: Engine | Connection | None = None,
+) -> SweepData:
+    """
+    Load lines once and attach, per line, the as-of trailing mean for every window in a
+    single feature-engine pass per market stat (NULL stats dropped first, matching
+    features.rolling and backtest.engine.run_backtest).
+    """
+    windows = sorted(set(windows))
+    lines = load_lines(league_id, markets, bind)
+    lines = lines[lines["stat"].notna()]
+    names = sorted(lines["market"].astype(str).unique())
+    code = {m: i for i, m in enumerate(names)}
+    cols = [f"w{w}" for w in windows]
+    parts = []
+    for stat, group in lines.groupby("stat", sort=True):
+        df = load_stats([stat], league_id, bind=bind).dropna(subset=[stat]).reset_index(drop=True)
+        fm = compute_features(df, build_specs([stat], windows, ("mean",)))
+        feats = fm.keys.assign(value=df[stat].to_numpy(), **{c: fm.values[:, i] for i, c in enumerate(cols)})
+        parts.append(attach_features(group, feats, cols))
+    g = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["line", "actual", "market", *cols])
+    return SweepData(
+        line=g["line"].to_numpy(np.float64),
+        actual=g["actual"].to_numpy(np.float64),
+        market=g["market"].astype(str).map(code).to_numpy(np.int16),
+        features=np.ascontiguousarray(g[cols].to_numpy(np.float32)).reshape(len(g), len(cols)),
+        markets=names,
+        windows=windows,
+    )
+
+
+def sweep(
+    data: SweepData,
+    thresholds: Sequence[float],
+    price: float = DEFAULT_PRICE,
+    workers: int | None = None,
+    min_bets: int = 1,
+) -> pd.DataFrame:
+    """
+    Grade every (window, threshold) pair and return one row per configuration and market
+    plus an "ALL" row, ranked by overall ROI (configurations with fewer than `min_bets`
+    overall bets sink to the bottom).
+
+    A line's outcome does not depend on the threshold, only whether it is bet does
+    (|edge| > threshold), so a block of lines is one sort by |edge| plus suffix sums, and
+    every threshold is a binary search into them. The units of work are (window, block
+    of lines) pairs whose win/loss/push counts add up per configuration, so a handful of
+    windows still spreads over every core once there are enough lines (MIN_BLOCK_LINES
+    per block). With workers > 1 the arrays are copied once into shared memory and the
+    workers map them instead of receiving pickled data; only the grid and the small
+    count rows cross processes.
+    """
+    thresholds = np.asarray(sorted(set(float(t) for t in thresholds)), dtype=np.float64)
+    if len(thresholds) and thresholds[0] < 0:
+        raise ValueError("Thresholds must be >= 0")
+    n_windows, n_lines = len(data.windows), len(data.line)
+    workers = workers or os.cpu_count() or 1
+    blocks = 1 if workers <= 1 or not n_windows else max(1, min(-(-workers // n_windows), n_lines // MIN_BLOCK_LINES))
+    bounds = np.linspace(0, n_lines, blocks + 1).astype(np.int64)
+    tasks = [(wi, int(lo), int(hi), thresholds) for wi in range(n_windows) for lo, hi in zip(bounds[:-1], bounds[1:])]
+    workers = min(workers, len(tasks))
+    arrays = {"line": data.line, "actual": data.actual, "market": data.market, "features": data.features}
+    n_markets = len(data.markets)
+    if workers <= 1:
+        parts = [_evaluate(arrays, n_markets, task) for task in tasks]
+    else:
+        with SharedArrays(arrays) as shared:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared.spec, n_markets)) as pool:
+                parts = list(pool.map(_evaluate_task, tasks))
+    names = [*data.markets, "ALL"]
+    counts = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["wi", "threshold", "mi", *COUNT_COLUMNS])
+    if blocks > 1:
+        counts = counts.groupby(["wi", "threshold", "mi"], as_index=False, sort=False)[COUNT_COLUMNS].sum()
+    out = _rates(counts.astype({c: np.int64 for c in COUNT_COLUMNS}), payout(price))
+    out.insert(0, "window", np.asarray(data.windows, dtype=np.int64)[out["wi"].to_numpy(np.int64)])
+    out["market"] = [names[i] for i in out["mi"]]
+    overall = out[out["market"] == "ALL"].set_index(["wi", "threshold"])
+    score = overall["roi"].where(overall["bets"] >= min_bets, -np.inf).fillna(-np.inf)
+    rank = score.rank(ascending=False, method="first").rename("rank")
+    out = out.join(rank, on=["wi", "threshold"]).sort_values(["rank", "mi"], kind="stable")
+    return out[["rank", *RESULT_COLUMNS]].astype({"rank": np.int64}).reset_index(drop=True)
+
+
+class SharedArrays:
+    """Copies named NumPy arrays into SharedMemory blocks; `spec` lets other processes map them."""
+
+    def __init__(self, arrays: dict[str, np.ndarray]):
+        self.blocks: list[shared_memory.SharedMemory] = []
+        self.spec: dict[str, tuple[str, tuple[int, ...], str]] = {}
+        for name, arr in arrays.items():
+            shm = shared_memory.SharedMemory(create=True, size=max(1, arr.nbytes))
+            self.blocks.append(shm)
+            np.ndarray(arr.shape, arr.dtype, buffer=shm.buf)[...] = arr
+            self.spec[name] = (shm.name, arr.shape, arr.dtype.str)
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+
+
+_WORKER: dict = {}
+
+
+def _init_worker(spec: dict[str, tuple[str, tuple[int, ...], str]], n_markets: int) -> None:
+    blocks = {name: shared_memory.SharedMemory(name=shm_name) for name, (shm_name, _, _) in spec.items()}
+    _WORKER["blocks"] = blocks  # keep the mappings alive for the worker's lifetime
+    _WORKER["arrays"] = {
+        name: np.ndarray(shape, np.dtype(dtype), buffer=blocks[name].buf) for name, (_, shape, dtype) in spec.items()
+    }
+    _WORKER["n_markets"] = n_markets
+
+
+def _evaluate_task(task: tuple[int, int, int, np.ndarray]) -> pd.DataFrame:
+    return _evaluate(_WORKER["arrays"], _WORKER["n_markets"], task)
+
+
+def _evaluate(arrays: dict[str, np.ndarray], n_markets: int, task: tuple[int, int, int, np.ndarray]) -> pd.DataFrame:
+    """
+    Bet counts of lines[lo:hi] for one window across all thresholds, one row per
+    (threshold, market) with "ALL" last.
+    """
+    wi, lo, hi, thresholds = task
+    line, actual, market = arrays["line"][lo:hi], arrays["actual"][lo:hi], arrays["market"][lo:hi]
+    edge = arrays["features"][lo:hi, wi].astype(np.float64) - line
+    diff = actual - line
+    live = ~np.isnan(edge) & ~np.isnan(diff) & (edge != 0)
+    abs_edge = np.abs(edge[live])
+    order = np.argsort(abs_edge, kind="stable")
+    abs_edge = abs_edge[order]
+    outcome = (np.sign(diff[live]) * np.sign(edge[live]))[order]
+    mk = market[live][order].astype(np.int64)
+    # suffix[k][i, m]: outcome-k lines of market m among sorted positions >= i
+    onehot = np.zeros((len(mk) + 1, n_markets + 1))
+    suffix = []
+    for hit in (outcome > 0, outcome < 0, outcome == 0):
+        onehot[:] = 0.0
+        onehot[np.nonzero(hit)[0], mk[hit]] = 1.0
+        onehot[:-1, n_markets] = hit
+        suffix.append(np.cumsum(onehot[::-1], axis=0)[::-1])
+    start = np.searchsorted(abs_edge, thresholds, side="right")
+    wins, losses, pushes = (sfx[start] for sfx in suffix)  # (thresholds, markets + 1)
+    bets = wins + losses + pushes
+    shape = bets.shape
+    return pd.DataFrame({
+        "wi": wi,
+        "threshold": np.repeat(thresholds, shape[1]),
+        "mi": np.tile(np.arange(shape[1]), shape[0]),
+        "bets": bets.ravel().astype(np.int64),
+        "wins": wins.ravel().astype(np.int64),
+        "losses": losses.ravel().astype(np.int64),
+        "pushes": pushes.ravel().astype(np.int64),
+    })
+
+
+def _rates(counts: pd.DataFrame, win_payout: float) -> pd.DataFrame:
+    """units, hit_rate and roi from summed bet counts."""
+    wins, losses = counts["wins"].to_numpy(np.float64), counts["losses"].to_numpy(np.float64)
+    units = wins * win_payout - losses
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return counts.assign(units=units, hit_rate=wins / (wins + losses), roi=units / counts["bets"].to_numpy(np.float64))
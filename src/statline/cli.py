@@ -1,78 +1,567 @@
+"""
+StatLine command line. Commands import their pandas/SQLAlchemy/requests dependencies
+when they run, so `statline --help`, cron wrappers and the scheduler start quickly;
+keep new heavy imports inside the command bodies.
+"""
 from __future__ import annotations
+import time
 import typer
+from contextlib import ExitStack, contextmanager
 from datetime import datetime, timezone
 from typing import List
-from sqlalchemy import create_engine
 
-from .db import engine
-from .models import Base
-from .etl.ingest_mlb import backfill_mlb
-from .etl.ingest_nhl import backfill_nhl
-from .features.rolling import last_n_avg_pts
-from .utils.dates import last_two_seasons_mlb, last_two_seasons_nhl
+from .config import settings
+from .defaults import AGGREGATORS, DEFAULT_PRICE, DEFAULT_WINDOWS
+from .metrics import instrument_run
+from .utils.dates import last_two_seasons_mlb, last_two_seasons_nba, last_two_seasons_nhl
 
 app = typer.Typer(help="StatLine Core CLI")
+db_app = typer.Typer(help="Database maintenance")
+app.add_typer(db_app, name="db")
+backtest_app = typer.Typer(help="Backtest prop lines against rolling features")
+app.add_typer(backtest_app, name="backtest")
+
+def _start_http_cache(enabled: bool) -> None:
+    from .providers.http import enable_cache, set_transport
+    from .providers.transport import Recorder, Replay
+    if enabled:
+        enable_cache(settings.http_cache_dir)
+    if settings.http_replay_url:
+        set_transport(Replay(settings.http_replay_url))
+        typer.echo(f"Replaying provider requests from {settings.http_replay_url}")
+    elif settings.http_record_dir:
+        set_transport(Recorder(settings.http_record_dir))
+        typer.echo(f"Recording provider responses to {settings.http_record_dir}")
+
+def _report_http() -> None:
+    from .providers.http import cache_stats, rate_limit_stats
+    stats = cache_stats()
+    if stats is not None:
+        typer.echo("HTTP cache: " + ", ".join(f"{k}={v}" for k, v in stats.items()))
+    for host, host_stats in rate_limit_stats().items():
+        typer.echo(f"Rate limit {host}: " + ", ".join(f"{k}={v}" for k, v in host_stats.items()))
+
+def _instrumented(name: str, report: str | None, prometheus: str | None, profile: bool):
+    def extra() -> dict:
+        from .providers.http import cache_stats, rate_limit_stats
+        return {"http_cache": cache_stats(), "rate_limits": rate_limit_stats()}
+    return instrument_run(name, report or None, prometheus or None, profile, extra=extra)
+
+@contextmanager
+def _league_lock(*codes: str):
+    # the same per-league leases the scheduler service takes (statline.jobs)
+    from .db import get_engine
+    from .jobs import LockHeld, locked
+    from .migrations import migrate
+    migrate(get_engine())
+    with ExitStack() as stack:
+        try:
+            for code in codes:
+                stack.enter_context(locked(code))
+        except LockHeld as e:
+            typer.secho(f"{e}; not starting another run.", fg=typer.colors.YELLOW)
+            raise typer.Exit(1)
+        yield
+
+def _optimize_db(full: bool = False) -> None:
+    from .db import optimize
+    stats = optimize(full=full)
+    if stats:
+        typer.echo("DB maintenance: " + ", ".join(f"{k}={v}" for k, v in stats.items()))
 
 @app.command()
 def initdb():
     """
-    Create database tables (no external API calls).
+    Create database tables and apply pending schema migrations (no external API calls).
     """
-    Base.metadata.create_all(engine)
+    from .db import get_engine
+    from .migrations import migrate
+    for m in migrate(get_engine()):
+        typer.echo(f"Applied migration {m.version}: {m.name}")
     typer.secho("Database initialized.", fg=typer.colors.GREEN)
 
 @app.command()
 def ingest(
-    league: str = typer.Argument(..., help="League code e.g. MLB/NHL"),
-    seasons: List[str] = typer.Option(None, help="MLB: 2024 2025, NHL: 20232024 20242025")
+    league: str = typer.Argument(..., help="League code e.g. MLB/NHL/NBA"),
+    seasons: List[str] = typer.Option(None, help="MLB: 2024 2025, NHL: 20232024 20242025, NBA: 2023 2024"),
+    workers: int = typer.Option(settings.ingest_workers, help="Concurrent fetch workers (1 = serial; MLB/NHL)"),
+    incremental: bool = typer.Option(False, help="Only fetch games that are new or not yet Final since the last run"),
+    http_cache: bool = typer.Option(settings.http_cache, help="Serve repeat requests from the on-disk response cache"),
+    use_async: bool = typer.Option(False, "--async", help="Fetch from one asyncio event loop (needs the 'async' extra)"),
+    resume: bool = typer.Option(False, help="Continue the last unfinished backfill: skip games it wrote, retry failed ones"),
+    report: str = typer.Option(settings.run_report, help="Write a JSON run report (timings, HTTP and row metrics) here"),
+    prometheus: str = typer.Option(settings.prometheus_file or None, help="Also write the metrics as a Prometheus textfile"),
+    profile: bool = typer.Option(False, help="Run under cProfile (all threads); stats are saved next to the report"),
 ):
     """
     Backfill data for the given league and seasons.
     """
-    L = league.upper()
-    if L == "MLB":
-        if not seasons:
-            typer.echo("Provide --seasons like 2024 2025")
-            raise typer.Exit(1)
-        backfill_mlb([int(s) for s in seasons])
-    elif L == "NHL":
-        if not seasons:
-            typer.echo("Provide --seasons like 20232024 20242025")
-            raise typer.Exit(1)
-        backfill_nhl([str(s) for s in seasons])
-    else:
-        typer.secho(f"League {league} not implemented.", fg=typer.colors.RED)
+    from .db import use_profile
+    from .etl.ingest import backfill_nba, refresh_nba
+    from .etl.ingest_mlb import backfill_mlb, refresh_mlb
+    from .etl.ingest_nhl import backfill_nhl, refresh_nhl
+    from .etl.ledger import NothingToResume
+    if use_async and incremental:
+        typer.secho("--incremental refreshes through the threaded driver; drop --async.", fg=typer.colors.RED)
+        raise typer.Exit(2)
+    if league.upper() == "NBA" and not settings.balldontlie_api_key:
+        typer.secho("NBA ingest needs BALLDONTLIE_API_KEY.", fg=typer.colors.RED)
         raise typer.Exit(2)
-    typer.secho(f"{L} backfill complete for seasons: {seasons}", fg=typer.colors.GREEN)
+    with _instrumented(f"ingest {league.upper()}", report, prometheus, profile), _league_lock(league.upper()):
+        L = league.upper()
+        use_profile("ingest")
+        _start_http_cache(http_cache)
+        if incremental:
+            if L == "MLB":
+                refresh_mlb(workers=workers)
+            elif L == "NHL":
+                refresh_nhl(workers=workers)
+            elif L == "NBA":
+                refresh_nba()
+            else:
+                typer.secho(f"League {league} not implemented.", fg=typer.colors.RED)
+                raise typer.Exit(2)
+            _report_http()
+            _optimize_db()
+            typer.secho(f"{L} incremental refresh complete.", fg=typer.colors.GREEN)
+            return
+        if use_async and resume:
+            typer.secho("--resume uses the run ledger of the threaded backfill; drop --async.", fg=typer.colors.RED)
+            raise typer.Exit(2)
+        try:
+            if L == "MLB":
+                if not seasons and not resume:
+                    typer.echo("Provide --seasons like 2024 2025")
+                    raise typer.Exit(1)
+                if use_async:
+                    from .etl.ingest_async import backfill_mlb_async
+                    backfill_mlb_async([int(s) for s in seasons])
+                else:
+                    backfill_mlb([int(s) for s in seasons] if seasons else None, workers=workers, resume=resume)
+            elif L == "NHL":
+                if not seasons and not resume:
+                    typer.echo("Provide --seasons like 20232024 20242025")
+                    raise typer.Exit(1)
+                if use_async:
+                    from .etl.ingest_async import backfill_nhl_async
+                    backfill_nhl_async([str(s) for s in seasons])
+                else:
+                    backfill_nhl([str(s) for s in seasons] if seasons else None, workers=workers, resume=resume)
+            elif L == "NBA":
+                if not seasons and not resume:
+                    typer.echo("Provide --seasons like 2023 2024")
+                    raise typer.Exit(1)
+                if use_async:
+                    typer.secho("NBA stats are paged season-wide; --async does not apply.", fg=typer.colors.RED)
+                    raise typer.Exit(2)
+                backfill_nba([int(s) for s in seasons] if seasons else None, resume=resume)
+            else:
+                typer.secho(f"League {league} not implemented.", fg=typer.colors.RED)
+                raise typer.Exit(2)
+        except NothingToResume as e:
+            typer.secho(str(e), fg=typer.colors.RED)
+            raise typer.Exit(1)
+        _report_http()
+        _optimize_db()
+        typer.secho(f"{L} backfill complete for seasons: {seasons}", fg=typer.colors.GREEN)
 
 @app.command()
-def ingest_two_years():
+def ingest_two_years(
+    workers: int = typer.Option(settings.ingest_workers, help="Concurrent fetch workers (1 = serial)"),
+    incremental: bool = typer.Option(False, help="Only fetch games that are new or not yet Final since the last run"),
+    http_cache: bool = typer.Option(settings.http_cache, help="Serve repeat requests from the on-disk response cache"),
+    use_async: bool = typer.Option(False, "--async", help="Fetch from one asyncio event loop (needs the 'async' extra)"),
+    report: str = typer.Option(settings.run_report, help="Write a JSON run report (timings, HTTP and row metrics) here"),
+    prometheus: str = typer.Option(settings.prometheus_file or None, help="Also write the metrics as a Prometheus textfile"),
+    profile: bool = typer.Option(False, help="Run under cProfile (all threads); stats are saved next to the report"),
+):
     """
     Detect last ~2 seasons per league and backfill all.
     """
-    now = datetime.now(timezone.utc)
+    from .db import use_profile
+    from .etl.ingest import backfill_nba, refresh_nba
+    from .etl.ingest_mlb import backfill_mlb, refresh_mlb
+    from .etl.ingest_nhl import backfill_nhl, refresh_nhl
+    if use_async and incremental:
+        typer.secho("--incremental refreshes through the threaded driver; drop --async.", fg=typer.colors.RED)
+        raise typer.Exit(2)
+    leagues = ["MLB", "NHL"] + (["NBA"] if settings.balldontlie_api_key else [])
+    if "NBA" not in leagues:
+        typer.secho("⚠️ Skipping NBA: set BALLDONTLIE_API_KEY to ingest it.", fg=typer.colors.YELLOW)
+    with _instrumented("ingest-two-years", report, prometheus, profile), _league_lock(*leagues):
+        use_profile("ingest")
+        _start_http_cache(http_cache)
+        if incremental:
+            refresh_mlb(workers=workers)
+            refresh_nhl(workers=workers)
+            if "NBA" in leagues:
+                refresh_nba()
+            _report_http()
+            _optimize_db()
+            typer.secho(f"{' + '.join(leagues)} incrementally refreshed.", fg=typer.colors.GREEN)
+            return
+
+        now = datetime.now(timezone.utc)
+
+        mlb_seasons = last_two_seasons_mlb(now)
+        nhl_seasons = last_two_seasons_nhl(now)
+        nba_seasons = last_two_seasons_nba(now)
 
-    mlb_seasons = last_two_seasons_mlb(now)
-    nhl_seasons = last_two_seasons_nhl(now)
+        if use_async:
+            from .etl.ingest_async import backfill_mlb_async, backfill_nhl_async
 
-    typer.secho(f"MLB seasons: {mlb_seasons}")
-    backfill_mlb(mlb_seasons)
+        typer.secho(f"MLB seasons: {mlb_seasons}")
+        if use_async:
+            backfill_mlb_async(mlb_seasons)
+        else:
+            backfill_mlb(mlb_seasons, workers=workers)
 
-    typer.secho(f"NHL seasons: {nhl_seasons}")
-    backfill_nhl(nhl_seasons)
+        typer.secho(f"NHL seasons: {nhl_seasons}")
+        if use_async:
+            backfill_nhl_async(nhl_seasons)
+        else:
+            backfill_nhl(nhl_seasons, workers=workers)
 
-    typer.secho("MLB + NHL backfilled for ~2 years.", fg=typer.colors.GREEN)
+        # season-wide stat pages; the asyncio driver has nothing to add here
+        if "NBA" in leagues:
+            typer.secho(f"NBA seasons: {nba_seasons}")
+            backfill_nba(nba_seasons)
+
+        _report_http()
+        _optimize_db()
+        typer.secho(f"{' + '.join(leagues)} backfilled for ~2 years.", fg=typer.colors.GREEN)
 
 @app.command()
-def features(league: str, target: str = "pts", window: int = 10):
+def schedule(
+    leagues: str = typer.Option(settings.schedule_leagues, help="Comma-separated leagues to follow"),
+    days: float = typer.Option(None, help="Stop after this many days (default: run until interrupted)"),
+    http_cache: bool = typer.Option(settings.http_cache, help="Serve repeat requests from the on-disk response cache"),
+):
     """
-    Build rolling features for the specified market (baseline).
-    Currently only supports NBA PTS demo, but kept for future expansion.
+    Run the game-day scheduler: poll live games, reconcile nightly, resume after restarts.
     """
-    if league.upper() != "NBA" or target != "pts":
-        typer.secho("Only NBA pts baseline rolling feature demo is implemented.", fg=typer.colors.YELLOW)
-    df = last_n_avg_pts(window)
+    from .scheduler import main
+    try:
+        main(leagues.split(","), days, http_cache)
+    except ValueError as e:
+        typer.secho(str(e), fg=typer.colors.RED)
+        raise typer.Exit(2)
+
+@app.command()
+def serve(
+    host: str = typer.Option(settings.serve_host, help="Address to listen on"),
+    port: int = typer.Option(settings.serve_port, help="Port to listen on"),
+    cache_size: int = typer.Option(settings.serve_cache_size, help="Lookups kept in the LRU cache"),
+    check_every: float = typer.Option(settings.serve_check_seconds, help="Seconds between checks for new ingest commits"),
+):
+    """
+    Serve latest / as-of-game rolling features over local HTTP from a read-only pool.
+    """
+    from .serve import main
+    try:
+        main(host, port, cache_size, check_every)
+    except ValueError as e:
+        typer.secho(str(e), fg=typer.colors.RED)
+        raise typer.Exit(2)
+
+@app.command()
+def features(
+    league: str = typer.Argument(..., help="League code e.g. NBA/MLB/NHL"),
+    target: str = typer.Option("pts", help="Stat column to roll"),
+    window: int = typer.Option(10, help="Trailing window in games"),
+    rebuild: bool = typer.Option(False, help="Recompute the league's materialized features from scratch"),
+):
+    """
+    Show rolling features from the materialized player_rolling_features table.
+    Specs outside FEATURE_STATS x FEATURE_WINDOWS are computed on the fly.
+    """
+    from .db import SessionLocal, use_profile
+    from .features.materialized import (
+        compute_rolling_features, feature_specs, has_rolling_features, load_rolling_features, rebuild_rolling_features,
+    )
+    from .models import League
+    use_profile("read")
+    with SessionLocal() as s:
+        lg = s.query(League).filter_by(code=league.upper()).one_or_none()
+        if lg is None:
+            typer.secho(f"League {league} has no data; run ingest first.", fg=typer.colors.RED)
+            raise typer.Exit(2)
+        if (target, window) not in feature_specs():
+            typer.secho(f"{target}/{window} is not materialized (FEATURE_STATS/FEATURE_WINDOWS); computing it now.",
+                        fg=typer.colors.YELLOW)
+            df = compute_rolling_features(s, lg.id, target, window)
+        else:
+            if rebuild or not has_rolling_features(s, lg.id, target, window):
+                n = rebuild_rolling_features(s, lg.id)
+                s.commit()
+                typer.echo(f"Rebuilt {n} rolling feature rows for {lg.code}.")
+            df = load_rolling_features(s, lg.id, target, window)
     typer.echo(df.head().to_string(index=False))
 
+@app.command()
+def feature_matrix(
+    league: str = typer.Argument(..., help="League code e.g. NBA/MLB/NHL"),
+    stats: str = typer.Option("pts", help="Comma-separated stat columns, or 'all'"),
+    windows: str = typer.Option(",".join(map(str, DEFAULT_WINDOWS)), help="Comma-separated trailing windows (games)"),
+    aggs: str = typer.Option(",".join(AGGREGATORS), help=f"Comma-separated aggregators: {', '.join(AGGREGATORS)}"),
+    seasons: List[int] = typer.Option(None, help="Only return rows from these seasons"),
+    out: str = typer.Option(None, help="Write the matrix to this .npz file"),
+    parquet: str = typer.Option(None, help="Read stats from this `statline export` directory instead of SQLite"),
+):
+    """
+    Compute a multi-stat, multi-window feature matrix (float32) in one vectorized pass.
+    """
+    from .db import SessionLocal, use_profile
+    from .etl.export import read_stats
+    from .etl.records import STAT_COLUMNS
+    from .features.engine import build_features, build_specs
+    from .models import League
+    use_profile("read")
+    stat_list = list(STAT_COLUMNS) if stats == "all" else [x.strip() for x in stats.split(",") if x.strip()]
+    try:
+        specs = build_specs(
+            stat_list,
+            [int(w) for w in windows.split(",") if w.strip()],
+            [a.strip() for a in aggs.split(",") if a.strip()],
+        )
+    except ValueError as e:
+        typer.secho(str(e), fg=typer.colors.RED)
+        raise typer.Exit(2)
+    with SessionLocal() as s:
+        lg = s.query(League).filter_by(code=league.upper()).one_or_none()
+        if lg is None:
+            typer.secho(f"League {league} has no data; run ingest first.", fg=typer.colors.RED)
+            raise typer.Exit(2)
+        started = time.perf_counter()
+        df = read_stats(parquet, lg.code, sorted({sp.stat for sp in specs})) if parquet else None
+        fm = build_features(specs, league_id=lg.id, seasons=seasons or None, bind=s.connection(), df=df)
+    typer.echo(
+        f"{fm.values.shape[0]} rows x {fm.values.shape[1]} features "
+        f"({fm.values.nbytes / 1e6:.1f} MB float32) in {time.perf_counter() - started:.2f}s"
+    )
+    if out:
+        fm.save(out)
+        typer.echo(f"Wrote {out}")
+    else:
+        typer.echo(fm.to_frame().head().to_string(index=False))
+
+@app.command()
+def export(
+    out: str = typer.Option(settings.export_dir, help="Destination directory"),
+    full: bool = typer.Option(False, help="Rewrite every partition, not only changed ones"),
+):
+    """
+    Export games, players and player_game_stats to Parquet partitioned by league/season.
+    """
+    from .db import use_profile
+    from .etl.export import export_parquet
+    use_profile("read")
+    started = time.perf_counter()
+    try:
+        stats = export_parquet(out, full=full)
+    except RuntimeError as e:
+        typer.secho(str(e), fg=typer.colors.RED)
+        raise typer.Exit(2)
+    typer.echo(f"{stats.summary()} in {time.perf_counter() - started:.2f}s")
+    for key in stats.written:
+        typer.echo(f"  wrote {key}")
+
+@backtest_app.command("run")
+def backtest_run(
+    league: str = typer.Argument(..., help="League code e.g. NBA/MLB/NHL"),
+    window: int = typer.Option(10, help="Trailing window (games) of the mean used as the projection"),
+    threshold: float = typer.Option(0.0, help="Minimum |projection - line| to bet"),
+    price: float = typer.Option(DEFAULT_PRICE, help="American odds assumed for every bet"),
+    markets: List[str] = typer.Option(None, help="Only these prop_lines markets"),
+):
+    """
+    Point-in-time backtest of stored prop lines: hit rate, ROI and calibration per market.
+    """
+    from .backtest.engine import run_backtest
+    from .db import SessionLocal, use_profile
+    from .models import League
+    use_profile("read")
+    with SessionLocal() as s:
+        lg = s.query(League).filter_by(code=league.upper()).one_or_none()
+        if lg is None:
+            typer.secho(f"League {league} has no data; run ingest first.", fg=typer.colors.RED)
+            raise typer.Exit(2)
+        started = time.perf_counter()
+        result = run_backtest(lg.id, window, threshold, price, markets or None, bind=s.connection())
+    typer.echo(f"Graded {len(result.graded)} lines in {time.perf_counter() - started:.2f}s")
+    typer.echo(result.summary.to_string(index=False))
+    if not result.calibration.empty:
+        typer.echo("Calibration by |edge| bin:")
+        typer.echo(result.calibration.to_string(index=False))
+
+@backtest_app.command("sweep")
+def backtest_sweep(
+    league: str = typer.Argument(..., help="League code e.g. NBA/MLB/NHL"),
+    windows: str = typer.Option(",".join(map(str, DEFAULT_WINDOWS)), help="Comma-separated trailing windows (games)"),
+    thresholds: str = typer.Option("0:3:0.25", help="Comma-separated thresholds, or start:stop:step (stop inclusive)"),
+    price: float = typer.Option(DEFAULT_PRICE, help="American odds assumed for every bet"),
+    markets: List[str] = typer.Option(None, help="Only these prop_lines markets"),
+    workers: int = typer.Option(None, help="Worker processes (default: CPU count)"),
+    min_bets: int = typer.Option(30, help="Rank configurations with fewer bets last"),
+    top: int = typer.Option(20, help="Configurations to print"),
+    out: str = typer.Option(None, help="Write the full results table to this CSV file"),
+):
+    """
+    Grade every window x threshold configuration from one load of lines and features.
+    """
+    from .backtest.sweep import prepare as prepare_sweep, sweep as run_sweep
+    from .db import SessionLocal, use_profile
+    from .models import League
+    use_profile("read")
+    try:
+        window_list = [int(w) for w in windows.split(",") if w.strip()]
+        threshold_list = _parse_grid(thresholds)
+    except ValueError as e:
+        typer.secho(f"Invalid grid: {e}", fg=typer.colors.RED)
+        raise typer.Exit(2)
+    with SessionLocal() as s:
+        lg = s.query(League).filter_by(code=league.upper()).one_or_none()
+        if lg is None:
+            typer.secho(f"League {league} has no data; run ingest first.", fg=typer.colors.RED)
+            raise typer.Exit(2)
+        started = time.perf_counter()
+        data = prepare_sweep(lg.id, window_list, markets or None, bind=s.connection())
+    loaded = time.perf_counter()
+    results = run_sweep(data, threshold_list, price, workers, min_bets)
+    configs = len(data.windows) * len(set(threshold_list))
+    typer.echo(
+        f"Loaded {len(data.line)} lines in {loaded - started:.2f}s; "
+        f"graded {configs} configurations in {time.perf_counter() - loaded:.2f}s"
+    )
+    overall = results[results["market"] == "ALL"].drop(columns="market")
+    typer.echo(overall.head(top).to_string(index=False))
+    if out:
+        results.to_csv(out, index=False)
+        typer.echo(f"Wrote {out}")
+
+def _parse_grid(spec: str) -> list[float]:
+    if ":" in spec:
+        start, stop, step = (float(x) for x in spec.split(":"))
+        if step <= 0:
+            raise ValueError("step must be > 0")
+        n = int(round((stop - start) / step)) + 1
+        return [round(start + i * step, 10) for i in range(max(0, n))]
+    return [float(x) for x in spec.split(",") if x.strip()]
+
+@app.command()
+def replay_server(
+    archive: str = typer.Argument(..., help="Fixture directory recorded with HTTP_RECORD_DIR"),
+    port: int = typer.Option(8765, help="Port to listen on (127.0.0.1)"),
+    latency: float = typer.Option(0.0, help="Seconds added to every response"),
+    jitter: float = typer.Option(0.0, help="Up to this many extra seconds, uniformly random"),
+    error_rate: float = typer.Option(0.0, help="Share of requests answered with --error-status"),
+    error_status: int = typer.Option(503, help="Injected status; 0 drops the connection instead"),
+    seed: int = typer.Option(0, help="Seed for jitter and error injection"),
+):
+    """
+    Serve recorded provider responses locally; point ingest at it with HTTP_REPLAY_URL.
+    """
+    from .providers.transport import FixtureArchive, StandInServer
+    server = StandInServer(FixtureArchive(archive), port=port, latency=latency, jitter=jitter,
+                           error_rate=error_rate, error_status=error_status, seed=seed)
+    typer.echo(f"Serving {archive} at {server.url} (HTTP_REPLAY_URL={server.url}); Ctrl-C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    typer.echo("Stand-in server: " + ", ".join(f"{k}={v}" for k, v in server.stats().items()))
+
+@db_app.command("optimize")
+def db_optimize(full: bool = typer.Option(False, help="Full ANALYZE and VACUUM instead of PRAGMA optimize")):
+    """
+    ANALYZE, VACUUM when fragmented, and checkpoint the WAL into the main file.
+    """
+    _optimize_db(full=full)
+    typer.secho("Database optimized.", fg=typer.colors.GREEN)
+
+@db_app.command("shard")
+def db_shard(
+    directory: str = typer.Option(settings.sqlite_shard_dir or "data/shards", "--dir", help="Where the shard files go"),
+):
+    """
+    Move each league/season's games, stats and features into its own SQLite file.
+    """
+    from .db import SessionLocal, get_engine
+    from .migrations import migrate
+    from .shards import split_database
+    migrate(get_engine())
+    with SessionLocal() as s:
+        moved = split_database(s, directory)
+    for schema, n in moved.items():
+        typer.echo(f"{schema}: {n} games")
+    _optimize_db(full=True)  # reclaim the space the moved rows left in the catalog
+    typer.secho(f"Sharded {len(moved)} league/seasons into {directory}.", fg=typer.colors.GREEN)
+
+@db_app.command("merge-shards")
+def db_merge_shards(
+    keep: int = typer.Option(2, help="Newest seasons per league that stay in their own shard file"),
+):
+    """
+    Fold older seasons' shard files back into the catalog, staying under SQLite's attach limit.
+    """
+    from .db import SessionLocal, get_engine
+    from .migrations import migrate
+    from .shards import merge_shards
+    if keep < 1:
+        typer.secho("--keep must be at least 1.", fg=typer.colors.RED)
+        raise typer.Exit(2)
+    migrate(get_engine())
+    with SessionLocal() as s:
+        moved = merge_shards(s, keep)
+    get_engine().dispose()  # pooled connections still have the merged files attached
+    for schema, n in moved.items():
+        typer.echo(f"{schema}: {n} games")
+    typer.secho(f"Merged {len(moved)} shards back into the catalog.", fg=typer.colors.GREEN)
+
+@db_app.command("audit")
+def db_audit(
+    apply: bool = typer.Option(False, help="Apply pending schema migrations (the recommended indexes), then audit"),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Print every query's plan, not only flagged ones"),
+):
+    """
+    EXPLAIN QUERY PLAN the hot ETL, feature and backtest queries; flag full scans and missing indexes.
+    """
+    from .audit import audit, providing_migrations
+    from .db import get_engine
+    from .migrations import migrate, pending
+    eng = get_engine()
+    if eng.dialect.name != "sqlite":
+        typer.secho(f"db audit reads SQLite query plans; DATABASE_URL is {eng.dialect.name}.", fg=typer.colors.RED)
+        raise typer.Exit(2)
+    if apply:
+        for m in migrate(eng):
+            typer.echo(f"Applied migration {m.version}: {m.name}")
+    with eng.connect() as conn:
+        plans = audit(conn)
+        todo = pending(conn)
+        analyzed = conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").first() is not None
+    for p in plans:
+        notes = [f"full scan of {t}" for t in p.scans] + [f"missing index {ix}" for ix in p.missing]
+        if p.sorts:
+            notes.append(f"{p.sorts} temp b-tree sort{'s' if p.sorts > 1 else ''}")
+        typer.secho(f"{'⚠️ ' if p.flagged else ''}{p.name}: {', '.join(notes) or 'ok'}",
+                    fg=typer.colors.YELLOW if p.flagged else None)
+        if p.flagged or verbose:
+            for line in p.plan:
+                typer.echo(f"    {line}")
+    if not analyzed:
+        typer.echo("No planner statistics yet; run `statline db optimize` for representative plans.")
+    needed = providing_migrations(plans)
+    for m in todo:
+        builds = [ix for ix in m.create if ix in needed]
+        typer.echo(f"Pending migration {m.version}: {m.name}" + (f" (builds {', '.join(builds)})" if builds else ""))
+    if todo:
+        typer.echo("Run `statline db audit --apply` (or `statline initdb`) to apply them.")
+    flagged = sum(p.flagged for p in plans)
+    if flagged:
+        typer.secho(f"{flagged} of {len(plans)} hot queries flagged.", fg=typer.colors.YELLOW)
+        raise typer.Exit(1)
+    typer.secho(f"All {len(plans)} hot queries use their indexes.", fg=typer.colors.GREEN)
+
 if __name__ == "__main__":
     app()
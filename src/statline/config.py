@@ -8,5 +8,32 @@ load_dotenv()
 @dataclass(frozen=True)
 class Settings:
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///data/statline.sqlite3")
+    ingest_workers: int = int(os.getenv("INGEST_WORKERS", "1"))
+    ingest_batch_size: int = int(os.getenv("INGEST_BATCH_SIZE", "1000"))      # stat rows per multi-row INSERT
+    ingest_commit_every: int = int(os.getenv("INGEST_COMMIT_EVERY", "50"))     # games per transaction
+    ingest_queue_size: int = int(os.getenv("INGEST_QUEUE_SIZE", "256"))        # games buffered between pipeline stages
+    async_in_flight: int = int(os.getenv("ASYNC_IN_FLIGHT", "64"))   # requests outstanding with --async
+    async_per_host: int = int(os.getenv("ASYNC_PER_HOST", "16"))     # per-API-host cap within that
+    balldontlie_api_key: str = os.getenv("BALLDONTLIE_API_KEY", "")   # Authorization header for the NBA provider
+    http_cache: bool = os.getenv("HTTP_CACHE", "1") == "1"
+    http_cache_dir: str = os.getenv("HTTP_CACHE_DIR", "data/http_cache")
+    http_record_dir: str = os.getenv("HTTP_RECORD_DIR", "")         # archive every provider response here (providers.transport)
+    http_replay_url: str = os.getenv("HTTP_REPLAY_URL", "")         # send provider requests to a stand-in server instead
+    feature_stats: str = os.getenv("FEATURE_STATS", "pts")             # stats kept in player_rolling_features
+    feature_windows: str = os.getenv("FEATURE_WINDOWS", "5,10,20")     # trailing windows (games) per stat
+    sqlite_profile: str = os.getenv("SQLITE_PROFILE", "ingest")     # db.PROFILES: ingest | read
+    sqlite_pragmas: str = os.getenv("SQLITE_PRAGMAS", "")           # overrides, e.g. "synchronous=OFF;cache_size=-1048576"
+    sqlite_shard_dir: str = os.getenv("SQLITE_SHARD_DIR", "")       # one SQLite file per league/season here when set
+    export_dir: str = os.getenv("EXPORT_DIR", "data/parquet")          # statline export destination
+    run_report: str = os.getenv("RUN_REPORT", "data/run_report.json")   # JSON metrics of the last ingest run
+    prometheus_file: str = os.getenv("PROMETHEUS_FILE", "")             # also write them here in Prometheus text format
+    schedule_leagues: str = os.getenv("SCHEDULE_LEAGUES", "MLB,NHL")          # leagues `statline schedule` follows
+    schedule_poll_minutes: int = int(os.getenv("SCHEDULE_POLL_MINUTES", "5"))  # live-game poll interval
+    schedule_plan_at: str = os.getenv("SCHEDULE_PLAN_AT", "12:00")             # UTC; read the day's schedule, plan polls
+    schedule_reconcile_at: str = os.getenv("SCHEDULE_RECONCILE_AT", "09:30")   # UTC; nightly incremental refresh
+    serve_host: str = os.getenv("SERVE_HOST", "127.0.0.1")                   # `statline serve` listen address
+    serve_port: int = int(os.getenv("SERVE_PORT", "8766"))
+    serve_cache_size: int = int(os.getenv("SERVE_CACHE_SIZE", "100000"))      # lookups kept in the LRU cache
+    serve_check_seconds: float = float(os.getenv("SERVE_CHECK_SECONDS", "1"))  # how often to look for new ingest commits
 
 settings = Settings()
@@ -1,7 +1,191 @@
 from __future__ import annotations
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import re
+import threading
+from typing import Any
+from weakref import WeakKeyDictionary
+from sqlalchemy import Engine, create_engine, event, make_url
+from sqlalchemy.orm import Session, sessionmaker
 from .config import settings
+from . import shards
 
-engine = create_engine(settings.database_url, echo=False, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+# Connection pragmas per workload. Both keep WAL (persistent in the file) so readers
+# never block the writer; synchronous=NORMAL in WAL mode only fsyncs at checkpoints
+# and cannot corrupt the database, it can only lose the last commits on power loss.
+PROFILES: dict[str, dict[str, Any]] = {
+    # backfills/refreshes: big page cache for index maintenance, sorts/temp b-trees
+    # in memory, rarer auto-checkpoints so the WAL absorbs large transactions
+    "ingest": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -262144,           # KiB (negative) -> 256 MB
+        "mmap_size": 268435456,          # 256 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,           # ms
+        "wal_autocheckpoint": 10000,     # pages
+    },
+    # feature builds/backtests: scan-heavy, so map the whole file and keep a large cache
+    "read": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -131072,           # 128 MB
+        "mmap_size": 2147483648,         # 2 GB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # `statline serve`: point lookups on a read-only connection, which cannot set
+    # journal_mode (WAL is persistent in the file anyway)
+    "serve": {
+        "cache_size": -131072,           # 128 MB
+        "mmap_size": 2147483648,         # 2 GB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+_PRAGMA = re.compile(r"^[a-z_]+$")
+_VALUE = re.compile(r"^-?[A-Za-z0-9_]+$")
+# VACUUM only when at least this share of pages sits on the freelist
+VACUUM_FREE_RATIO = 0.1
+
+
+def pragmas_for(profile: str, overrides: str | None = None) -> dict[str, Any]:
+    """
+    Pragmas for a named profile, with SQLITE_PRAGMAS-style overrides applied on top:
+    "synchronous=OFF;cache_size=-1048576".
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown SQLite profile {profile!r}; expected one of {sorted(PROFILES)}")
+    pragmas = dict(PROFILES[profile])
+    for item in filter(None, (p.strip() for p in (overrides or "").split(";"))):
+        name, _, value = item.partition("=")
+        name, value = name.strip().lower(), value.strip()
+        if not _PRAGMA.match(name) or not _VALUE.match(value):
+            raise ValueError(f"Invalid SQLite pragma override {item!r}")
+        pragmas[name] = value
+    return pragmas
+
+
+_profiles: WeakKeyDictionary[Engine, str] = WeakKeyDictionary()
+
+
+def make_engine(url: str, profile: str | None = None) -> Engine:
+    """
+    create_engine plus, for SQLite, the pragmas of `profile` (default SQLITE_PROFILE)
+    applied to every new pooled connection.
+    """
+    eng = create_engine(url, echo=False, future=True)
+    if eng.dialect.name != "sqlite":
+        return eng
+    _profiles[eng] = profile or settings.sqlite_profile
+    pragmas_for(_profiles[eng], settings.sqlite_pragmas)  # fail fast on bad config
+
+    @event.listens_for(eng, "connect")
+    def _apply_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            for name, value in pragmas_for(_profiles[eng], settings.sqlite_pragmas).items():
+                cur.execute(f"PRAGMA {name}={value}")
+        finally:
+            cur.close()
+
+    shards.install(eng, lambda: pragmas_for(_profiles[eng], settings.sqlite_pragmas))
+    return eng
+
+
+def read_only_engine(url: str | None = None) -> Engine:
+    """
+    An engine on `url` (default DATABASE_URL) whose connections cannot write: SQLite
+    opens the file with mode=ro under the "serve" profile, PostgreSQL runs read-only
+    transactions. Shards are attached as usual.
+    """
+    u = make_url(url or settings.database_url)
+    if u.get_backend_name() != "sqlite":
+        eng = make_engine(u.render_as_string(hide_password=False))
+        return eng.execution_options(postgresql_readonly=True) if eng.dialect.name == "postgresql" else eng
+    if u.database in (None, "", ":memory:"):
+        raise ValueError("A read-only engine needs a database file, not an in-memory database")
+    ro = u.set(database=f"file:{u.database}", query={**u.query, "mode": "ro", "uri": "true"})
+    return make_engine(ro.render_as_string(hide_password=False), profile="serve")
+
+
+def use_profile(name: str, eng: Engine | None = None) -> None:
+    """
+    Switch an engine to another pragma profile. Pooled connections are dropped so the
+    next checkout reconnects with the new settings (in-memory databases keep theirs).
+    """
+    eng = eng or get_engine()
+    if eng not in _profiles or _profiles[eng] == name:
+        return
+    pragmas_for(name)
+    _profiles[eng] = name
+    if eng.url.database not in (None, "", ":memory:"):
+        eng.dispose()
+
+
+def optimize(eng: Engine | None = None, full: bool = False) -> dict[str, Any]:
+    """
+    Post-ingest maintenance. Always refreshes planner statistics (PRAGMA optimize, or a
+    full ANALYZE with full=True) and checkpoints the WAL back into the main file so the
+    shipped .sqlite3 is self-contained. VACUUM runs with full=True or once the freelist
+    passes VACUUM_FREE_RATIO of the file. With shards, only the ones written since their
+    last optimize are analyzed/vacuumed, so untouched season files stay byte-identical.
+    """
+    eng = eng or get_engine()
+    if eng.dialect.name != "sqlite":
+        return {}
+    with eng.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        stale = shards.stale_shards(conn)
+        stats = _maintain(conn, "main", full)
+        for schema in stale:
+            _maintain(conn, schema, full)
+        busy, wal_pages, _ = conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").one()
+        shards.mark_optimized(conn, stale)
+        return {**stats, "checkpoint_busy": busy, "wal_pages": wal_pages, **({"shards": len(stale)} if stale else {})}
+
+
+def _maintain(conn, schema: str, full: bool) -> dict[str, Any]:
+    q = lambda sql: conn.exec_driver_sql(sql).scalar()
+    pages, free = q(f'PRAGMA "{schema}".page_count'), q(f'PRAGMA "{schema}".freelist_count')
+    conn.exec_driver_sql(f'ANALYZE "{schema}"' if full else f'PRAGMA "{schema}".optimize')
+    vacuumed = bool(pages) and (full or free / pages >= VACUUM_FREE_RATIO)
+    if vacuumed:
+        with shards.views_dropped(conn):
+            conn.exec_driver_sql(f'VACUUM "{schema}"')
+    return {
+        "pages_before": pages,
+        "free_pages_before": free,
+        "pages_after": q(f'PRAGMA "{schema}".page_count'),
+        "analyzed": "full" if full else "optimize",
+        "vacuumed": vacuumed,
+    }
+
+
+_engine: Engine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """The DATABASE_URL engine, built on first use so importing statline stays cheap."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = make_engine(settings.database_url)
+    return _engine
+
+
+class _LazySessionmaker(sessionmaker):
+    # binds to get_engine() on the first Session rather than at import
+    def __call__(self, **local_kw: Any) -> Session:
+        if self.kw.get("bind") is None and local_kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionmaker(autoflush=False, autocommit=False, future=True)
+
+
+def __getattr__(name: str) -> Any:
+    # `from statline.db import engine` keeps working; it builds the engine on first access
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
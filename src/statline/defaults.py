@@ -0,0 +1,8 @@
+"""
+Defaults shared by the CLI options and the engines behind them. This module imports
+nothing, so `statline --help` can show them without loading pandas or SQLAlchemy.
+"""
+
+AGGREGATORS = ("mean", "std", "ewm", "min", "max")
+DEFAULT_WINDOWS = (3, 5, 10, 20)
+DEFAULT_PRICE = -110  # American odds when the line carries no price
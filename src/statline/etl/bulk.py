@@ -0,0 +1,281 @@
+from __future__ import annotations
+import time
+from datetime import datetime, timezone
+from typing import Any, Iterable
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..metrics import METRICS
+from ..models import League, Team, Player, Game, PlayerGameStat, StatsVersion
+from ..shards import ShardMap, mark_modified, route
+from ..utils.iters import chunks
+from .records import STAT_COLUMNS, GameRecord, PlayerLine, TeamRecord
+
+_IN_CHUNK = 500  # ext_ids per IN (...) lookup
+
+
+def _insert(s: Session, model):
+    """Dialect-specific INSERT so we can use ON CONFLICT on the existing unique constraints."""
+    if s.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+
+def _stat_upsert(s: Session):
+    stmt = _insert(s, PlayerGameStat.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=["league_id", "game_id", "player_id"],
+        set_={c: getattr(stmt.excluded, c) for c in STAT_COLUMNS},
+    )
+
+
+def mark_stats_changed(s: Session, league_id: int) -> None:
+    """Bump the league's stats_versions row in the current transaction, so read caches drop its entries."""
+    stmt = _insert(s, StatsVersion).values(
+        league_id=league_id, version=1, changed_at=datetime.now(timezone.utc).replace(tzinfo=None),
+    )
+    s.execute(stmt.on_conflict_do_update(
+        index_elements=["league_id"],
+        set_={"version": StatsVersion.version + 1, "changed_at": stmt.excluded.changed_at},
+    ))
+
+
+def ensure_league(s: Session, code: str, name: str) -> League:
+    league = s.query(League).filter_by(code=code).one_or_none()
+    if not league:
+        league = League(code=code, name=name)
+        s.add(league)
+        s.commit()
+    return league
+
+
+class BulkWriter:
+    """
+    Set-based writer for one league.
+
+    ext_id -> id maps for teams, players and games are preloaded once, so known
+    entities cost no queries. Unknown ones are inserted with one batched
+    INSERT ... ON CONFLICT DO NOTHING and their ids read back in one SELECT.
+    Stat rows are buffered and upserted (ON CONFLICT DO UPDATE on
+    uq_stat_game_player) `batch_size` rows per executemany, and the
+    transaction is committed every `commit_every` games.
+
+    On a clean exit the materialized rolling features of every player who got a stat
+    row are brought up to date (features.materialized.update_rolling_features).
+
+    With a sharded database (statline.shards) games and stat rows are routed to the
+    shard of their season, which is created on first use.
+
+    With a `ledger` (etl.ledger.Ledger) every written game is checkpointed ok, and the
+    checkpoints are committed in the same transaction as the game's rows.
+
+    Each commit that wrote games or stats (and each feature refresh) bumps the
+    league's stats_versions row, which invalidates `statline serve` caches.
+
+    Statements go through Core executemany with a single cached statement;
+    compiling a fresh multi-row VALUES clause per batch costs more than the
+    round trips it saves on SQLite.
+    """
+
+    def __init__(
+        self,
+        s: Session,
+        league_id: int,
+        batch_size: int | None = None,
+        commit_every: int | None = None,
+        update_features: bool = True,
+        ledger: Any = None,
+    ):
+        self.s = s
+        self.league_id = league_id
+        self.batch_size = batch_size or settings.ingest_batch_size
+        self.commit_every = commit_every or settings.ingest_commit_every
+        self.teams: dict[str, int] = _id_map(s, Team, league_id)
+        self.players: dict[str, int] = _id_map(s, Player, league_id)
+        self.games: dict[str, tuple[int, str]] = {
+            ext_id: (gid, status)
+            for ext_id, gid, status in s.execute(_game_states_stmt(league_id))
+        }
+        self.shards = ShardMap(s, league_id)
+        self._stats: dict[str | None, list[dict[str, Any]]] = {}  # schema -> buffered rows
+        self._buffered = 0
+        self._modified: set[str] = set()
+        self._pending_games = 0
+        self._changed = False
+        self.rows_written = 0
+        self.games_written = 0
+        self.update_features = update_features
+        self.ledger = ledger
+        self.touched_players: set[int] = set()
+        self.touched_since: datetime | None = None
+
+    def __enter__(self) -> "BulkWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+            if self.update_features:
+                self.refresh_features()
+
+    # ---- entities ---------------------------------------------------------
+
+    def ensure_teams(self, teams: Iterable[TeamRecord]) -> dict[str, int]:
+        missing = {t.ext_id: t for t in teams if t.ext_id not in self.teams}
+        if missing:
+            rows = [
+                {"league_id": self.league_id, "ext_id": t.ext_id, "name": t.name, "abbreviation": t.abbreviation}
+                for t in missing.values()
+            ]
+            self._insert_missing(Team, rows, self.teams)
+        return self.teams
+
+    def ensure_players(self, lines: Iterable[PlayerLine]) -> dict[str, int]:
+        missing = {p.ext_id: p for p in lines if p.ext_id not in self.players}
+        if missing:
+            rows = [
+                {
+                    "league_id": self.league_id, "ext_id": p.ext_id,
+                    "first_name": p.first_name, "last_name": p.last_name or "",
+                    "position": p.position, "team_id": self.teams.get(p.team_ext) if p.team_ext else None,
+                }
+                for p in missing.values()
+            ]
+            self._insert_missing(Player, rows, self.players)
+        return self.players
+
+    def _insert_missing(self, model, rows: list[dict[str, Any]], id_map: dict[str, int]) -> None:
+        stmt = _insert(self.s, model.__table__).on_conflict_do_nothing(index_elements=["league_id", "ext_id"])
+        self.s.connection().execute(stmt, rows)
+        ext_ids = [r["ext_id"] for r in rows]
+        known = len(id_map)
+        for chunk in chunks(ext_ids, _IN_CHUNK):
+            q = select(model.ext_id, model.id).where(model.league_id == self.league_id, model.ext_id.in_(chunk))
+            id_map.update({ext_id: id_ for ext_id, id_ in self.s.execute(q)})
+        # ids that were already there (another writer got to them first) were skipped by ON CONFLICT
+        _count_rows(model.__tablename__, inserted=len(id_map) - known, skipped=len(rows) - (len(id_map) - known))
+
+    def upsert_game(self, rec: GameRecord) -> int:
+        """Insert the game, or refresh status/date when it has progressed since it was stored."""
+        known = self.games.get(rec.ext_id)
+        if known and known[1] == rec.status:
+            _count_rows("games", skipped=1)
+            return known[0]
+        teams = self.ensure_teams((rec.home, rec.away))
+        schema = self._schema(rec.season)
+        stmt = (
+            _insert(self.s, Game)
+            .values(
+                league_id=self.league_id, ext_id=rec.ext_id, season=rec.season, date=rec.date,
+                home_team_id=teams[rec.home.ext_id], visitor_team_id=teams[rec.away.ext_id], status=rec.status,
+            )
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["league_id", "ext_id"],
+            set_={"status": stmt.excluded.status, "date": stmt.excluded.date},
+        ).returning(Game.id)
+        gid = self.s.execute(stmt, execution_options=route(schema)).scalar_one()
+        self.games[rec.ext_id] = (gid, rec.status)
+        self._changed = True
+        _count_rows("games", **{"updated" if known else "inserted": 1})
+        return gid
+
+    def _schema(self, season: int) -> str | None:
+        schema = self.shards.schema(season)
+        if schema is not None and schema not in self._modified:
+            self._modified.add(schema)
+            mark_modified(self.s, [schema])
+        return schema
+
+    # ---- stats ------------------------------------------------------------
+
+    def write_game(self, rec: GameRecord) -> int:
+        """Write one normalized game and buffer its stat lines; returns games.id."""
+        stored = rec.ext_id in self.games
+        gid = self.upsert_game(rec)
+        players = self.ensure_players(rec.lines)
+        seen: set[str] = set()
+        buffer = self._stats.setdefault(self._schema(rec.season), [])
+        for line in rec.lines:
+            if line.ext_id in seen:
+                continue
+            seen.add(line.ext_id)
+            row = {"league_id": self.league_id, "game_id": gid, "player_id": players[line.ext_id]}
+            self.touched_players.add(row["player_id"])
+            row.update({c: line.stats.get(c) for c in STAT_COLUMNS})
+            buffer.append(row)
+            self._buffered += 1
+        # a stored game's lines overwrite its existing rows; repeated lines in one game are dropped
+        _count_rows("player_game_stats", **{"updated" if stored else "inserted": len(seen)},
+                    skipped=len(rec.lines) - len(seen))
+        if rec.lines:
+            when = rec.date.replace(tzinfo=None)
+            self.touched_since = when if self.touched_since is None else min(self.touched_since, when)
+        if self._buffered >= self.batch_size:
+            self.flush()
+        self.games_written += 1
+        self._pending_games += 1
+        if self.ledger is not None:
+            self.ledger.ok(rec.ext_id, rec.season)
+        if self._pending_games >= self.commit_every:
+            self.commit()
+        return gid
+
+    def flush(self) -> None:
+        if self._buffered:
+            with METRICS.timer("statline_db_seconds", op="flush"):
+                for schema, rows in self._stats.items():
+                    if rows:
+                        self.s.connection().execute(_stat_upsert(self.s), rows, execution_options=route(schema))
+                        self.rows_written += len(rows)
+                        self._changed = True
+        self._stats.clear()
+        self._buffered = 0
+
+    def commit(self) -> None:
+        self.flush()
+        if self.ledger is not None:
+            self.ledger.flush(self.s)
+        if self._changed:
+            mark_stats_changed(self.s, self.league_id)
+            self._changed = False
+        with METRICS.timer("statline_db_seconds", op="commit"):
+            self.s.commit()
+        self._pending_games = 0
+        self._modified.clear()
+
+    def refresh_features(self) -> int:
+        """Recompute rolling features for the players written since the last refresh."""
+        if not self.touched_players:
+            return 0
+        from ..features.materialized import update_rolling_features
+
+        started = time.perf_counter()
+        with METRICS.timer("statline_db_seconds", op="features"):
+            n = update_rolling_features(self.s, self.league_id, self.touched_players, self.touched_since)
+            mark_stats_changed(self.s, self.league_id)
+            self.s.commit()
+        print(f"Rolling features: {n} rows for {len(self.touched_players)} players in {time.perf_counter() - started:.1f}s")
+        self.touched_players.clear()
+        self.touched_since = None
+        return n
+
+
+def _count_rows(table: str, **outcomes: int) -> None:
+    for outcome, n in outcomes.items():
+        if n:
+            METRICS.inc("statline_db_rows_total", n, table=table, outcome=outcome)
+
+
+def _id_map(s: Session, model, league_id: int) -> dict[str, int]:
+    return {ext_id: id_ for ext_id, id_ in s.execute(_id_map_stmt(model, league_id))}
+
+
+def _id_map_stmt(model, league_id: int) -> Select:
+    return select(model.ext_id, model.id).where(model.league_id == league_id)
+
+
+def _game_states_stmt(league_id: int) -> Select:
+    return select(Game.ext_id, Game.id, Game.status).where(Game.league_id == league_id)
@@ -0,0 +1,256 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Sequence
+import numpy as np
+import pandas as pd
+from sqlalchemy import Connection, Engine, String, func, null, select, type_coerce
+from ..db import get_engine
+from ..models import Game, League, Player, PlayerGameStat
+from .records import STAT_COLUMNS
+
+MANIFEST = "_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def _pa():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:  # optional dependency
+        raise RuntimeError("Parquet export needs pyarrow: pip install 'statline-core[parquet]'") from e
+    return pyarrow
+
+
+@dataclass
+class ExportStats:
+    written: list[str] = field(default_factory=list)    # partition paths rewritten
+    unchanged: int = 0
+    removed: list[str] = field(default_factory=list)    # partitions no longer in the database
+    rows: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"Export: {len(self.written)} partitions written ({self.rows} rows), "
+            f"{self.unchanged} unchanged, {len(self.removed)} removed"
+        )
+
+
+def export_parquet(
+    root: str | os.PathLike,
+    full: bool = False,
+    bind: Engine | Connection | None = None,
+) -> ExportStats:
+    """
+    Write games, players and player_game_stats under `root` as Hive-style partitions:
+
+        games/league=NBA/season=2025/part-0.parquet
+        player_game_stats/league=NBA/season=2025/part-0.parquet  (plus the game's date)
+        players/league=NBA/part-0.parquet
+
+    Each partition's fingerprint (row count, max id and column totals, computed by one
+    grouped query per table) is kept in _manifest.json; a later run rewrites only the
+    partitions whose fingerprint changed, or all of them with `full`. Files are written
+    to a temporary name and renamed into place, and the manifest is replaced last, so an
+    interrupted export is redone on the next run.
+    """
+    pa = _pa()
+    root = Path(root)
+    manifest = {} if full else _read_manifest(root)
+    bind = bind if bind is not None else get_engine()
+    stats = ExportStats()
+    with bind.connect() if isinstance(bind, Engine) else nullcontext(bind) as conn:
+        current = fingerprints(conn)
+        for key, fp in sorted(current.items()):
+            if manifest.get(key) == fp and (root / key).is_dir():
+                stats.unchanged += 1
+                continue
+            table, league, season = _parse_key(key)
+            data = _TABLE_READERS[table](conn, league, season)
+            _write(pa, data, root / key)
+            stats.written.append(key)
+            stats.rows += data.num_rows
+    for key in sorted(set(manifest) - set(current)):
+        shutil.rmtree(root / key, ignore_errors=True)
+        stats.removed.append(key)
+    _write_manifest(root, current)
+    return stats
+
+
+def fingerprints(conn: Connection) -> dict[str, str]:
+    """Partition path -> digest of aggregates that change whenever a row is added, removed or updated."""
+    g, p, st = Game, Player, PlayerGameStat
+    queries = {
+        "games": select(
+            League.code, g.season, func.count(), func.max(g.id), func.total(func.julianday(g.date)),
+            func.total(g.home_team_id), func.total(g.visitor_team_id),
+            func.total(func.length(g.status)), func.total(g.status == "Final"),
+        ).join(League, League.id == g.league_id).group_by(League.code, g.season),
+        "player_game_stats": select(
+            League.code, g.season, func.count(), func.max(st.id), func.total(st.player_id), func.total(st.game_id),
+            *(func.total(getattr(st, c)) for c in STAT_COLUMNS),
+            *(func.count(getattr(st, c)) for c in STAT_COLUMNS),
+        ).join(g, g.id == st.game_id).join(League, League.id == st.league_id).group_by(League.code, g.season),
+        "players": select(
+            League.code, null(), func.count(), func.max(p.id), func.total(p.team_id),
+            func.total(func.length(p.ext_id) + func.length(p.first_name) + func.length(p.last_name)),
+            func.total(func.length(p.position)),
+        ).join(League, League.id == p.league_id).group_by(League.code),
+    }
+    out = {}
+    for table, q in queries.items():
+        for code, season, *agg in conn.execute(q):
+            out[_key(table, code, season)] = hashlib.sha1(repr(agg).encode()).hexdigest()
+    return out
+
+
+def read_stats(
+    root: str | os.PathLike,
+    league: str,
+    stats: Sequence[str],
+    seasons: Sequence[int] | None = None,
+) -> pd.DataFrame:
+    """
+    player_id, game_id, date, season and `stats` for one league from an export, sorted by
+    (player_id, date, game_id): the frame features.engine.load_stats builds from SQLite,
+    read column-wise from only the season partitions asked for.
+    """
+    pa = _pa()
+    for st in stats:
+        if st not in STAT_COLUMNS:
+            raise ValueError(f"Unknown stat {st!r}; expected one of {STAT_COLUMNS}")
+    base = Path(root) / "player_game_stats" / f"league={league}"
+    dirs = sorted(base.glob("season=*")) if base.is_dir() else []
+    if seasons:
+        dirs = [d for d in dirs if int(d.name.split("=", 1)[1]) in set(seasons)]
+    cols = ["player_id", "game_id", "date", *stats]
+    frames = []
+    for d in dirs:
+        t = pa.parquet.read_table(d / "part-0.parquet", columns=cols)
+        df = t.to_pandas()
+        df.insert(3, "season", np.int64(d.name.split("=", 1)[1]))
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame({
+            "player_id": pd.Series(dtype=np.int64), "game_id": pd.Series(dtype=np.int64),
+            "date": pd.Series(dtype="datetime64[us]"), "season": pd.Series(dtype=np.int64),
+            **{st: pd.Series(dtype=np.float64) for st in stats},
+        })
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values(["player_id", "date", "game_id"], kind="stable").reset_index(drop=True)
+
+
+def _read_games(conn: Connection, league: str, season: int):
+    pa = _pa()
+    g = Game
+    rows = conn.execute(
+        select(g.id, g.ext_id, type_coerce(g.date, String), g.home_team_id, g.visitor_team_id, g.status)
+        .join(League, League.id == g.league_id)
+        .where(League.code == league, g.season == season)
+        .order_by(g.date, g.id)
+    ).all()
+    cols = list(zip(*rows)) if rows else [()] * 6
+    return pa.table({
+        "id": pa.array(cols[0], pa.int64()),
+        "ext_id": pa.array(cols[1], pa.string()),
+        "date": _timestamps(pa, cols[2]),
+        "home_team_id": pa.array(cols[3], pa.int64()),
+        "visitor_team_id": pa.array(cols[4], pa.int64()),
+        "status": pa.array(cols[5], pa.string()).dictionary_encode(),
+    })
+
+
+def _read_stats(conn: Connection, league: str, season: int):
+    pa = _pa()
+    st = PlayerGameStat
+    rows = conn.execute(
+        select(st.id, st.player_id, st.game_id, type_coerce(Game.date, String), *(getattr(st, c) for c in STAT_COLUMNS))
+        .join(Game, Game.id == st.game_id)
+        .join(League, League.id == st.league_id)
+        .where(League.code == league, Game.season == season)
+        .order_by(st.player_id, Game.date, st.game_id)
+    ).all()
+    cols = list(zip(*rows)) if rows else [()] * (4 + len(STAT_COLUMNS))
+    data = {
+        "id": pa.array(cols[0], pa.int64()),
+        "player_id": pa.array(cols[1], pa.int64()),
+        "game_id": pa.array(cols[2], pa.int64()),
+        "date": _timestamps(pa, cols[3]),
+    }
+    for i, c in enumerate(STAT_COLUMNS):
+        data[c] = pa.array(cols[4 + i], pa.float64())
+    return pa.table(data)
+
+
+def _read_players(conn: Connection, league: str, season: None):
+    pa = _pa()
+    p = Player
+    rows = conn.execute(
+        select(p.id, p.ext_id, p.first_name, p.last_name, p.position, p.team_id)
+        .join(League, League.id == p.league_id)
+        .where(League.code == league)
+        .order_by(p.id)
+    ).all()
+    cols = list(zip(*rows)) if rows else [()] * 6
+    return pa.table({
+        "id": pa.array(cols[0], pa.int64()),
+        "ext_id": pa.array(cols[1], pa.string()),
+        "first_name": pa.array(cols[2], pa.string()).dictionary_encode(),
+        "last_name": pa.array(cols[3], pa.string()).dictionary_encode(),
+        "position": pa.array(cols[4], pa.string()).dictionary_encode(),
+        "team_id": pa.array(cols[5], pa.int64()),
+    })
+
+
+_TABLE_READERS = {"games": _read_games, "player_game_stats": _read_stats, "players": _read_players}
+
+
+def _timestamps(pa, values: Sequence[str | None]):
+    # games.date comes back from SQLite as ISO text (see features.rolling)
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), format="ISO8601")
+    return pa.array(parsed.to_numpy("datetime64[us]"), pa.timestamp("us"), mask=parsed.isna().to_numpy())
+
+
+def _write(pa, table, directory: Path) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = directory / "part-0.parquet.tmp"
+    pa.parquet.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, directory / "part-0.parquet")
+
+
+def _key(table: str, league: str, season: int | None) -> str:
+    return f"{table}/league={league}" + (f"/season={season}" if season is not None else "")
+
+
+def _parse_key(key: str) -> tuple[str, str, int | None]:
+    table, *parts = key.split("/")
+    values = dict(part.split("=", 1) for part in parts)
+    season = values.get("season")
+    return table, values["league"], int(season) if season is not None else None
+
+
+def _read_manifest(root: Path) -> dict[str, str]:
+    try:
+        data = json.loads((root / MANIFEST).read_text())
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data.get("partitions", {})
+
+
+def _write_manifest(root: Path, partitions: dict[str, str]) -> None:
+    root.mkdir(parents=True, exist_ok=True)
+    tmp = root / (MANIFEST + ".tmp")
+    tmp.write_text(json.dumps({
+        "version": MANIFEST_VERSION,
+        "exported_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "partitions": partitions,
+    }, indent=1, sort_keys=True))
+    os.replace(tmp, root / MANIFEST)
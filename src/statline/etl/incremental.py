@@ -0,0 +1,106 @@
+from __future__ import annotations
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Iterable
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+from ..models import Game, IngestState
+from ..providers.cache import FINAL_STATES
+from ..utils.dates import two_year_window
+
+# games.status values that mean the stored rows will never change again
+FINAL_STATUSES = FINAL_STATES
+# schedule entries that will never get a boxscore under that date
+VOID_STATES = frozenset({"Postponed", "Cancelled"})
+# re-read a couple of days behind the watermark to pick up late schedule changes
+LOOKBACK_DAYS = 2
+
+
+def refresh_window(s: Session, league_id: int, today: date | None = None) -> tuple[date, date]:
+    """
+    Date window to re-read the schedule for: from just before the league watermark
+    (or the start of the two-year window on the first run) through today.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    state = s.query(IngestState).filter_by(league_id=league_id).one_or_none()
+    if state is None:
+        start = two_year_window(datetime.combine(today, datetime.min.time()))[0].date()
+    else:
+        start = state.watermark.date() - timedelta(days=LOOKBACK_DAYS)
+    return start, today
+
+
+def game_date(g: dict[str, Any]) -> datetime | None:
+    raw = g.get("gameDate")
+    if not raw:
+        return None
+    return datetime.fromisoformat(raw.replace("Z", "+00:00"))
+
+
+def is_started(g: dict[str, Any]) -> bool:
+    """Schedule games still in 'Preview' have no boxscore worth fetching yet."""
+    return (g.get("status") or {}).get("abstractGameState") != "Preview"
+
+
+def is_void(g: dict[str, Any]) -> bool:
+    return (g.get("status") or {}).get("detailedState") in VOID_STATES
+
+
+def pending_games(s: Session, league_id: int, scheduled: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Filter schedule games down to the ones that are new, or whose stored status was not final.
+    """
+    scheduled = [g for g in scheduled if is_started(g) and not is_void(g)]
+    stored = _stored_statuses(s, league_id, [str(g["gamePk"]) for g in scheduled])
+    return [g for g in scheduled if stored.get(str(g["gamePk"])) not in FINAL_STATUSES]
+
+
+def live_games(
+    s: Session, league_id: int, scheduled: Iterable[dict[str, Any]], now: datetime, since: timedelta,
+) -> list[dict[str, Any]]:
+    """
+    pending_games limited to games that started within `since` before `now`: the ones
+    in progress or just finished, which is all a game-day poll needs to fetch.
+    """
+    recent = [g for g in scheduled if (d := game_date(g)) is not None and now - since <= d <= now]
+    return pending_games(s, league_id, recent)
+
+
+def advance_watermark(s: Session, league_id: int, scheduled: Iterable[dict[str, Any]], end: date) -> datetime:
+    """
+    Move the league watermark up to the earliest scheduled game that is still not final
+    (or to `end` when everything in the window is final) and commit it.
+    """
+    scheduled = list(scheduled)
+    stored = _stored_statuses(s, league_id, [str(g["gamePk"]) for g in scheduled])
+    open_dates = [
+        d for g in scheduled
+        if not is_void(g)
+        and stored.get(str(g["gamePk"])) not in FINAL_STATUSES
+        and (d := game_date(g)) is not None
+    ]
+    if open_dates:
+        watermark = min(open_dates).replace(tzinfo=None)
+    else:
+        watermark = datetime.combine(end, datetime.min.time())
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    state = s.query(IngestState).filter_by(league_id=league_id).one_or_none()
+    if state is None:
+        s.add(IngestState(league_id=league_id, watermark=watermark, updated_at=now))
+    else:
+        state.watermark = watermark
+        state.updated_at = now
+    s.commit()
+    return watermark
+
+
+def _stored_statuses(s: Session, league_id: int, ext_ids: list[str]) -> dict[str, str]:
+    out: dict[str, str] = {}
+    for i in range(0, len(ext_ids), 500):  # stay under SQLite's bound-parameter limit
+        rows = s.execute(_statuses_stmt(league_id, ext_ids[i:i + 500]))
+        out.update({ext_id: status for ext_id, status in rows})
+    return out
+
+
+def _statuses_stmt(league_id: int, ext_ids: list[str]) -> Select:
+    return select(Game.ext_id, Game.status).where(Game.league_id == league_id, Game.ext_id.in_(ext_ids))
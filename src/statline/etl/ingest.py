@@ -1,78 +1,149 @@
 from __future__ import annotations
-from datetime import datetime
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Iterable
 from sqlalchemy.orm import Session
-from ..db import SessionLocal, engine
-from ..models import Base, League, Team, Player, Game, PlayerGameStat
+from ..db import SessionLocal, get_engine
+from ..metrics import METRICS
+from ..migrations import migrate
+from ..models import League
 from ..providers import nba_balldontlie as nba
+from .bulk import BulkWriter, ensure_league
+from .incremental import FINAL_STATUSES, VOID_STATES, advance_watermark, pending_games, refresh_window
+from .ledger import Ledger
+from .records import GameRecord, PlayerLine, TeamRecord
 
-def bootstrap():
-    Base.metadata.create_all(engine)
-    with SessionLocal() as s:
-        nba_league = s.query(League).filter_by(code="NBA").one_or_none()
-        if not nba_league:
-            nba_league = League(code="NBA", name="National Basketball Association")
-            s.add(nba_league); s.commit()
+# balldontlie stat keys -> PlayerGameStat columns
+_NBA_STATS = {
+    "minutes": "min", "pts": "pts", "reb": "reb", "ast": "ast", "stl": "stl", "blk": "blk",
+    "fga": "fga", "fgm": "fgm", "fg3a": "fg3a", "fg3m": "fg3m", "fta": "fta", "ftm": "ftm",
+    "turnovers": "turnover",
+}
 
-        existing_teams = {t.ext_id: t for t in s.query(Team).filter_by(league_id=nba_league.id).all()}
-        for t in nba.iter_teams():
-            ext_id = str(t["id"])
-            if ext_id not in existing_teams:
-                s.add(Team(league_id=nba_league.id, ext_id=ext_id, name=t["full_name"], abbreviation=t.get("abbreviation")))
-        s.commit()
+def bootstrap(s: Session) -> League:
+    """
+    Tables and the NBA league row. Teams and players are not paged up front: every
+    game and stat row carries its teams and player, and BulkWriter inserts the ids it
+    has not seen yet.
+    """
+    migrate(get_engine())
+    return ensure_league(s, code="NBA", name="National Basketball Association")
 
-        existing_players = {p.ext_id: p for p in s.query(Player).filter_by(league_id=nba_league.id).all()}
-        for p in nba.iter_players():
-            ext_id = str(p["id"])
-            if ext_id not in existing_players:
-                s.add(Player(league_id=nba_league.id, ext_id=ext_id,
-                             first_name=p.get("first_name") or "", last_name=p.get("last_name") or "",
-                             position=p.get("position") or None, team_id=None))
-        s.commit()
+def backfill_nba(seasons: list[int] | None, resume: bool = False):
+    """
+    Backfill NBA seasons from season-wide listings: the games pages plus the stats pages
+    (nba.PER_PAGE player lines per request) instead of one stats request sequence per game.
+    Games that have not tipped off are left to refresh_nba.
+    Every game is checkpointed in the run ledger (etl.ledger); with resume=True the
+    latest unfinished run continues, and seasons it wrote completely are not fetched again.
+    """
+    with SessionLocal() as s:
+        league = bootstrap(s)
+        ledger = Ledger.open(s, league.id, seasons, resume)
+        try:
+            with BulkWriter(s, league.id, ledger=ledger) as writer:
+                for season in ledger.seasons:
+                    scheduled = list(nba.iter_season_games(int(season)))
+                    games = [g for g in scheduled if is_started(g) and not is_void(g) and ledger.pending(g["id"])]
+                    if not games:
+                        print(f"NBA {season}: nothing to write")
+                        continue
+                    # a finished season's stat pages never change; cache them for good
+                    final = all(g.get("status") in FINAL_STATUSES for g in scheduled if not is_void(g))
+                    write_games(writer, games, nba.iter_season_stats(int(season), final=final), f"NBA {season}")
+        except BaseException as e:
+            ledger.finish(s, e)
+            raise
+        ledger.finish(s)
 
-def backfill_nba(seasons: list[int]):
-    bootstrap()
+def refresh_nba(today: date | None = None):
+    """
+    Incremental NBA refresh: read the games from the league watermark through today and
+    fetch stats, by date range, only for games that are new or were not Final last time.
+    """
     with SessionLocal() as s:
-        nba_league = s.query(League).filter_by(code="NBA").one()
-        teams_by_ext = {t.ext_id: t for t in s.query(Team).filter_by(league_id=nba_league.id).all()}
-        players_by_ext = {p.ext_id: p for p in s.query(Player).filter_by(league_id=nba_league.id).all()}
+        league = bootstrap(s)
+        start, end = refresh_window(s, league.id, today)
+        games = {str(g["id"]): g for g in nba.iter_games(start, end)}
+        scheduled = [schedule_entry(g) for g in games.values()]
+        pending = [games[str(e["gamePk"])] for e in pending_games(s, league.id, scheduled)]
+        print(f"NBA {start}..{end}: {len(pending)} of {len(scheduled)} scheduled games need a refresh")
+        if pending:
+            dates = [_game_day(g) for g in pending]
+            with BulkWriter(s, league.id) as writer:
+                write_games(writer, pending, nba.iter_stats(min(dates), max(dates)), f"NBA {start}..{end}")
+        advance_watermark(s, league.id, scheduled, end)
+
+def write_games(writer: BulkWriter, games: list[dict], stats: Iterable[dict], label: str) -> int:
+    """
+    Group bulk stat rows by game and write `games` in date order. A Final game without
+    a single stat row is left unstored (and checkpointed failed) so a later run retries it.
+    """
+    started = time.perf_counter()
+    wanted = {str(g["id"]) for g in games}
+    lines: dict[str, list[dict]] = defaultdict(list)
+    for stat in stats:
+        game_id = str((stat.get("game") or {}).get("id"))
+        if game_id in wanted:
+            lines[game_id].append(stat)
+    written = 0
+    for g in sorted(games, key=_game_day):
+        game_lines = lines.get(str(g["id"]), [])
+        if not game_lines and g.get("status") in FINAL_STATUSES:
+            print(f"⚠️ Skipping game {g['id']}: no stats yet")
+            if writer.ledger is not None:
+                writer.ledger.failed(g["id"], "no stats yet", g.get("season"))
+            continue
+        with METRICS.timer("statline_parse_seconds", league="NBA"):
+            rec = parse_game(g, game_lines)
+        if writer.ledger is not None:
+            writer.ledger.parsed(g["id"], [g, game_lines])
+        writer.write_game(rec)
+        written += 1
+    print(f"{label}: {written} games, {sum(len(v) for v in lines.values())} player lines "
+          f"in {time.perf_counter() - started:.1f}s")
+    return written
+
+def parse_game(g: dict, stats: list[dict]) -> GameRecord:
+    rec = GameRecord(
+        ext_id=str(g["id"]), season=int(g["season"]),
+        date=datetime.fromisoformat((g.get("datetime") or g["date"]).replace("Z","+00:00")),
+        status=g.get("status","Final"),
+        home=_team(g["home_team"]), away=_team(g["visitor_team"]),
+    )
+    for stat in stats:
+        line = _player(stat["player"])
+        if stat.get("team"):
+            line.team_ext = str(stat["team"]["id"])
+        line.stats = {col: _to_float(stat.get(key)) for col, key in _NBA_STATS.items()}
+        rec.lines.append(line)
+    return rec
+
+def is_started(g: dict) -> bool:
+    """balldontlie games are at period 0 (status = tip-off time) until they start."""
+    return bool(g.get("period")) or g.get("status") in FINAL_STATUSES
+
+def is_void(g: dict) -> bool:
+    return g.get("status") in VOID_STATES
+
+def schedule_entry(g: dict) -> dict[str, Any]:
+    """A balldontlie game in the schedule shape etl.incremental reads (gamePk, gameDate, status)."""
+    return {
+        "gamePk": g["id"],
+        "gameDate": g.get("datetime") or g["date"],
+        "status": {"abstractGameState": "Live" if is_started(g) else "Preview", "detailedState": g.get("status")},
+    }
 
-        for season in seasons:
-            for g in nba.iter_season_games(season):
-                game_ext = str(g["id"])
-                game = s.query(Game).filter_by(league_id=nba_league.id, ext_id=game_ext).one_or_none()
-                if not game:
-                    home_ext = str(g["home_team"]["id"]); vis_ext = str(g["visitor_team"]["id"])
-                    game = Game(
-                        league_id=nba_league.id, ext_id=game_ext, season=int(g["season"]),
-                        date=datetime.fromisoformat(g["date"].replace("Z","+00:00")),
-                        home_team_id=teams_by_ext[home_ext].id, visitor_team_id=teams_by_ext[vis_ext].id,
-                        status=g.get("status","Final"),
-                    )
-                    s.add(game); s.flush()
+def _game_day(g: dict) -> date:
+    return date.fromisoformat(g["date"][:10])
 
-                stats = nba.get_game_stats(int(g["id"]))
-                for stat in stats:
-                    p = stat["player"]; p_ext = str(p["id"])
-                    player = players_by_ext.get(p_ext)
-                    if not player:
-                        player = Player(league_id=nba_league.id, ext_id=p_ext,
-                                        first_name=p.get("first_name") or "", last_name=p.get("last_name") or "",
-                                        position=p.get("position") or None, team_id=None)
-                        s.add(player); s.flush(); players_by_ext[p_ext] = player
+def _team(t: dict) -> TeamRecord:
+    return TeamRecord(str(t["id"]), t.get("full_name") or t.get("name") or "", t.get("abbreviation"))
 
-                    exists = s.query(PlayerGameStat).filter_by(league_id=nba_league.id, game_id=game.id, player_id=player.id).one_or_none()
-                    if not exists:
-                        s.add(PlayerGameStat(
-                            league_id=nba_league.id, game_id=game.id, player_id=player.id,
-                            minutes=_to_float(stat.get("min")), pts=_to_float(stat.get("pts")),
-                            reb=_to_float(stat.get("reb")), ast=_to_float(stat.get("ast")),
-                            stl=_to_float(stat.get("stl")), blk=_to_float(stat.get("blk")),
-                            fga=_to_float(stat.get("fga")), fgm=_to_float(stat.get("fgm")),
-                            fg3a=_to_float(stat.get("fg3a")), fg3m=_to_float(stat.get("fg3m")),
-                            fta=_to_float(stat.get("fta")), ftm=_to_float(stat.get("ftm")),
-                            turnovers=_to_float(stat.get("turnover")),
-                        ))
-                s.commit()
+def _player(p: dict) -> PlayerLine:
+    return PlayerLine(str(p["id"]), p.get("first_name") or "", p.get("last_name") or "",
+                      position=p.get("position") or None)
 
 def _to_float(v):
     try:
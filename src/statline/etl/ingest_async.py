@@ -0,0 +1,169 @@
+from __future__ import annotations
+import asyncio
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, TypeVar
+from ..config import settings
+from ..db import SessionLocal, get_engine
+from ..migrations import migrate
+from ..providers import mlb_statsapi as mlb, nhl_statsapi as nhl
+from ..providers.aio import AsyncClient
+from . import ingest_mlb, ingest_nhl
+from .bulk import BulkWriter, ensure_league
+from .fetch import Throughput
+from .incremental import FINAL_STATUSES, is_started, is_void
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_DONE = object()
+_ABORT = object()
+
+
+async def fetch_ordered_async(
+    fetch: Callable[[T], Awaitable[R]],
+    items: Iterable[T],
+    in_flight: int,
+) -> AsyncIterator[tuple[T, R | None, Exception | None]]:
+    """
+    Asyncio counterpart of fetch.fetch_ordered: keeps up to `in_flight` fetches
+    running on the event loop and yields (item, result, error) in input order.
+    """
+    it = iter(items)
+    window: deque = deque()
+
+    def submit(item) -> None:
+        window.append((item, asyncio.ensure_future(fetch(item))))
+
+    for item in it:
+        submit(item)
+        if len(window) >= in_flight:
+            break
+    while window:
+        item, task = window.popleft()
+        nxt = next(it, _DONE)
+        if nxt is not _DONE:
+            submit(nxt)
+        try:
+            yield item, await task, None
+        except Exception as e:
+            yield item, None, e
+
+
+async def write_ordered(
+    db: Executor,
+    open_writer: Callable[[], BulkWriter],
+    rows: AsyncIterator[T],
+    write: Callable[[BulkWriter, T], Any],
+    queue_size: int,
+) -> None:
+    """
+    Hand each of `rows` to write(writer, row) on the single-thread `db` executor
+    through a queue of `queue_size`, so parsing, flushes and commits never block the
+    event loop: fetches keep going while the writer works and pause once the queue is
+    full. The writer is opened there too and, once `rows` runs out, commits (and
+    refreshes features) on the same thread; nothing is committed when `rows` raises.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(queue_size)
+    failed: list[BaseException] = []
+
+    async def consume() -> None:
+        try:
+            writer = await loop.run_in_executor(db, open_writer)
+            while (row := await queue.get()) not in (_DONE, _ABORT):
+                await loop.run_in_executor(db, write, writer, row)
+            if row is _DONE:
+                await loop.run_in_executor(db, writer.__exit__, None, None, None)
+        except BaseException as e:
+            failed.append(e)
+            while await queue.get() not in (_DONE, _ABORT):  # unblock the producer until it stops
+                pass
+            raise
+
+    consumer = asyncio.ensure_future(consume())
+    end = _ABORT
+    try:
+        async for row in rows:
+            if failed:
+                break
+            await queue.put(row)
+        end = _DONE
+    finally:
+        await queue.put(end)
+        await consumer
+
+
+def _db_thread() -> ThreadPoolExecutor:
+    # one thread: the session and its SQLite connection are only ever used from it
+    return ThreadPoolExecutor(1, thread_name_prefix="statline-writer")
+
+
+def backfill_mlb_async(seasons: list[int], in_flight: int | None = None, per_host: int | None = None):
+    """
+    backfill_mlb driven from a single event loop: up to `in_flight` requests are
+    outstanding at once, while parsing and DB writes stay in game order on one writer
+    thread (write_ordered).
+    """
+    asyncio.run(_backfill_mlb(seasons, in_flight or settings.async_in_flight, per_host or settings.async_per_host))
+
+
+def backfill_nhl_async(seasons: list[str], in_flight: int | None = None, per_host: int | None = None):
+    """backfill_nhl driven from a single event loop (see backfill_mlb_async)."""
+    asyncio.run(_backfill_nhl(seasons, in_flight or settings.async_in_flight, per_host or settings.async_per_host))
+
+
+async def _backfill_mlb(seasons: list[int], in_flight: int, per_host: int) -> None:
+    async def fetch(g: dict[str, Any]) -> tuple[dict | None, Any]:
+        game_pk = int(g["gamePk"])
+        feed = await mlb.aget_game_feed(client, game_pk) if ingest_mlb.needs_feed(g) else None
+        status = ingest_mlb._status(g, feed)
+        try:
+            box = await mlb.aget_boxscore(client, game_pk, final=status in FINAL_STATUSES)
+        except Exception as e:
+            box = e
+        return feed, box
+
+    def write(writer: BulkWriter, fetched: tuple) -> None:
+        meter.tick()
+        ingest_mlb.write_fetched(writer, *fetched)
+
+    migrate(get_engine())
+    loop = asyncio.get_running_loop()
+    async with AsyncClient(per_host=per_host, max_connections=in_flight) as client:
+        with _db_thread() as db, SessionLocal() as s:
+            league_id = await loop.run_in_executor(
+                db, lambda: ensure_league(s, code="MLB", name="Major League Baseball").id)
+            for season in seasons:
+                games = [g async for g in mlb.aiter_season_games(client, season) if is_started(g) and not is_void(g)]
+                meter = Throughput(f"MLB {season} (async)")
+                await write_ordered(db, lambda: BulkWriter(s, league_id),
+                                    fetch_ordered_async(fetch, games, in_flight), write, in_flight)
+                print(meter.summary())
+
+
+async def _backfill_nhl(seasons: list[str], in_flight: int, per_host: int) -> None:
+    async def fetch(item: tuple[int, str, Any, str]) -> dict:
+        return await nhl.aget_boxscore(client, item[0], final=item[3] in FINAL_STATUSES)
+
+    def write(writer: BulkWriter, fetched: tuple) -> None:
+        meter.tick()
+        ingest_nhl.write_fetched(writer, *fetched)
+
+    migrate(get_engine())
+    loop = asyncio.get_running_loop()
+    async with AsyncClient(per_host=per_host, max_connections=in_flight) as client:
+        with _db_thread() as db, SessionLocal() as s:
+            league_id = await loop.run_in_executor(
+                db, lambda: ensure_league(s, code="NHL", name="National Hockey League").id)
+            for season in seasons:
+                try:
+                    scheduled = [g async for g in nhl.aiter_season_schedule(client, season)]
+                except Exception as e:
+                    print(f"⚠️ Unable to list NHL schedule for season {season}: {e}")
+                    continue
+                games = [ingest_nhl.schedule_item(g, season) for g in scheduled if is_started(g) and not is_void(g)]
+                meter = Throughput(f"NHL {season} (async)")
+                await write_ordered(db, lambda: BulkWriter(s, league_id),
+                                    fetch_ordered_async(fetch, games, in_flight), write, in_flight)
+                print(meter.summary())
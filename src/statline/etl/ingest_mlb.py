@@ -1,180 +1,217 @@
 from __future__ import annotations
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
+from functools import partial
+from typing import Any, Iterable
 from sqlalchemy.orm import Session
-from ..db import SessionLocal, engine
-from ..models import Base, League, Team, Player, Game, PlayerGameStat
+from ..config import settings
+from ..db import SessionLocal, get_engine
+from ..metrics import METRICS
+from ..migrations import migrate
+from ..models import League
 from ..providers import mlb_statsapi as mlb
+from .bulk import BulkWriter, ensure_league
+from .fetch import Throughput
+from .incremental import (
+    FINAL_STATUSES, refresh_window, pending_games, live_games, advance_watermark, game_date, is_started, is_void,
+)
+from .ledger import Ledger
+from .pipeline import run_pipeline
+from .records import GameRecord, PlayerLine, TeamRecord, split_name
 
 
-def backfill_mlb(seasons: list[int]):
+def needs_feed(g: dict[str, Any]) -> bool:
+    """
+    The schedule already carries start time, teams and status; feed/live (several MB)
+    is only worth downloading when one of those is missing.
+    """
+    teams = g.get("teams") or {}
+    return not (
+        g.get("gameDate")
+        and (teams.get("home") or {}).get("team", {}).get("id")
+        and (teams.get("away") or {}).get("team", {}).get("id")
+    )
+
+
+def _fetch_game(g: dict[str, Any]) -> tuple[dict | None, dict | Exception]:
+    """
+    Download the boxscore (plus feed/live if the schedule entry is incomplete) for one
+    schedule game (runs on fetch workers). A boxscore failure is returned rather than
+    raised so the caller can report it.
+    """
+    game_pk = int(g["gamePk"])
+    feed = mlb.get_game_feed(game_pk) if needs_feed(g) else None
+    status = _status(g, feed)
+    try:
+        box = mlb.get_boxscore(game_pk, final=status in FINAL_STATUSES)
+    except Exception as e:
+        box = e
+    return feed, box
+
+
+def backfill_mlb(seasons: list[int] | None, workers: int = 1, resume: bool = False):
     """
     Backfill MLB data for the given list of seasons.
     Creates teams, players, games, and player stats.
     Skips games gracefully if MLB Stats API returns 404.
+    With workers > 1 payloads are downloaded concurrently; DB writes stay in game order.
+    Every game is checkpointed in the run ledger (etl.ledger); with resume=True the
+    latest unfinished run continues, fetching only games it has not written yet.
+    """
+    migrate(get_engine())
+    with SessionLocal() as s:
+        league = ensure_league(s, code="MLB", name="Major League Baseball")
+        ledger = Ledger.open(s, league.id, seasons, resume)
+        try:
+            for season in ledger.seasons:
+                games = [
+                    g for g in mlb.iter_season_games(int(season))
+                    if is_started(g) and not is_void(g) and ledger.pending(g["gamePk"])
+                ]
+                _ingest_games(s, league, games, workers, label=f"MLB {season}", ledger=ledger)
+        except BaseException as e:
+            ledger.finish(s, e)
+            raise
+        ledger.finish(s)
+
+
+def refresh_mlb(workers: int = 1, today: date | None = None):
+    """
+    Incremental MLB refresh: read the schedule from the league watermark through today
+    and fetch only games that are new or were not stored as Final last time.
     """
-    Base.metadata.create_all(engine)
+    migrate(get_engine())
     with SessionLocal() as s:
-        league = _get_or_create_league(s, code="MLB", name="Major League Baseball")
-
-        for season in seasons:
-            for game_pk in mlb.iter_season_game_ids(season):
-                # Skip games that don't have feed/live available
-                try:
-                    feed = mlb.get_game_feed(game_pk)
-                except Exception as e:
-                    print(f"⚠️ Skipping game {game_pk}: {e}")
-                    continue
-
-                game_data = feed.get("gameData", {})
-                datetime_str = game_data.get("datetime", {}).get("dateTime")
-                if not datetime_str:
-                    continue
-                when = datetime.fromisoformat(datetime_str.replace("Z", "+00:00"))
-
-                teams = game_data.get("teams", {})
-                home = teams.get("home", {})
-                away = teams.get("away", {})
-
-                home_ext = str(home.get("id"))
-                away_ext = str(away.get("id"))
-                home_team = _get_or_create_team(s, league.id, home_ext, home.get("name") or "HOME")
-                away_team = _get_or_create_team(s, league.id, away_ext, away.get("name") or "AWAY")
-
-                game = _get_or_create_game(
-                    s,
-                    league.id,
-                    str(game_pk),
-                    season,
-                    when,
-                    home_team.id,
-                    away_team.id,
-                    status=game_data.get("status", {}).get("detailedState", "Final"),
-                )
-
-                # Boxscore player stats
-                try:
-                    box = mlb.get_boxscore(game_pk)
-                except Exception as e:
-                    print(f"⚠️ Skipping boxscore for game {game_pk}: {e}")
-                    continue
-
-                teams_bx = box.get("teams", {})
-                for side in ("home", "away"):
-                    t = teams_bx.get(side, {})
-                    players = t.get("players", {}) or {}
-                    for pid, pdata in players.items():
-                        person = pdata.get("person", {})
-                        p_ext = str(person.get("id") or "")
-                        if not p_ext:
-                            continue
-                        full = person.get("fullName") or ""
-                        parts = full.split(" ")
-                        first = parts[0] if parts else ""
-                        last = " ".join(parts[1:]) if len(parts) > 1 else ""
-                        player = _get_or_create_player(
-                            s,
-                            league.id,
-                            p_ext,
-                            first,
-                            last or None,
-                            position=None,
-                            team_id=home_team.id if side == "home" else away_team.id,
-                        )
-
-                        batting = (pdata.get("stats", {}) or {}).get("batting") or {}
-                        runs = batting.get("runs") or 0
-                        rbi = batting.get("rbi") or 0
-                        pts = float(runs + rbi)
-
-                        _upsert_stat(s, league.id, game.id, player.id, pts=pts)
-
-                s.commit()
-
-
-# --------------------------
-# Helper functions
-# --------------------------
-
-def _get_or_create_league(s: Session, code: str, name: str) -> League:
-    league = s.query(League).filter_by(code=code).one_or_none()
-    if not league:
-        league = League(code=code, name=name)
-        s.add(league)
-        s.commit()
-    return league
-
-
-def _get_or_create_team(s: Session, league_id: int, ext_id: str, name: str) -> Team:
-    t = s.query(Team).filter_by(league_id=league_id, ext_id=ext_id).one_or_none()
-    if not t:
-        t = Team(league_id=league_id, ext_id=ext_id, name=name, abbreviation=None)
-        s.add(t)
-        s.flush()
-    return t
-
-
-def _get_or_create_player(
-    s: Session,
-    league_id: int,
-    ext_id: str,
-    first: str,
-    last: str | None,
-    position: str | None,
-    team_id: int | None,
-) -> Player:
-    p = s.query(Player).filter_by(league_id=league_id, ext_id=ext_id).one_or_none()
-    if not p:
-        p = Player(
-            league_id=league_id,
-            ext_id=ext_id,
-            first_name=first,
-            last_name=last or "",
-            position=position,
-            team_id=team_id,
-        )
-        s.add(p)
-        s.flush()
-    return p
-
-
-def _get_or_create_game(
-    s: Session,
-    league_id: int,
-    ext_id: str,
-    season: int,
-    date: datetime,
-    home_team_id: int,
-    visitor_team_id: int,
-    status: str,
-) -> Game:
-    g = s.query(Game).filter_by(league_id=league_id, ext_id=ext_id).one_or_none()
-    if not g:
-        g = Game(
-            league_id=league_id,
-            ext_id=ext_id,
-            season=season,
-            date=date,
-            home_team_id=home_team_id,
-            visitor_team_id=visitor_team_id,
-            status=status,
-        )
-        s.add(g)
-        s.flush()
-    return g
-
-
-def _upsert_stat(s: Session, league_id: int, game_id: int, player_id: int, pts: float | None):
-    exists = (
-        s.query(PlayerGameStat)
-        .filter_by(league_id=league_id, game_id=game_id, player_id=player_id)
-        .one_or_none()
+        league = ensure_league(s, code="MLB", name="Major League Baseball")
+        start, end = refresh_window(s, league.id, today)
+        scheduled = list(mlb.iter_schedule(start, end))
+        pending = pending_games(s, league.id, scheduled)
+        print(f"MLB {start}..{end}: {len(pending)} of {len(scheduled)} scheduled games need a refresh")
+        _ingest_games(s, league, pending, workers, label=f"MLB {start}..{end}")
+        advance_watermark(s, league.id, scheduled, end)
+
+
+def poll_mlb(since: timedelta, workers: int = 1, now: datetime | None = None) -> int:
+    """
+    Game-day poll: fetch only MLB games that started within `since` and are not stored
+    as Final yet (in progress or just finished). The watermark is left to refresh_mlb.
+    Returns the number of games fetched.
+    """
+    now = now or datetime.now(timezone.utc)
+    migrate(get_engine())
+    with SessionLocal() as s:
+        league = ensure_league(s, code="MLB", name="Major League Baseball")
+        # schedule dates are US-local, so a late game is listed under the previous day
+        scheduled = list(mlb.iter_schedule((now - since).date() - timedelta(days=1), now.date()))
+        live = live_games(s, league.id, scheduled, now, since)
+        if live:
+            _ingest_games(s, league, live, workers, label="MLB live")
+        return len(live)
+
+
+def _ingest_games(
+    s: Session, league: League, games: Iterable[dict[str, Any]], workers: int, label: str, ledger: Ledger | None = None,
+):
+    """
+    Fetch, parse and bulk-write schedule games as a pipeline (see etl.pipeline),
+    checkpointing each one in `ledger` when given.
+    """
+    meter = Throughput(label)
+    parse = partial(parse_fetched, ledger=ledger) if ledger is not None else parse_fetched
+    with BulkWriter(s, league.id, ledger=ledger) as writer:
+        stats = run_pipeline(games, _fetch_game, parse, writer.write_game, workers, settings.ingest_queue_size)
+    meter.tick(stats.stage("fetch").items)
+
+    print(meter.summary())
+    print(stats.summary())
+
+
+def write_fetched(writer: BulkWriter, g: dict[str, Any], payload, err: Exception | None) -> None:
+    """
+    Parse and write one fetched game (used by the asyncio driver).
+    """
+    rec = parse_fetched(g, payload, err, writer.ledger)
+    if rec is not None:
+        writer.write_game(rec)
+
+
+def parse_fetched(g: dict[str, Any], payload, err: Exception | None, ledger: Ledger | None = None) -> GameRecord | None:
+    """
+    Turn one fetch result into a GameRecord, reporting fetch failures instead of raising
+    (and checkpointing them in `ledger` when given).
+    """
+    game_pk, season = g["gamePk"], g.get("season")
+    # Skip games whose feed/live (when needed) isn't available
+    if err is not None:
+        print(f"⚠️ Skipping game {game_pk}: {err}")
+        if ledger is not None:
+            ledger.failed(game_pk, err, season)
+        return None
+    feed, box = payload
+    # Leave the game unstored so the next refresh retries it
+    if isinstance(box, Exception):
+        print(f"⚠️ Skipping boxscore for game {game_pk}: {box}")
+        if ledger is not None:
+            ledger.failed(game_pk, box, season)
+        return None
+    with METRICS.timer("statline_parse_seconds", league="MLB"):
+        rec = parse_game(g, feed, box)
+    if ledger is not None:
+        if rec is None:
+            ledger.skipped(game_pk, "no game date", season)
+        else:
+            ledger.parsed(game_pk, payload)
+    return rec
+
+
+def parse_game(g: dict[str, Any], feed: dict | None, box: dict) -> GameRecord | None:
+    """
+    Normalize a schedule game (or feed/live, when it had to be fetched) and its
+    boxscore into a GameRecord (runs + RBI as the pts proxy).
+    """
+    if feed is not None:
+        game_data = feed.get("gameData", {})
+        when = game_date({"gameDate": game_data.get("datetime", {}).get("dateTime")})
+        teams = game_data.get("teams", {})
+        home = teams.get("home", {})
+        away = teams.get("away", {})
+    else:
+        when = game_date(g)
+        teams = g.get("teams", {})
+        home = teams.get("home", {}).get("team", {})
+        away = teams.get("away", {}).get("team", {})
+    if when is None:
+        return None
+
+    rec = GameRecord(
+        ext_id=str(g["gamePk"]),
+        season=int(g.get("season") or when.year),
+        date=when,
+        status=_status(g, feed) or "Final",
+        home=TeamRecord(str(home.get("id")), home.get("name") or "HOME"),
+        away=TeamRecord(str(away.get("id")), away.get("name") or "AWAY"),
     )
-    if not exists:
-        s.add(
-            PlayerGameStat(
-                league_id=league_id,
-                game_id=game_id,
-                player_id=player_id,
-                pts=pts,
-            )
-        )
+
+    teams_bx = box.get("teams", {})
+    for side, team in (("home", rec.home), ("away", rec.away)):
+        t = teams_bx.get(side, {})
+        players = t.get("players", {}) or {}
+        for pdata in players.values():
+            person = pdata.get("person", {})
+            p_ext = str(person.get("id") or "")
+            if not p_ext:
+                continue
+            first, last = split_name(person.get("fullName") or "")
+
+            batting = (pdata.get("stats", {}) or {}).get("batting") or {}
+            runs = batting.get("runs") or 0
+            rbi = batting.get("rbi") or 0
+            pts = float(runs + rbi)
+
+            rec.lines.append(PlayerLine(p_ext, first, last, team_ext=team.ext_id, stats={"pts": pts}))
+    return rec
+
+
+def _status(g: dict[str, Any], feed: dict | None) -> str | None:
+    if feed is not None:
+        return feed.get("gameData", {}).get("status", {}).get("detailedState")
+    return (g.get("status") or {}).get("detailedState")
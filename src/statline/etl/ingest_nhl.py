@@ -1,167 +1,192 @@
 from __future__ import annotations
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
+from functools import partial
+from typing import Iterable
 from sqlalchemy.orm import Session
-from ..db import SessionLocal, engine
-from ..models import Base, League, Team, Player, Game, PlayerGameStat
+from ..config import settings
+from ..db import SessionLocal, get_engine
+from ..metrics import METRICS
+from ..migrations import migrate
+from ..models import League
 from ..providers import nhl_statsapi as nhl
+from .bulk import BulkWriter, ensure_league
+from .fetch import Throughput
+from .incremental import (
+    FINAL_STATUSES, refresh_window, pending_games, live_games, advance_watermark, game_date, is_started, is_void,
+)
+from .ledger import Ledger
+from .pipeline import run_pipeline
+from .records import GameRecord, PlayerLine, TeamRecord, split_name
 
 
-def backfill_nhl(seasons: list[str]):
+def backfill_nhl(seasons: list[str] | None, workers: int = 1, resume: bool = False):
     """
     Backfill NHL data for the given list of seasons (e.g., ['20232024', '20242025']).
     Uses provider-level retries and skips gracefully on per-game errors.
+    With workers > 1 boxscores are downloaded concurrently; DB writes stay in game order.
+    Every game is checkpointed in the run ledger (etl.ledger); with resume=True the
+    latest unfinished run continues, fetching only games it has not written yet.
     """
-    Base.metadata.create_all(engine)
+    migrate(get_engine())
     with SessionLocal() as s:
-        league = _get_or_create_league(s, code="NHL", name="National Hockey League")
-
-        for season in seasons:
-            try:
-                game_ids = list(nhl.iter_season_game_ids(season))
-            except Exception as e:
-                print(f"⚠️ Unable to list NHL schedule for season {season}: {e}")
-                continue
-
-            for game_pk in game_ids:
+        league = ensure_league(s, code="NHL", name="National Hockey League")
+        ledger = Ledger.open(s, league.id, seasons, resume)
+        try:
+            for season in ledger.seasons:
                 try:
-                    box = nhl.get_boxscore(game_pk)
+                    scheduled = [
+                        g for g in nhl.iter_season_schedule(season)
+                        if is_started(g) and not is_void(g) and ledger.pending(g["gamePk"])
+                    ]
                 except Exception as e:
-                    print(f"⚠️ Skipping NHL game {game_pk}: {e}")
+                    print(f"⚠️ Unable to list NHL schedule for season {season}: {e}")
+                    ledger.problem(f"NHL schedule {season}: {e}")
                     continue
 
-                teams = box.get("teams", {})
-                home = teams.get("home", {})
-                away = teams.get("away", {})
-                home_team_info = home.get("team") or {}
-                away_team_info = away.get("team") or {}
-
-                home_team = _get_or_create_team(
-                    s, league.id, str(home_team_info.get("id") or f"home-{game_pk}"),
-                    home_team_info.get("name") or "HOME"
-                )
-                away_team = _get_or_create_team(
-                    s, league.id, str(away_team_info.get("id") or f"away-{game_pk}"),
-                    away_team_info.get("name") or "AWAY"
-                )
-
-                # Use season start of Oct 1 as a placeholder date if exact isn't handy.
-                date = datetime.strptime(season[:4] + "-10-01", "%Y-%m-%d").replace(tzinfo=timezone.utc)
-                game = _get_or_create_game(
-                    s, league.id, str(game_pk), int(season[:4]), date,
-                    home_team.id, away_team.id, status="Final"
-                )
-
-                for side_key in ("home", "away"):
-                    skaters = (teams.get(side_key, {}).get("skaters") or [])
-                    players_dict = teams.get(side_key, {}).get("players") or {}
-                    for sk_id in skaters:
-                        pdata = players_dict.get(f"ID{sk_id}") or {}
-                        person = pdata.get("person", {})
-                        p_ext = str(person.get("id") or "")
-                        if not p_ext:
-                            continue
-                        full = person.get("fullName") or ""
-                        parts = full.split(" ")
-                        first = parts[0] if parts else ""
-                        last = " ".join(parts[1:]) if len(parts) > 1 else ""
-                        player = _get_or_create_player(
-                            s, league.id, p_ext, first, last or None, position=None,
-                            team_id=home_team.id if side_key == "home" else away_team.id
-                        )
-
-                        skstats = pdata.get("stats", {}).get("skaterStats") or {}
-                        goals = skstats.get("goals") or 0
-                        assists = skstats.get("assists") or 0
-                        proxy_pts = float(goals + assists)
-                        _upsert_stat(s, league.id, game.id, player.id, pts=proxy_pts)
-
-                s.commit()
-
-
-# --------------------------
-# Helper functions
-# --------------------------
-
-def _get_or_create_league(s: Session, code: str, name: str) -> League:
-    league = s.query(League).filter_by(code=code).one_or_none()
-    if not league:
-        league = League(code=code, name=name)
-        s.add(league)
-        s.commit()
-    return league
-
-
-def _get_or_create_team(s: Session, league_id: int, ext_id: str, name: str) -> Team:
-    t = s.query(Team).filter_by(league_id=league_id, ext_id=ext_id).one_or_none()
-    if not t:
-        t = Team(league_id=league_id, ext_id=ext_id, name=name, abbreviation=None)
-        s.add(t)
-        s.flush()
-    return t
-
-
-def _get_or_create_player(
-    s: Session,
-    league_id: int,
-    ext_id: str,
-    first: str,
-    last: str | None,
-    position: str | None,
-    team_id: int | None,
-) -> Player:
-    p = s.query(Player).filter_by(league_id=league_id, ext_id=ext_id).one_or_none()
-    if not p:
-        p = Player(
-            league_id=league_id,
-            ext_id=ext_id,
-            first_name=first,
-            last_name=last or "",
-            position=position,
-            team_id=team_id,
-        )
-        s.add(p)
-        s.flush()
-    return p
-
-
-def _get_or_create_game(
+                games = (schedule_item(g, season) for g in scheduled)
+                _ingest_games(s, league, games, workers, label=f"NHL {season}", ledger=ledger)
+        except BaseException as e:
+            ledger.finish(s, e)
+            raise
+        ledger.finish(s)
+
+
+def refresh_nhl(workers: int = 1, today: date | None = None):
+    """
+    Incremental NHL refresh: read the schedule from the league watermark through today
+    and fetch only games that are new or were not stored as Final last time.
+    """
+    migrate(get_engine())
+    with SessionLocal() as s:
+        league = ensure_league(s, code="NHL", name="National Hockey League")
+        start, end = refresh_window(s, league.id, today)
+        try:
+            scheduled = list(nhl.iter_schedule(start, end))
+        except Exception as e:
+            print(f"⚠️ Unable to list NHL schedule for {start}..{end}: {e}")
+            return
+        pending = pending_games(s, league.id, scheduled)
+        print(f"NHL {start}..{end}: {len(pending)} of {len(scheduled)} scheduled games need a refresh")
+        games = (schedule_item(g, str(g.get("season") or "")) for g in pending)
+        _ingest_games(s, league, games, workers, label=f"NHL {start}..{end}")
+        advance_watermark(s, league.id, scheduled, end)
+
+
+def poll_nhl(since: timedelta, workers: int = 1, now: datetime | None = None) -> int:
+    """
+    Game-day poll: fetch only NHL games that started within `since` and are not stored
+    as Final yet (in progress or just finished). The watermark is left to refresh_nhl.
+    Returns the number of games fetched.
+    """
+    now = now or datetime.now(timezone.utc)
+    migrate(get_engine())
+    with SessionLocal() as s:
+        league = ensure_league(s, code="NHL", name="National Hockey League")
+        # schedule dates are US-local, so a late game is listed under the previous day
+        scheduled = list(nhl.iter_schedule((now - since).date() - timedelta(days=1), now.date()))
+        live = live_games(s, league.id, scheduled, now, since)
+        if live:
+            games = (schedule_item(g, str(g.get("season") or "")) for g in live)
+            _ingest_games(s, league, games, workers, label="NHL live")
+        return len(live)
+
+
+def schedule_item(g: dict, season: str) -> tuple[int, str, datetime | None, str]:
+    status = (g.get("status") or {}).get("detailedState", "Final")
+    return int(g["gamePk"]), str(g.get("season") or season), game_date(g), status
+
+
+def _fetch_game(item: tuple[int, str, datetime | None, str]) -> dict:
+    game_pk, _, _, status = item
+    return nhl.get_boxscore(game_pk, final=status in FINAL_STATUSES)
+
+
+def _ingest_games(
     s: Session,
-    league_id: int,
-    ext_id: str,
-    season: int,
-    date: datetime,
-    home_team_id: int,
-    visitor_team_id: int,
-    status: str,
-) -> Game:
-    g = s.query(Game).filter_by(league_id=league_id, ext_id=ext_id).one_or_none()
-    if not g:
-        g = Game(
-            league_id=league_id,
-            ext_id=ext_id,
-            season=season,
-            date=date,
-            home_team_id=home_team_id,
-            visitor_team_id=visitor_team_id,
-            status=status,
-        )
-        s.add(g)
-        s.flush()
-    return g
-
-
-def _upsert_stat(s: Session, league_id: int, game_id: int, player_id: int, pts: float | None):
-    exists = (
-        s.query(PlayerGameStat)
-        .filter_by(league_id=league_id, game_id=game_id, player_id=player_id)
-        .one_or_none()
+    league: League,
+    games: Iterable[tuple[int, str, datetime | None, str]],
+    workers: int,
+    label: str,
+    ledger: Ledger | None = None,
+):
+    """
+    Fetch, parse and bulk-write (game_pk, season, date, status) tuples as a pipeline
+    (see etl.pipeline), checkpointing each one in `ledger` when given.
+    """
+    meter = Throughput(label)
+    parse = partial(parse_fetched, ledger=ledger) if ledger is not None else parse_fetched
+    with BulkWriter(s, league.id, ledger=ledger) as writer:
+        stats = run_pipeline(games, _fetch_game, parse, writer.write_game, workers, settings.ingest_queue_size)
+    meter.tick(stats.stage("fetch").items)
+
+    print(meter.summary())
+    print(stats.summary())
+
+
+def write_fetched(writer: BulkWriter, item: tuple[int, str, datetime | None, str], box, err: Exception | None) -> None:
+    """
+    Parse and write one fetched boxscore (used by the asyncio driver).
+    """
+    rec = parse_fetched(item, box, err, writer.ledger)
+    if rec is not None:
+        writer.write_game(rec)
+
+
+def parse_fetched(
+    item: tuple[int, str, datetime | None, str], box, err: Exception | None, ledger: Ledger | None = None,
+) -> GameRecord | None:
+    """
+    Turn one fetch result into a GameRecord, reporting fetch failures instead of raising
+    (and checkpointing them in `ledger` when given).
+    """
+    game_pk, season, when, status = item
+    if err is not None:
+        print(f"⚠️ Skipping NHL game {game_pk}: {err}")
+        if ledger is not None:
+            ledger.failed(game_pk, err, season[:4])
+        return None
+    with METRICS.timer("statline_parse_seconds", league="NHL"):
+        rec = parse_game(game_pk, season, when, status, box)
+    if ledger is not None:
+        ledger.parsed(game_pk, box)
+    return rec
+
+
+def parse_game(game_pk: int, season: str, when: datetime | None, status: str, box: dict) -> GameRecord:
+    """
+    Normalize a boxscore into a GameRecord (skater goals + assists as the pts proxy).
+    """
+    teams = box.get("teams", {})
+    home = teams.get("home", {})
+    away = teams.get("away", {})
+    home_team_info = home.get("team") or {}
+    away_team_info = away.get("team") or {}
+
+    # Use season start of Oct 1 as a placeholder date if exact isn't handy.
+    when = when or datetime.strptime(season[:4] + "-10-01", "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    rec = GameRecord(
+        ext_id=str(game_pk),
+        season=int(season[:4]),
+        date=when,
+        status=status,
+        home=TeamRecord(str(home_team_info.get("id") or f"home-{game_pk}"), home_team_info.get("name") or "HOME"),
+        away=TeamRecord(str(away_team_info.get("id") or f"away-{game_pk}"), away_team_info.get("name") or "AWAY"),
     )
-    if not exists:
-        s.add(
-            PlayerGameStat(
-                league_id=league_id,
-                game_id=game_id,
-                player_id=player_id,
-                pts=pts,
-            )
-        )
+
+    for side_key, team in (("home", rec.home), ("away", rec.away)):
+        skaters = (teams.get(side_key, {}).get("skaters") or [])
+        players_dict = teams.get(side_key, {}).get("players") or {}
+        for sk_id in skaters:
+            pdata = players_dict.get(f"ID{sk_id}") or {}
+            person = pdata.get("person", {})
+            p_ext = str(person.get("id") or "")
+            if not p_ext:
+                continue
+            first, last = split_name(person.get("fullName") or "")
+
+            skstats = pdata.get("stats", {}).get("skaterStats") or {}
+            goals = skstats.get("goals") or 0
+            assists = skstats.get("assists") or 0
+            proxy_pts = float(goals + assists)
+            rec.lines.append(PlayerLine(p_ext, first, last, team_ext=team.ext_id, stats={"pts": proxy_pts}))
+    return rec
@@ -0,0 +1,177 @@
+"""
+Ingest-run ledger: one ingest_runs row per backfill and one ingest_checkpoints row per
+game with its outcome, error and payload hash, so an interrupted backfill resumes
+where it stopped (`statline ingest MLB --resume`) and only failed games are fetched
+again.
+
+Outcomes arrive from the parse thread (failures) and the writer (games written); they
+are buffered here and inserted by BulkWriter.commit in the same transaction as the
+game rows, so an `ok` checkpoint always means the game's stats are committed. A run
+killed mid-transaction loses the checkpoints of its last uncommitted games together
+with their rows, and those games are simply fetched again.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import threading
+from datetime import datetime, timezone
+from typing import Any, Iterable, Sequence
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from ..models import IngestCheckpoint, IngestRun
+from .bulk import _insert
+
+RESUMABLE = ("running", "incomplete", "failed")
+
+
+class NothingToResume(ValueError):
+    pass
+
+
+def payload_hash(payload: Any) -> str:
+    """sha256 of a provider payload as canonical JSON."""
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def latest_resumable(s: Session, league_id: int, seasons: Sequence | None = None) -> IngestRun | None:
+    """The newest run of the league that did not complete (for these seasons, when given)."""
+    q = select(IngestRun).where(IngestRun.league_id == league_id, IngestRun.status.in_(RESUMABLE))
+    if seasons:
+        q = q.where(IngestRun.seasons == _seasons(seasons))
+    return s.scalars(q.order_by(IngestRun.id.desc()).limit(1)).first()
+
+
+def _seasons(seasons: Iterable) -> str:
+    return ",".join(str(x) for x in seasons)
+
+
+class Ledger:
+    def __init__(self, run: IngestRun, done: set[str]):
+        self.run = run
+        self.run_id = run.id
+        self.done = done  # ext_ids checkpointed ok by an earlier attempt of this run
+        self._lock = threading.Lock()
+        self._hashes: dict[str, str] = {}
+        self._rows: dict[str, dict[str, Any]] = {}
+        self.problems: list[str] = []  # failures with no game to checkpoint (schedule listings)
+
+    @classmethod
+    def open(cls, s: Session, league_id: int, seasons: Sequence | None, resume: bool = False) -> "Ledger":
+        """
+        Start a run for `seasons`, or with resume=True continue the latest unfinished
+        one (for `seasons`, or whichever seasons it covered when None).
+        """
+        now = _utcnow()
+        run = latest_resumable(s, league_id, seasons) if resume else None
+        if run is None:
+            if not seasons:
+                raise NothingToResume("Nothing to resume: no unfinished ingest run for this league")
+            if resume:
+                print(f"No unfinished run for seasons {_seasons(seasons)}; starting a new one.")
+            run = IngestRun(league_id=league_id, seasons=_seasons(seasons), status="running",
+                            started_at=now, updated_at=now, resumes=0)
+            s.add(run)
+            s.commit()
+            return cls(run, set())
+        done = set(s.scalars(select(IngestCheckpoint.ext_id).where(
+            IngestCheckpoint.run_id == run.id, IngestCheckpoint.outcome == "ok")))
+        failed = s.scalar(select(func.count()).where(
+            IngestCheckpoint.run_id == run.id, IngestCheckpoint.outcome == "failed"))
+        print(f"Resuming ingest run {run.id} ({run.status}, seasons {run.seasons}): "
+              f"{len(done)} games done, {failed} failed games to retry.")
+        run.status, run.resumes, run.finished_at, run.error = "running", run.resumes + 1, None, None
+        s.commit()
+        return cls(run, done)
+
+    @property
+    def seasons(self) -> list[str]:
+        return self.run.seasons.split(",")
+
+    def pending(self, ext_id: Any) -> bool:
+        """False for games an earlier attempt of this run already wrote."""
+        return str(ext_id) not in self.done
+
+    # ---- outcomes (parse thread and writer) ------------------------------------------
+
+    def parsed(self, ext_id: Any, payload: Any) -> None:
+        digest = payload_hash(payload)
+        with self._lock:
+            self._hashes[str(ext_id)] = digest
+
+    def ok(self, ext_id: Any, season: Any = None) -> None:
+        with self._lock:
+            digest = self._hashes.pop(str(ext_id), None)
+        self._record(ext_id, "ok", season, None, digest)
+
+    def failed(self, ext_id: Any, error: Any, season: Any = None) -> None:
+        self._record(ext_id, "failed", season, str(error), None)
+
+    def skipped(self, ext_id: Any, reason: str, season: Any = None) -> None:
+        self._record(ext_id, "skipped", season, reason, None)
+
+    def problem(self, message: str) -> None:
+        """A failure outside any one game; the run ends incomplete so --resume comes back to it."""
+        self.problems.append(message)
+
+    def _record(self, ext_id: Any, outcome: str, season: Any, error: str | None, digest: str | None) -> None:
+        row = {
+            "run_id": self.run_id, "ext_id": str(ext_id), "season": None if season is None else str(season),
+            "outcome": outcome, "error": error[:500] if error else None, "payload_hash": digest,
+            "attempts": 1, "updated_at": _utcnow(),
+        }
+        with self._lock:
+            self._rows[row["ext_id"]] = row
+
+    # ---- persistence (writer thread) ---------------------------------------------------
+
+    def flush(self, s: Session) -> int:
+        """Upsert buffered checkpoints into the session's transaction (BulkWriter.commit)."""
+        with self._lock:
+            rows, self._rows = list(self._rows.values()), {}
+        if rows:
+            stmt = _insert(s, IngestCheckpoint.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["run_id", "ext_id"],
+                set_={
+                    "outcome": stmt.excluded.outcome, "error": stmt.excluded.error,
+                    "payload_hash": stmt.excluded.payload_hash, "updated_at": stmt.excluded.updated_at,
+                    "season": func.coalesce(stmt.excluded.season, IngestCheckpoint.season),
+                    "attempts": IngestCheckpoint.attempts + 1,
+                },
+            )
+            s.connection().execute(stmt, rows)
+        s.execute(update(IngestRun).where(IngestRun.id == self.run_id).values(updated_at=_utcnow()))
+        return len(rows)
+
+    def finish(self, s: Session, error: BaseException | None = None) -> IngestRun:
+        """
+        Close the run: failed when `error` stopped it, incomplete when some games failed
+        (resume retries them), complete otherwise. Prints the outcome counts.
+        """
+        if error is None:
+            self.flush(s)
+        else:
+            # buffered oks may describe rows that were never committed; those games are redone
+            s.rollback()
+            with self._lock:
+                self._rows.clear()
+        counts = dict(s.execute(
+            select(IngestCheckpoint.outcome, func.count())
+            .where(IngestCheckpoint.run_id == self.run_id).group_by(IngestCheckpoint.outcome)
+        ).all())
+        run = s.get(IngestRun, self.run_id)
+        run.games_ok, run.games_failed, run.games_skipped = (counts.get(k, 0) for k in ("ok", "failed", "skipped"))
+        run.status = "failed" if error is not None else "incomplete" if run.games_failed or self.problems else "complete"
+        run.error = (repr(error) if error is not None else "; ".join(self.problems))[:500] or None
+        run.finished_at = run.updated_at = _utcnow()
+        s.commit()
+        line = f"Ingest run {run.id} {run.status}: {run.games_ok} ok, {run.games_failed} failed, {run.games_skipped} skipped"
+        if run.status != "complete":
+            line += " (rerun with --resume to continue)"
+        print(line)
+        return run
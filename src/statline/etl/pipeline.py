@@ -0,0 +1,171 @@
+from __future__ import annotations
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, TypeVar
+from ..metrics import METRICS
+from .fetch import fetch_ordered
+
+T = TypeVar("T")
+R = TypeVar("R")
+Rec = TypeVar("Rec")
+
+DEFAULT_QUEUE_SIZE = 256
+_POLL = 0.1  # seconds between stop checks while blocked on a queue
+_END = object()
+
+
+@dataclass
+class _Failed:
+    error: BaseException
+
+
+@dataclass
+class StageStats:
+    """Work done by one pipeline stage and the depth of the queue feeding it."""
+
+    name: str
+    threads: int = 1
+    items: int = 0
+    busy_s: float = 0.0
+    max_depth: int = 0
+    depth_sum: int = 0
+    samples: int = 0
+
+    def sample(self, depth: int) -> None:
+        self.max_depth = max(self.max_depth, depth)
+        self.depth_sum += depth
+        self.samples += 1
+
+    def summary(self, elapsed: float) -> str:
+        rate = self.items / elapsed if elapsed > 0 else 0.0
+        util = self.busy_s / (elapsed * self.threads) if elapsed > 0 else 0.0
+        line = f"{self.name}: {self.items} items, {rate:.2f}/s, busy {self.busy_s:.1f}s ({util:.0%})"
+        if self.samples:
+            line += f", input queue max {self.max_depth} avg {self.depth_sum / self.samples:.1f}"
+        return line
+
+
+@dataclass
+class PipelineStats:
+    stages: list[StageStats]
+    elapsed: float = 0.0
+
+    def stage(self, name: str) -> StageStats:
+        return next(st for st in self.stages if st.name == name)
+
+    def summary(self) -> str:
+        return "\n".join("  " + st.summary(self.elapsed) for st in self.stages)
+
+
+def run_pipeline(
+    items: Iterable[T],
+    fetch: Callable[[T], R],
+    parse: Callable[[T, R | None, Exception | None], Rec | None],
+    write: Callable[[Rec], None],
+    workers: int = 1,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+) -> PipelineStats:
+    """
+    Run ingestion as three overlapping stages joined by bounded queues:
+
+        fetch (N threads, fetch_ordered) -> parse (1 thread) -> write (calling thread)
+
+    `parse(item, result, error)` turns a fetched payload into a record, or None to skip
+    it; `write` runs on the calling thread so it can own the SQLAlchemy session. Full
+    queues block the stage upstream, so at most ~2 * queue_size games are held in memory.
+    Records reach `write` in input order. An exception in any stage stops the others
+    and is re-raised here.
+    """
+    fetched: queue.Queue = queue.Queue(maxsize=queue_size)
+    parsed: queue.Queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    stats = PipelineStats([StageStats("fetch", threads=max(1, workers)), StageStats("parse"), StageStats("write")])
+    f_stats, p_stats, w_stats = stats.stages
+    lock = threading.Lock()
+
+    def timed_fetch(item: T) -> R:
+        started = time.perf_counter()
+        try:
+            return fetch(item)
+        finally:
+            with lock:
+                f_stats.busy_s += time.perf_counter() - started
+
+    def fetch_stage() -> None:
+        try:
+            for out in fetch_ordered(timed_fetch, items, workers):
+                f_stats.items += 1
+                if not _put(fetched, out, stop):
+                    return
+        except BaseException as e:
+            _put(fetched, _Failed(e), stop)
+            return
+        _put(fetched, _END, stop)
+
+    def parse_stage() -> None:
+        while True:
+            p_stats.sample(fetched.qsize())
+            out = _get(fetched, stop)
+            if out is _END or isinstance(out, _Failed):
+                _put(parsed, out, stop)
+                return
+            started = time.perf_counter()
+            try:
+                rec = parse(*out)
+            except BaseException as e:
+                _put(parsed, _Failed(e), stop)
+                return
+            p_stats.busy_s += time.perf_counter() - started
+            p_stats.items += 1
+            if rec is not None and not _put(parsed, rec, stop):
+                return
+
+    threads = [
+        threading.Thread(target=fetch_stage, name="statline-pipeline-fetch", daemon=True),
+        threading.Thread(target=parse_stage, name="statline-pipeline-parse", daemon=True),
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    try:
+        while True:
+            w_stats.sample(parsed.qsize())
+            rec = _get(parsed, stop)
+            if rec is _END:
+                break
+            if isinstance(rec, _Failed):
+                raise rec.error
+            t0 = time.perf_counter()
+            write(rec)
+            w_stats.busy_s += time.perf_counter() - t0
+            w_stats.items += 1
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+        stats.elapsed = time.perf_counter() - started
+        for st in stats.stages:
+            METRICS.inc("statline_pipeline_busy_seconds_total", st.busy_s, stage=st.name)
+            METRICS.inc("statline_pipeline_items_total", st.items, stage=st.name)
+    return stats
+
+
+def _put(q: queue.Queue, value, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(value, timeout=_POLL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL)
+        except queue.Empty:
+            continue
+    return _END
@@ -0,0 +1,47 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+# PlayerGameStat columns a provider may fill in
+STAT_COLUMNS = (
+    "minutes", "pts", "reb", "ast", "stl", "blk",
+    "fga", "fgm", "fg3a", "fg3m", "fta", "ftm", "turnovers",
+)
+
+
+@dataclass(frozen=True)
+class TeamRecord:
+    ext_id: str
+    name: str
+    abbreviation: Optional[str] = None
+
+
+@dataclass
+class PlayerLine:
+    """One player's box-score line for a game, keyed by provider ids."""
+    ext_id: str
+    first_name: str
+    last_name: str
+    position: Optional[str] = None
+    team_ext: Optional[str] = None
+    stats: dict[str, Optional[float]] = field(default_factory=dict)
+
+
+@dataclass
+class GameRecord:
+    """A provider game normalized into plain values, ready for the bulk writer."""
+    ext_id: str
+    season: int
+    date: datetime
+    status: str
+    home: TeamRecord
+    away: TeamRecord
+    lines: list[PlayerLine] = field(default_factory=list)
+
+
+def split_name(full: str) -> tuple[str, str]:
+    parts = (full or "").split(" ")
+    first = parts[0] if parts else ""
+    last = " ".join(parts[1:]) if len(parts) > 1 else ""
+    return first, last
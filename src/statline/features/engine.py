@@ -0,0 +1,271 @@
+from __future__ import annotations
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Sequence
+import numpy as np
+import pandas as pd
+from sqlalchemy import Connection, Engine, String, select, type_coerce
+from ..db import get_engine
+from ..defaults import AGGREGATORS, DEFAULT_WINDOWS
+from ..etl.records import STAT_COLUMNS
+from ..models import Game, PlayerGameStat
+from .materialized import min_periods
+
+_EWM_LOG_SCALE = 300.0  # ewm blocks keep decay weights within e**300
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    stat: str
+    window: int
+    agg: str
+
+    @property
+    def name(self) -> str:
+        return f"{self.stat}_{self.agg}_{self.window}"
+
+
+def build_specs(
+    stats: Sequence[str],
+    windows: Sequence[int] = DEFAULT_WINDOWS,
+    aggs: Sequence[str] = AGGREGATORS,
+) -> list[FeatureSpec]:
+    """Cartesian product of stats x windows x aggregators, validated."""
+    for stat in stats:
+        if stat not in STAT_COLUMNS:
+            raise ValueError(f"Unknown stat {stat!r}; expected one of {STAT_COLUMNS}")
+    for agg in aggs:
+        if agg not in AGGREGATORS:
+            raise ValueError(f"Unknown aggregator {agg!r}; expected one of {AGGREGATORS}")
+    for w in windows:
+        if w < 1:
+            raise ValueError(f"Window must be >= 1, got {w}")
+    return [FeatureSpec(st, w, agg) for st in stats for w in windows for agg in aggs]
+
+
+@dataclass
+class FeatureMatrix:
+    """Row keys (player_id, game_id, date) plus a float32 feature matrix, one column per spec."""
+
+    keys: pd.DataFrame
+    values: np.ndarray
+    columns: list[str]
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.concat([self.keys, pd.DataFrame(self.values, columns=self.columns, index=self.keys.index)], axis=1)
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            player_id=self.keys["player_id"].to_numpy(),
+            game_id=self.keys["game_id"].to_numpy(),
+            date=self.keys["date"].to_numpy(dtype="datetime64[ns]"),
+            values=self.values,
+            columns=np.array(self.columns),
+        )
+
+
+def build_features(
+    specs: Sequence[FeatureSpec],
+    league_id: int | None = None,
+    seasons: Sequence[int] | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    bind: Engine | Connection | None = None,
+    df: pd.DataFrame | None = None,
+) -> FeatureMatrix:
+    """
+    Load the needed stat columns once, sorted by (player_id, date, game_id), and compute
+    every spec with compute_features. As with features.rolling, windows see the league's
+    history up to `end`; `seasons`/`start` only select the rows returned. `df` replaces
+    the SQLite load with a frame of the same shape (e.g. etl.export.read_stats).
+    """
+    stats = sorted({sp.stat for sp in specs})
+    if df is None:
+        df = load_stats(stats, league_id, end, bind)
+    elif end is not None:
+        df = df[df["date"] <= pd.Timestamp(end).tz_localize(None)].reset_index(drop=True)
+    fm = compute_features(df, specs)
+    keep = np.ones(len(df), dtype=bool)
+    if seasons:
+        keep &= df["season"].isin(list(seasons)).to_numpy()
+    if start is not None:
+        keep &= (df["date"] >= pd.Timestamp(start).tz_localize(None)).to_numpy()
+    if keep.all():
+        return fm
+    return FeatureMatrix(fm.keys.loc[keep].reset_index(drop=True), fm.values[keep], fm.columns)
+
+
+def load_stats(
+    stats: Sequence[str],
+    league_id: int | None = None,
+    end: datetime | None = None,
+    bind: Engine | Connection | None = None,
+) -> pd.DataFrame:
+    """player_id, game_id, date, season and `stats` as typed columns, sorted by player and date."""
+    q = (
+        select(
+            PlayerGameStat.player_id, PlayerGameStat.game_id, type_coerce(Game.date, String), Game.season,
+            *(getattr(PlayerGameStat, st) for st in stats),
+        )
+        .join(Game, Game.id == PlayerGameStat.game_id)
+        .order_by(PlayerGameStat.player_id, Game.date, PlayerGameStat.game_id)
+    )
+    if league_id is not None:
+        q = q.where(PlayerGameStat.league_id == league_id)
+    if end is not None:
+        q = q.where(Game.date <= end)
+    bind = bind if bind is not None else get_engine()
+    with bind.connect() if isinstance(bind, Engine) else nullcontext(bind) as conn:
+        rows = conn.execute(q).all()
+    cols = list(zip(*rows)) if rows else [()] * (4 + len(stats))
+    data = {
+        "player_id": np.array(cols[0], dtype=np.int64),
+        "game_id": np.array(cols[1], dtype=np.int64),
+        "date": pd.to_datetime(pd.Series(cols[2], dtype=object), format="ISO8601"),
+        "season": np.array(cols[3], dtype=np.int64),
+    }
+    for i, st in enumerate(stats):
+        data[st] = np.array(cols[4 + i], dtype=np.float64)
+    return pd.DataFrame(data)
+
+
+def compute_features(df: pd.DataFrame, specs: Sequence[FeatureSpec]) -> FeatureMatrix:
+    """
+    Compute every spec over a frame already sorted by (player_id, date). Each player's
+    games form one contiguous segment; windows are the last `window` rows of the
+    segment, NaN stats are skipped, and a feature is NaN until its window holds
+    min_periods(window) values (as pandas rolling/ewm would give per player).
+    All stats are processed together as one contiguous (stats x rows) array, and the
+    result is written column by column into a Fortran-ordered float32 matrix.
+    """
+    n = len(df)
+    seg_start = _segment_starts(df["player_id"].to_numpy())
+    stats = sorted({sp.stat for sp in specs})
+    col = {st: i for i, st in enumerate(stats)}
+    x = np.ascontiguousarray(df[stats].to_numpy(dtype=np.float64).reshape(n, len(stats)).T)
+    valid = ~np.isnan(x)
+    xz = np.where(valid, x, 0.0)
+    cs, cs2, cn = _cumsum0(xz), _cumsum0(xz * xz), _cumsum0(valid.astype(np.float64))
+    extrema = _SparseExtrema(x, seg_start) if {"min", "max"} & {sp.agg for sp in specs} else None
+
+    out = np.empty((n, len(specs)), dtype=np.float32, order="F")
+    by_window: dict[int, list[int]] = {}
+    for j, sp in enumerate(specs):
+        by_window.setdefault(sp.window, []).append(j)
+    rows = np.arange(n)
+    for w, idxs in by_window.items():
+        lo = np.maximum(rows - (w - 1), seg_start)
+        count = cn[:, 1:] - cn[:, lo]
+        total = cs[:, 1:] - cs[:, lo]
+        aggs = {specs[j].agg for j in idxs}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result: dict[str, np.ndarray] = {"mean": total / count}
+            if "std" in aggs:
+                var = (cs2[:, 1:] - cs2[:, lo] - total * result["mean"]) / (count - 1)
+                result["std"] = np.where(count >= 2, np.sqrt(np.maximum(var, 0.0)), np.nan)
+            if "min" in aggs or "max" in aggs:
+                result["min"], result["max"] = extrema.window(w)
+            if "ewm" in aggs:
+                result["ewm"] = _ewm(xz, valid, seg_start, 2.0 / (w + 1.0))
+        enough = count >= min_periods(w)
+        for j in idxs:
+            i = col[specs[j].stat]
+            out[:, j] = np.where(enough[i], result[specs[j].agg][i], np.nan)
+    keys = df[["player_id", "game_id", "date"]].reset_index(drop=True)
+    return FeatureMatrix(keys, out, [sp.name for sp in specs])
+
+
+def _segment_starts(player: np.ndarray) -> np.ndarray:
+    """Index of the first row of each row's player segment."""
+    n = len(player)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    boundary = np.empty(n, dtype=bool)
+    boundary[0] = True
+    boundary[1:] = player[1:] != player[:-1]
+    return np.maximum.accumulate(np.where(boundary, np.arange(n), 0))
+
+
+def _cumsum0(a: np.ndarray) -> np.ndarray:
+    """Cumulative sum along rows with a leading zero column: sum of a[:, i:j] = c[:, j] - c[:, i]."""
+    out = np.zeros(a.shape[:-1] + (a.shape[-1] + 1,), dtype=np.float64)
+    np.cumsum(a, axis=-1, out=out[..., 1:])
+    return out
+
+
+def _shift(a: np.ndarray, k: int, seg_start: np.ndarray) -> np.ndarray:
+    """a shifted k rows later within each player segment, NaN where that leaves the segment."""
+    out = np.full_like(a, np.nan)
+    if k < a.shape[-1]:
+        inside = np.arange(k, a.shape[-1]) - k >= seg_start[k:]
+        out[..., k:] = np.where(inside, a[..., :-k] if k else a, np.nan)
+    return out
+
+
+class _SparseExtrema:
+    """
+    Trailing NaN-skipping min/max for any window from a sparse table: level p holds the
+    extrema of the last 2**p rows, so a window of w rows is two overlapping lookups and
+    every window costs O(log w) vectorized passes in total.
+    """
+
+    def __init__(self, x: np.ndarray, seg_start: np.ndarray):
+        self.seg_start = seg_start
+        self.levels: list[tuple[np.ndarray, np.ndarray]] = [(x, x)]
+
+    def _level(self, p: int) -> tuple[np.ndarray, np.ndarray]:
+        while len(self.levels) <= p:
+            half = 1 << (len(self.levels) - 1)
+            lo, hi = self.levels[-1]
+            self.levels.append((
+                np.fmin(lo, _shift(lo, half, self.seg_start)),
+                np.fmax(hi, _shift(hi, half, self.seg_start)),
+            ))
+        return self.levels[p]
+
+    def window(self, w: int) -> tuple[np.ndarray, np.ndarray]:
+        p = w.bit_length() - 1
+        lo, hi = self._level(p)
+        rest = w - (1 << p)
+        if rest == 0:
+            return lo, hi
+        return (
+            np.fmin(lo, _shift(lo, rest, self.seg_start)),
+            np.fmax(hi, _shift(hi, rest, self.seg_start)),
+        )
+
+
+def _ewm(xz: np.ndarray, valid: np.ndarray, seg_start: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Per-player exponentially weighted mean with span = window (pandas ewm(span, adjust=True)).
+    num_i = r * num_{i-1} + x_i and den_i = r * den_{i-1} + 1 (both reset at segment starts)
+    are evaluated as cumulative sums of r**-k weighted terms in blocks short enough that
+    r**-k cannot overflow, carrying the state of the segment that spans each block edge.
+    """
+    n = xz.shape[-1]
+    r = 1.0 - alpha
+    if r <= 0.0:
+        return np.where(valid, xz, np.nan)
+    block = max(1, int(_EWM_LOG_SCALE / -np.log(r)))
+    ewm = np.empty_like(xz)
+    carry_num = np.zeros(xz.shape[:-1])
+    carry_den = np.zeros(xz.shape[:-1])
+    validf = valid.astype(np.float64)
+    for b in range(0, n, block):
+        e = min(n, b + block)
+        k = np.arange(e - b, dtype=np.float64)
+        grow, decay = r ** -k, r ** k
+        num_c = _cumsum0(grow * xz[:, b:e])
+        den_c = _cumsum0(grow * validf[:, b:e])
+        local = np.maximum(seg_start[b:e], b) - b
+        num = decay * (num_c[:, 1:] - num_c[:, local])
+        den = decay * (den_c[:, 1:] - den_c[:, local])
+        spans = seg_start[b:e] < b
+        num += np.where(spans, r * decay, 0.0) * carry_num[:, None]
+        den += np.where(spans, r * decay, 0.0) * carry_den[:, None]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ewm[:, b:e] = num / den
+        carry_num, carry_den = num[:, -1], den[:, -1]
+    return ewm
@@ -0,0 +1,234 @@
+"""
+Point lookups of materialized rolling features, for `statline serve` and notebooks
+that screen a handful of players instead of loading whole feature tables:
+
+    lookup = FeatureLookup(read_only_engine())
+    lookup.get("NBA", 123)                        # latest features of player 123
+    lookup.get("NBA", 123, game_id=456)           # as of game 456: earlier games only
+    lookup.get_many("NBA", [(123, 456), (124, 456), (125, None)])
+
+Answers are kept in an LRU cache keyed by (league, player, game). Misses are answered
+in batches: per distinct as-of date, one prepared statement per materialized
+(stat, window), answered from seeks on ix_rolling_league_stat_window_player_date.
+
+Every ingest commit that changes a league's stats or features bumps its
+stats_versions row (etl.bulk.mark_stats_changed). The lookup reads those versions at
+most every `check_every` seconds and drops a league's cached answers when its version
+moved, so a cached answer is never more than `check_every` seconds stale.
+"""
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Hashable, Iterable
+from sqlalchemy import Engine, bindparam, func, select
+from ..config import settings
+from ..db import SessionLocal
+from ..metrics import METRICS
+from ..models import Game, League, PlayerRollingFeature, StatsVersion
+from ..utils.iters import chunks
+from .materialized import feature_specs
+
+# lookup latencies are mostly cache hits, far below the ingest timing buckets
+LOOKUP_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.25)
+_IN_CHUNK = 500  # player / game ids per IN (...)
+
+
+@dataclass(frozen=True)
+class Features:
+    player_id: int
+    game_id: int | None                 # the game asked about; None = latest
+    values: dict[str, float] = field(default_factory=dict)  # "<stat>_<window>" -> trailing mean
+    as_of: datetime | None = None       # date of the newest game behind the values
+    as_of_game_id: int | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "player_id": self.player_id, "game_id": self.game_id, "features": self.values,
+            "as_of": self.as_of.isoformat() if self.as_of else None, "as_of_game_id": self.as_of_game_id,
+        }
+
+
+class LRUCache:
+    """Thread-safe least-recently-used map with hit/miss/eviction counters."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def drop(self, predicate: Callable[[Hashable], bool]) -> int:
+        with self._lock:
+            stale = [k for k in self._data if predicate(k)]
+            for k in stale:
+                del self._data[k]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "invalidations": self.invalidations}
+
+
+_f = PlayerRollingFeature
+
+
+def _latest_stmt(as_of: bool):
+    # Rows of one (stat, window) whose date is some requested player's newest date
+    # (optionally before an as-of date); the caller keeps each player's newest row.
+    # Both halves are seeks on ix_rolling_league_stat_window_player_date whatever the
+    # planner statistics say, unlike a join against the grouped subquery.
+    where = [
+        _f.league_id == bindparam("league_id"), _f.stat == bindparam("stat"), _f.window == bindparam("window"),
+        _f.player_id.in_(bindparam("player_ids", expanding=True)),
+    ]
+    if as_of:
+        where.append(_f.date < bindparam("before"))
+    newest = select(func.max(_f.date)).where(*where).group_by(_f.player_id)
+    return select(_f.player_id, _f.value, _f.game_id, _f.date).where(*where, _f.date.in_(newest))
+
+
+_LATEST = _latest_stmt(as_of=False)
+_LATEST_BEFORE = _latest_stmt(as_of=True)
+_GAME_DATES = select(Game.id, Game.date).where(Game.league_id == bindparam("league_id"),
+                                               Game.id.in_(bindparam("game_ids", expanding=True)))
+_VERSIONS = select(StatsVersion.league_id, StatsVersion.version)
+
+
+class FeatureLookup:
+    """Cached latest / as-of-game rolling features per player over `bind` (ideally db.read_only_engine())."""
+
+    def __init__(
+        self,
+        bind: Engine,
+        cache_size: int = settings.serve_cache_size,
+        check_every: float = settings.serve_check_seconds,
+        specs: list[tuple[str, int]] | None = None,
+    ):
+        self.bind = bind
+        self.specs = specs or feature_specs()
+        self.cache = LRUCache(cache_size)
+        self.check_every = check_every
+        self._leagues: dict[str, int] = {}
+        self._versions: dict[int, int] = {}
+        self._next_check = 0.0
+        self._check_lock = threading.Lock()
+        self.check_versions()
+
+    def get(self, league: str, player_id: int, game_id: int | None = None) -> Features:
+        return self.get_many(league, [(player_id, game_id)])[0]
+
+    def get_many(self, league: str, keys: Iterable[tuple[int, int | None]]) -> list[Features]:
+        """Features for each (player_id, game_id or None), in order; misses are loaded in one batch."""
+        started = time.perf_counter()
+        self.check_versions()
+        league_id = self.league_id(league)
+        keys = [(int(p), None if g is None else int(g)) for p, g in keys]
+        found: dict[tuple[int, int | None], Features] = {}
+        missing = []
+        for key in keys:
+            hit = self.cache.get((league_id, *key))
+            if hit is None:
+                missing.append(key)
+            else:
+                found[key] = hit
+        if missing:
+            loaded = self._load(league_id, sorted(set(missing), key=lambda k: (k[1] or 0, k[0])))
+            for key, feats in loaded.items():
+                self.cache.put((league_id, *key), feats)
+            found.update(loaded)
+        METRICS.inc("statline_lookup_cache_total", len(keys) - len(missing), outcome="hit")
+        METRICS.inc("statline_lookup_cache_total", len(missing), outcome="miss")
+        METRICS.observe("statline_lookup_seconds", time.perf_counter() - started, LOOKUP_BUCKETS,
+                        cache="miss" if missing else "hit")
+        return [found[key] for key in keys]
+
+    def league_id(self, code: str) -> int:
+        code = code.upper()
+        if code not in self._leagues:
+            with SessionLocal(bind=self.bind) as s:
+                league_id = s.scalar(select(League.id).where(League.code == code))
+            if league_id is None:
+                raise ValueError(f"League {code} has no data; run ingest first.")
+            self._leagues[code] = league_id
+        return self._leagues[code]
+
+    def check_versions(self, force: bool = False) -> list[int]:
+        """
+        Re-read stats_versions when `check_every` has passed (or `force`), dropping the
+        cached answers of every league whose version moved. Returns those league ids.
+        """
+        if not force and time.monotonic() < self._next_check:
+            return []
+        with self._check_lock:
+            if not force and time.monotonic() < self._next_check:
+                return []
+            with SessionLocal(bind=self.bind) as s:
+                versions = dict(s.execute(_VERSIONS).all())
+            moved = [lg for lg in versions.keys() | self._versions.keys() if versions.get(lg) != self._versions.get(lg)]
+            if moved and self._versions:
+                ids = set(moved)
+                self.cache.drop(lambda key: key[0] in ids)
+            self._versions = versions
+            self._next_check = time.monotonic() + self.check_every
+        return moved
+
+    def _load(self, league_id: int, keys: list[tuple[int, int | None]]) -> dict[tuple[int, int | None], Features]:
+        params = {"league_id": league_id}
+        with SessionLocal(bind=self.bind) as s:
+            game_ids = sorted({g for _, g in keys if g is not None})
+            dates: dict[int, datetime] = {}
+            for chunk in chunks(game_ids, _IN_CHUNK):
+                dates.update(s.execute(_GAME_DATES, {**params, "game_ids": chunk}).all())
+            # players sharing an as-of date (latest, or one game's start) share one statement per spec
+            groups: dict[datetime | None, set[int]] = {}
+            for p, g in keys:
+                if g is None or g in dates:
+                    groups.setdefault(None if g is None else dates[g], set()).add(p)
+            rows: dict[tuple[int, datetime | None], list[tuple]] = {}
+            for before, players in groups.items():
+                stmt = _LATEST if before is None else _LATEST_BEFORE
+                for stat, window in self.specs:
+                    for chunk in chunks(sorted(players), _IN_CHUNK):
+                        bound = {**params, "stat": stat, "window": window, "player_ids": chunk, "before": before}
+                        newest: dict[int, tuple] = {}
+                        for player_id, value, game_id, date in s.execute(stmt, bound):
+                            if player_id not in newest or (date, game_id) > newest[player_id][1:]:
+                                newest[player_id] = (value, date, game_id)
+                        for player_id, (value, date, game_id) in newest.items():
+                            rows.setdefault((player_id, before), []).append((f"{stat}_{window}", value, game_id, date))
+        out = {}
+        for p, g in keys:
+            before = None if g is None else dates.get(g)
+            found = rows.get((p, before), []) if g is None or g in dates else []
+            newest = max(found, key=lambda r: (r[3], r[2]), default=None)
+            out[(p, g)] = Features(
+                p, g, {name: value for name, value, _, _ in found},
+                newest[3] if newest else None, newest[2] if newest else None,
+            )
+        return out
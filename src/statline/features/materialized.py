@@ -0,0 +1,196 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Iterable
+import pandas as pd
+from sqlalchemy import Select, delete, func, insert, or_, select, tuple_
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..etl.bulk import mark_stats_changed
+from ..etl.records import STAT_COLUMNS
+from ..models import Game, PlayerGameStat, PlayerRollingFeature
+from ..shards import ShardMap, mark_modified, route
+from ..utils.iters import chunks
+from .rolling import rolling_sql
+
+_PLAYER_CHUNK = 500  # player ids per IN (...) when recomputing
+
+
+def feature_specs() -> list[tuple[str, int]]:
+    """(stat, window) pairs kept up to date by ingest: FEATURE_STATS x FEATURE_WINDOWS."""
+    stats = [st.strip() for st in settings.feature_stats.split(",") if st.strip()]
+    windows = [int(w) for w in settings.feature_windows.split(",") if w.strip()]
+    specs = [(st, w) for st in stats for w in windows]
+    _check(specs)
+    return specs
+
+
+def min_periods(window: int) -> int:
+    return max(1, window // 2)
+
+
+def update_rolling_features(
+    s: Session,
+    league_id: int,
+    player_ids: Iterable[int],
+    since: datetime | None = None,
+    specs: list[tuple[str, int]] | None = None,
+) -> int:
+    """
+    Recompute the trailing windows of `player_ids` for every game on or after `since`
+    (all games when None), reading only those games plus the window - 1 games before
+    them. Earlier feature rows cannot change, so the cost follows the new data rather
+    than the stored history. Rows are written to the shard of their game's season when
+    the database is sharded. Returns the number of feature rows written; the caller commits.
+    """
+    specs = specs or feature_specs()
+    ids = sorted(set(player_ids))
+    if not ids or not specs:
+        return 0
+    since = _naive(since)
+    stats = sorted({st for st, _ in specs})
+    lookback = max(w for _, w in specs) - 1
+    table = PlayerRollingFeature.__table__
+    shards = ShardMap(s, league_id)
+    written = 0
+    for chunk in chunks(ids, _PLAYER_CHUNK):
+        df = _load_history(s, chunk, stats, since, lookback)
+        rows = rolling_rows(df, specs, since)
+        stale = delete(table).where(
+            table.c.player_id.in_(chunk),
+            tuple_(table.c.stat, table.c.window).in_(specs),
+        )
+        if since is not None:
+            stale = stale.where(table.c.date >= since)
+        # stale rows belong to the games being recomputed, so only their seasons' tables change
+        recent = df if since is None else df[df["date"] >= since]
+        for schema in {shards.schema(int(season), create=False) for season in recent["season"].unique()}:
+            s.execute(stale, execution_options=route(schema))
+        season_of = dict(zip(df["game_id"], df["season"]))
+        by_schema: dict[str | None, list[dict]] = {}
+        for r in rows:
+            r["league_id"] = league_id
+            by_schema.setdefault(shards.schema(int(season_of[r["game_id"]]), create=False), []).append(r)
+        for schema, part in by_schema.items():
+            s.connection().execute(insert(table), part, execution_options=route(schema))
+        mark_modified(s, [sc for sc in by_schema if sc])
+        written += len(rows)
+    return written
+
+
+def rebuild_rolling_features(s: Session, league_id: int, specs: list[tuple[str, int]] | None = None) -> int:
+    """Drop and recompute every feature row of a league. The caller commits."""
+    specs = specs or feature_specs()
+    for schema in ShardMap(s, league_id).schemas() or [None]:
+        s.execute(delete(PlayerRollingFeature).where(PlayerRollingFeature.league_id == league_id), execution_options=route(schema))
+    players = s.scalars(select(PlayerGameStat.player_id).where(PlayerGameStat.league_id == league_id).distinct())
+    n = update_rolling_features(s, league_id, players.all(), None, specs)
+    mark_stats_changed(s, league_id)
+    return n
+
+
+def has_rolling_features(s: Session, league_id: int, stat: str, window: int) -> bool:
+    q = select(PlayerRollingFeature.id).where(
+        PlayerRollingFeature.league_id == league_id,
+        PlayerRollingFeature.stat == stat,
+        PlayerRollingFeature.window == window,
+    ).limit(1)
+    return s.scalar(q) is not None
+
+
+def load_rolling_features(s: Session, league_id: int, stat: str, window: int) -> pd.DataFrame:
+    """
+    Materialized features for one (stat, window) as player_id, game_id, date, <stat>,
+    rolling_<stat>_avg; the same frame last_n_avg_pts builds from scratch.
+    """
+    _check([(stat, window)])
+    rows = s.execute(_features_stmt(league_id, stat, window)).all()
+    return pd.DataFrame(rows, columns=["player_id", "game_id", "date", stat, f"rolling_{stat}_avg"])
+
+
+def _features_stmt(league_id: int, stat: str, window: int) -> Select:
+    f = PlayerRollingFeature
+    value = getattr(PlayerGameStat, stat)
+    return (
+        select(f.player_id, f.game_id, f.date, value, f.value)
+        .join(PlayerGameStat, (PlayerGameStat.player_id == f.player_id) & (PlayerGameStat.game_id == f.game_id))
+        .where(f.league_id == league_id, f.stat == stat, f.window == window)
+        .order_by(f.player_id, f.date)
+    )
+
+
+def compute_rolling_features(s: Session, league_id: int, stat: str, window: int) -> pd.DataFrame:
+    """Same frame as load_rolling_features for a spec that is not materialized (SQL window engine)."""
+    _check([(stat, window)])
+    return rolling_sql(stat, window, league_id=league_id, bind=s.connection())
+
+
+def rolling_rows(df: pd.DataFrame, specs: list[tuple[str, int]], since: datetime | None = None) -> list[dict]:
+    """
+    Trailing means over a frame of player_id, game_id, date and stat columns sorted by
+    (player_id, date). Only rows dated on or after `since` are returned.
+    """
+    rows: list[dict] = []
+    for stat, window in specs:
+        sub = df.loc[df[stat].notna(), ["player_id", "game_id", "date", stat]]
+        if sub.empty:
+            continue
+        sub = sub.assign(value=_rolling_mean(sub, stat, window))
+        keep = sub["value"].notna()
+        if since is not None:
+            keep &= sub["date"] >= since
+        out = sub.loc[keep, ["player_id", "game_id", "date", "value"]]
+        rows.extend(
+            {"player_id": int(p), "game_id": int(g), "date": d.to_pydatetime(), "stat": stat, "window": window, "value": float(v)}
+            for p, g, d, v in out.itertuples(index=False)
+        )
+    return rows
+
+
+def _rolling_mean(df: pd.DataFrame, stat: str, window: int) -> pd.Series:
+    return (
+        df.groupby("player_id")[stat].rolling(window=window, min_periods=min_periods(window)).mean()
+        .reset_index(level=0, drop=True)
+    )
+
+
+def _load_history(s: Session, player_ids: list[int], stats: list[str], since: datetime | None, lookback: int) -> pd.DataFrame:
+    names = ["player_id", "game_id", "date", "season", *stats]
+    base = _history_stmt(player_ids, stats)
+    if since is None:
+        frames = [s.execute(base).all()]
+    else:
+        # the last `lookback` non-null values of each stat before `since` seed its trailing
+        # window (rolling_rows skips NULLs): count(stat) newest first counts only those
+        order = (Game.date.desc(), Game.id.desc())
+        backs = [
+            func.count(getattr(PlayerGameStat, st)).over(
+                partition_by=PlayerGameStat.player_id, order_by=order, rows=(None, 0)
+            ).label(f"back_{st}")
+            for st in stats
+        ]
+        prior = base.add_columns(*backs).where(Game.date < since).subquery()
+        seed = select(*(prior.c[n] for n in names)).where(
+            or_(*((prior.c[st].is_not(None)) & (prior.c[f"back_{st}"] <= lookback) for st in stats))
+        )
+        frames = [s.execute(seed).all(), s.execute(base.where(Game.date >= since)).all()]
+    df = pd.DataFrame([r for rows in frames for r in rows], columns=names)
+    df["date"] = pd.to_datetime(df["date"])
+    return df.sort_values(["player_id", "date", "game_id"], kind="stable").reset_index(drop=True)
+
+
+def _history_stmt(player_ids: list[int], stats: list[str]) -> Select:
+    cols = [PlayerGameStat.player_id, PlayerGameStat.game_id, Game.date, Game.season] + [getattr(PlayerGameStat, st) for st in stats]
+    return select(*cols).join(Game, Game.id == PlayerGameStat.game_id).where(PlayerGameStat.player_id.in_(player_ids))
+
+
+def _check(specs: list[tuple[str, int]]) -> None:
+    for stat, window in specs:
+        if stat not in STAT_COLUMNS:
+            raise ValueError(f"Unknown stat {stat!r}; expected one of {STAT_COLUMNS}")
+        if window < 1:
+            raise ValueError(f"Window must be >= 1, got {window}")
+
+
+def _naive(when: datetime | None) -> datetime | None:
+    # games.date round-trips through SQLite without tzinfo
+    return when.replace(tzinfo=None) if when is not None and when.tzinfo is not None else when
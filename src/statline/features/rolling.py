@@ -1,18 +1,145 @@
 from __future__ import annotations
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Iterator, Sequence
+import numpy as np
 import pandas as pd
-from ..db import SessionLocal
+from sqlalchemy import Connection, Engine, Select, String, and_, case, func, select, type_coerce, union_all
+from ..db import get_engine
+from ..etl.records import STAT_COLUMNS
 from ..models import PlayerGameStat, Game
 
-def last_n_avg_pts(n: int) -> pd.DataFrame:
-    with SessionLocal() as s:
-        q = (
-            s.query(PlayerGameStat.player_id, PlayerGameStat.game_id, PlayerGameStat.pts, Game.date)
-            .join(Game, Game.id == PlayerGameStat.game_id)
-            .order_by(PlayerGameStat.player_id, Game.date)
-        )
-        df = pd.DataFrame(q.all(), columns=["player_id","game_id","pts","date"]).dropna(subset=["pts"])  # type: ignore[call-arg]
-    df = df.sort_values(["player_id","date"]).reset_index(drop=True)
-    df["rolling_pts_avg"] = (
-        df.groupby("player_id")["pts"].rolling(window=n, min_periods=max(1, n//2)).mean().reset_index(level=0, drop=True)
+CHUNK_ROWS = 50_000
+
+
+def last_n_avg_pts(n: int, bind: Engine | Connection | None = None) -> pd.DataFrame:
+    return rolling_sql("pts", n, bind=bind)
+
+
+def rolling_sql(
+    stat: str = "pts",
+    window: int = 10,
+    league_id: int | None = None,
+    seasons: Sequence[int] | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    bind: Engine | Connection | None = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> pd.DataFrame:
+    """All chunks of iter_rolling_sql as one frame."""
+    chunks = list(iter_rolling_sql(stat, window, league_id, seasons, start, end, bind, chunk_rows))
+    return pd.concat(chunks, ignore_index=True) if chunks else _frame([], stat)
+
+
+def iter_rolling_sql(
+    stat: str = "pts",
+    window: int = 10,
+    league_id: int | None = None,
+    seasons: Sequence[int] | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    bind: Engine | Connection | None = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """
+    Trailing mean of `stat` per player computed by SQLite itself:
+
+        AVG(stat) OVER (PARTITION BY player_id ORDER BY date, game_id
+                        ROWS BETWEEN window-1 PRECEDING AND CURRENT ROW)
+
+    NULL until the player has max(1, window // 2) games, like the pandas rolling mean
+    it replaces. With `start` (or `seasons`, from their first game) the window reads the
+    rows from there up to `end` plus each player's window - 1 values before it, so values
+    at `start` still see earlier games. Picking those seed values still ranks the
+    players' earlier rows, but the window sort and the output cover only the range.
+    Rows stream out `chunk_rows` at a time as typed frames (player_id, game_id, date,
+    <stat>, rolling_<stat>_avg) ordered by player and date.
+    """
+    outer = rolling_stmt(stat, window, league_id, seasons, start, end)
+    bind = bind if bind is not None else get_engine()
+    with bind.connect() if isinstance(bind, Engine) else nullcontext(bind) as conn:
+        result = conn.execution_options(stream_results=True).execute(outer)
+        for rows in result.partitions(chunk_rows):
+            yield _frame(rows, stat)
+
+
+def rolling_stmt(
+    stat: str,
+    window: int,
+    league_id: int | None = None,
+    seasons: Sequence[int] | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> Select:
+    """The iter_rolling_sql query (player_id, game_id, date, value, trailing mean)."""
+    if stat not in STAT_COLUMNS:
+        raise ValueError(f"Unknown stat {stat!r}; expected one of {STAT_COLUMNS}")
+    value = getattr(PlayerGameStat, stat)
+    base = (
+        select(PlayerGameStat.player_id, PlayerGameStat.game_id, Game.date, Game.season, value.label("value"))
+        .join(Game, Game.id == PlayerGameStat.game_id)
+        .where(value.is_not(None))
     )
-    return df
+    if league_id is not None:
+        base = base.where(PlayerGameStat.league_id == league_id)
+    if end is not None:
+        base = base.where(Game.date <= end)
+    bound = _first_date(seasons, league_id) if start is None else start
+    if bound is None:
+        rows = base.subquery()
+    else:
+        # the rows asked for plus each of their players' last window - 1 values before them,
+        # so the window reads the requested range instead of the league's whole history
+        recent = base.where(Game.date >= bound)
+        back = func.row_number().over(
+            partition_by=PlayerGameStat.player_id, order_by=(Game.date.desc(), PlayerGameStat.game_id.desc())
+        ).label("back")
+        prior = (
+            base.add_columns(back)
+            .where(Game.date < bound, PlayerGameStat.player_id.in_(recent.with_only_columns(PlayerGameStat.player_id)))
+            .subquery()
+        )
+        seed = select(prior.c.player_id, prior.c.game_id, prior.c.date, prior.c.season, prior.c.value).where(prior.c.back < window)
+        rows = union_all(recent, seed).subquery()
+    over = dict(partition_by=rows.c.player_id, order_by=(rows.c.date, rows.c.game_id), rows=(-(window - 1), 0))
+    sub = select(
+        *rows.c,
+        func.avg(rows.c.value).over(**over).label("avg"),
+        func.count(rows.c.value).over(**over).label("n"),
+    ).subquery()
+
+    min_n = max(1, window // 2)
+    avg = case((sub.c.n >= min_n, sub.c.avg))
+    outer = select(
+        sub.c.player_id, sub.c.game_id, type_coerce(sub.c.date, String), sub.c.value, avg,
+    ).order_by(sub.c.player_id, sub.c.date, sub.c.game_id)
+    filters = []
+    if seasons:
+        filters.append(sub.c.season.in_(list(seasons)))
+    if start is not None:
+        filters.append(sub.c.date >= start)
+    if filters:
+        outer = outer.where(and_(*filters))
+    return outer
+
+
+def _first_date(seasons: Sequence[int] | None, league_id: int | None):
+    # earliest game of `seasons`: nothing before it is returned, only read to seed windows
+    if not seasons:
+        return None
+    q = select(func.min(Game.date)).where(Game.season.in_(list(seasons)))
+    if league_id is not None:
+        q = q.where(Game.league_id == league_id)
+    return q.scalar_subquery()
+
+
+def _frame(rows: list, stat: str) -> pd.DataFrame:
+    cols = list(zip(*rows)) if rows else [(), (), (), (), ()]
+    return pd.DataFrame({
+        "player_id": np.fromiter(cols[0], dtype=np.int64, count=len(rows)),
+        "game_id": np.fromiter(cols[1], dtype=np.int64, count=len(rows)),
+        "date": pd.to_datetime(pd.Series(cols[2], dtype=object), format="ISO8601"),
+        stat: np.array(cols[3], dtype=np.float64),
+        f"rolling_{stat}_avg": np.array(cols[4], dtype=np.float64),  # NULL -> NaN
+    })
+
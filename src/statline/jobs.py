@@ -0,0 +1,148 @@
+"""
+League locks and persisted scheduler job state, both kept in the database so every
+statline process on the same DATABASE_URL (the scheduler service, cron or Actions
+`statline ingest` runs) sees them, and they survive restarts.
+
+A lock is a lease: a job_locks row naming its owner and an expiry. Taking it is one
+conditional UPDATE (free, expired, or already ours) or, the first time, an INSERT,
+so two processes can never both win. While locked() holds it a heartbeat thread
+pushes the expiry out every TTL / RENEWALS, so a run may take hours and a crashed
+owner's lease still lapses within one TTL.
+"""
+from __future__ import annotations
+import os
+import socket
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator
+from sqlalchemy import Engine, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from .db import get_engine
+from .models import JobLock, JobState
+
+# how long a lease outlives its last renewal, i.e. how soon a crashed owner's lock frees up
+LOCK_TTL = timedelta(minutes=15)
+RENEWALS = 5  # heartbeats per TTL; a few may fail on a busy database before the lease lapses
+
+
+class LockHeld(RuntimeError):
+    pass
+
+
+def owner_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def acquire(name: str, owner: str, ttl: timedelta = LOCK_TTL, now: datetime | None = None,
+            bind: Engine | None = None) -> bool:
+    """Take the `name` lease for `owner` unless another owner holds an unexpired one."""
+    bind = bind if bind is not None else get_engine()
+    now = now or _utcnow()
+    values = {"owner": owner, "acquired_at": now, "expires_at": now + ttl}
+    with bind.begin() as conn:
+        taken = conn.execute(
+            update(JobLock)
+            .where(JobLock.name == name)
+            .where(or_(JobLock.owner.is_(None), JobLock.owner == owner, JobLock.expires_at < now))
+            .values(**values)
+        ).rowcount
+        if taken or conn.scalar(select(JobLock.name).where(JobLock.name == name)) is not None:
+            return bool(taken)
+    try:
+        with bind.begin() as conn:
+            conn.execute(insert(JobLock).values(name=name, **values))
+    except IntegrityError:
+        return False  # another process inserted it first
+    return True
+
+
+def release(name: str, owner: str, bind: Engine | None = None) -> None:
+    with _begin(bind) as conn:
+        conn.execute(
+            update(JobLock).where(JobLock.name == name, JobLock.owner == owner)
+            .values(owner=None, acquired_at=None, expires_at=None)
+        )
+
+
+def renew(name: str, owner: str, ttl: timedelta = LOCK_TTL, bind: Engine | None = None) -> bool:
+    """Push the expiry of `owner`'s lease out to now + ttl; False once it no longer holds `name`."""
+    with _begin(bind) as conn:
+        return bool(conn.execute(
+            update(JobLock).where(JobLock.name == name, JobLock.owner == owner)
+            .values(expires_at=_utcnow() + ttl)
+        ).rowcount)
+
+
+def holder(name: str, bind: Engine | None = None) -> tuple[str | None, datetime | None]:
+    with _begin(bind) as conn:
+        row = conn.execute(select(JobLock.owner, JobLock.expires_at).where(JobLock.name == name)).first()
+    return (row.owner, row.expires_at) if row else (None, None)
+
+
+@contextmanager
+def locked(name: str, ttl: timedelta = LOCK_TTL, bind: Engine | None = None) -> Iterator[str]:
+    """Hold the `name` lease for the block; raises LockHeld when another process has it."""
+    owner = owner_id()
+    if not acquire(name, owner, ttl, bind=bind):
+        who, until = holder(name, bind)
+        raise LockHeld(f"{name} is locked by {who} until {until} UTC")
+    stop = threading.Event()
+    beat = threading.Thread(target=_heartbeat, args=(name, owner, ttl, bind, stop),
+                            name=f"lease-{name}", daemon=True)
+    beat.start()
+    try:
+        yield owner
+    finally:
+        stop.set()
+        beat.join()
+        release(name, owner, bind)
+
+
+def _heartbeat(name: str, owner: str, ttl: timedelta, bind: Engine | None, stop: threading.Event) -> None:
+    while not stop.wait(ttl.total_seconds() / RENEWALS):
+        try:
+            if not renew(name, owner, ttl, bind):
+                print(f"⚠️ Lost the {name} lock to another process; its writes may overlap this run")
+                return
+        except OperationalError as e:  # database busy; the next beat retries
+            print(f"⚠️ Could not renew the {name} lock: {e}")
+
+
+def load_state(name: str, bind: Engine | None = None) -> dict[str, Any] | None:
+    with _begin(bind) as conn:
+        row = conn.execute(select(JobState.__table__).where(JobState.name == name)).mappings().first()
+    return dict(row) if row else None
+
+
+def save_state(name: str, bind: Engine | None = None, **fields: Any) -> None:
+    """Upsert the job_state row of `name` with `fields`."""
+    with _begin(bind) as conn:
+        if not conn.execute(update(JobState).where(JobState.name == name).values(**fields)).rowcount:
+            conn.execute(insert(JobState).values(name=name, **{"runs": 0, **fields}))
+
+
+def record_start(name: str, now: datetime | None = None, bind: Engine | None = None) -> None:
+    with _begin(bind) as conn:
+        values = {"last_started_at": now or _utcnow()}
+        if not conn.execute(update(JobState).where(JobState.name == name)
+                            .values(runs=JobState.runs + 1, **values)).rowcount:
+            conn.execute(insert(JobState).values(name=name, runs=1, **values))
+
+
+def record_finish(name: str, status: str, error: str | None = None, now: datetime | None = None,
+                  bind: Engine | None = None) -> None:
+    now = now or _utcnow()
+    fields: dict[str, Any] = {"last_finished_at": now, "last_status": status, "last_error": (error or None) and error[:500]}
+    if status == "ok":
+        fields["last_success_at"] = now
+    save_state(name, bind, **fields)
+
+
+def _begin(bind: Engine | None) -> Any:
+    return (bind if bind is not None else get_engine()).begin()
@@ -0,0 +1,293 @@
+"""
+In-process metrics for ingest runs: counters and fixed-bucket histograms keyed by
+name + labels, cheap enough to update per request and per game from any thread.
+
+    statline_http_request_seconds{host,endpoint}       histogram, one per attempt sent
+    statline_http_responses_total{host,endpoint,status}
+    statline_http_response_bytes_total{host,endpoint}
+    statline_http_retries_total{host,endpoint}
+    statline_http_errors_total{host,endpoint,error}    requests that raised
+    statline_parse_seconds{league}                     histogram, one per game
+    statline_db_seconds{op}                            histogram: flush, commit, features
+    statline_db_rows_total{table,outcome}              inserted / updated / skipped
+    statline_pipeline_busy_seconds_total{stage}
+    statline_pipeline_items_total{stage}
+    statline_lookup_seconds{cache}                     histogram: `statline serve` lookups
+    statline_lookup_cache_total{outcome}               hit / miss per looked-up player
+
+instrument_run() resets the registry, optionally runs cProfile over every thread,
+and writes a JSON run report (plus a Prometheus textfile for node_exporter) at the end.
+"""
+from __future__ import annotations
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterator
+from urllib.parse import urlsplit
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TIMING_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+PROFILE_TOP = 25  # functions printed by --profile
+
+HELP = {
+    "statline_http_request_seconds": "Provider HTTP request latency per attempt",
+    "statline_http_responses_total": "Provider HTTP responses by status",
+    "statline_http_response_bytes_total": "Provider HTTP response body bytes",
+    "statline_http_retries_total": "Provider HTTP retries (urllib3/httpx backoff and 429 re-sends)",
+    "statline_http_errors_total": "Provider HTTP requests that raised",
+    "statline_parse_seconds": "Time to parse one game's payload into a GameRecord",
+    "statline_db_seconds": "BulkWriter time per operation",
+    "statline_db_rows_total": "Rows written by outcome",
+    "statline_pipeline_busy_seconds_total": "Busy time per ingest pipeline stage",
+    "statline_pipeline_items_total": "Items handled per ingest pipeline stage",
+    "statline_lookup_seconds": "Feature lookup latency per request",
+    "statline_lookup_cache_total": "Feature lookup cache hits and misses",
+}
+_NUMERIC = re.compile(r"^\d+$")
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot: above the largest bucket
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-quantile (None past the last bucket)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "buckets": {str(b): n for b, n in zip(self.buckets, self.counts)} | {"+Inf": self.counts[-1]},
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: dict[tuple[str, Labels], float] = {}
+        self.histograms: dict[tuple[str, Labels], Histogram] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: tuple[float, ...] = TIMING_BUCKETS, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = Histogram(buckets)
+            h.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> dict[str, list[dict[str, Any]]]:
+        """{name: [{labels, value} or {labels, count, sum, buckets, p50, p95}, ...]}"""
+        out: dict[str, list[dict[str, Any]]] = {}
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                out.setdefault(name, []).append({"labels": dict(labels), "value": round(value, 6)})
+            for (name, labels), h in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                out.setdefault(name, []).append({"labels": dict(labels), **h.to_dict()})
+        return out
+
+    def to_prometheus(self) -> str:
+        lines: list[str] = []
+        typed: set[str] = set()
+
+        def header(name: str, kind: str) -> None:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                header(name, "counter")
+                lines.append(f"{name}{_fmt_labels(labels)} {_num(value)}")
+            for (name, labels), h in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                header(name, "histogram")
+                cumulative = 0
+                for bound, n in zip(h.buckets, h.counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', _num(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', '+Inf'),))} {h.count}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {_num(h.sum)}")
+                lines.append(f"{name}_count{_fmt_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+def endpoint(url: str) -> tuple[str, str]:
+    """(host, path with numeric segments as {id}): one label value per endpoint, not per game."""
+    parts = urlsplit(url)
+    path = "/".join("{id}" if _NUMERIC.match(seg) else seg for seg in parts.path.split("/"))
+    return parts.hostname or "", path
+
+
+def observe_http(url: str, status: int, seconds: float, nbytes: int, retries: int = 0) -> None:
+    host, path = endpoint(url)
+    METRICS.observe("statline_http_request_seconds", seconds, LATENCY_BUCKETS, host=host, endpoint=path)
+    METRICS.inc("statline_http_responses_total", host=host, endpoint=path, status=status)
+    METRICS.inc("statline_http_response_bytes_total", nbytes, host=host, endpoint=path)
+    if retries:
+        METRICS.inc("statline_http_retries_total", retries, host=host, endpoint=path)
+
+
+def http_error(url: str, error: BaseException) -> None:
+    host, path = endpoint(url)
+    METRICS.inc("statline_http_errors_total", host=host, endpoint=path, error=type(error).__name__)
+
+
+@contextmanager
+def instrument_run(
+    name: str,
+    report: str | os.PathLike | None = None,
+    prometheus: str | os.PathLike | None = None,
+    profile: bool = False,
+    extra: Callable[[], dict[str, Any]] | None = None,
+) -> Iterator[Metrics]:
+    """
+    Collect metrics for one run and write them out when it ends, failed or not:
+    `report` as JSON (run info, every metric, plus `extra()`), `prometheus` as a
+    textfile. With `profile`, cProfile runs on this thread and every thread started
+    during the run (fetch workers, pipeline stages); merged stats go next to the
+    report as .prof and the top functions by cumulative time are printed.
+    """
+    METRICS.reset()
+    started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    profiler = _Profiler() if profile else None
+    status = "failed"
+    try:
+        yield METRICS
+        status = "ok"
+    finally:
+        seconds = time.perf_counter() - started
+        if profiler is not None:
+            profiler.stop(Path(report or "run_report.json").with_suffix(".prof"))
+        run = {
+            "run": name, "status": status,
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "seconds": round(seconds, 3),
+        }
+        if report:
+            _atomic_write(report, json.dumps({**run, **(extra() if extra else {}), "metrics": METRICS.snapshot()}, indent=1))
+            print(f"Run report: {report}")
+        if prometheus:
+            gauges = (
+                f"# TYPE statline_run_seconds gauge\nstatline_run_seconds{_fmt_labels((('run', name),))} {_num(seconds)}\n"
+                f"# TYPE statline_run_success gauge\nstatline_run_success{_fmt_labels((('run', name),))} {int(status == 'ok')}\n"
+                f"# TYPE statline_run_finished_timestamp_seconds gauge\n"
+                f"statline_run_finished_timestamp_seconds{_fmt_labels((('run', name),))} {int(time.time())}\n"
+            )
+            _atomic_write(prometheus, METRICS.to_prometheus() + gauges)
+
+
+# Before 3.12 cProfile hooks only the thread that enables it, so each new thread gets
+# its own. From 3.12 it runs on sys.monitoring: one profiler per process, which sees
+# every thread, and enabling a second one raises ValueError.
+_PER_THREAD = sys.version_info < (3, 12)
+
+
+class _Profiler:
+    def __init__(self):
+        self.profiles: list[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self.main = cProfile.Profile()
+        if _PER_THREAD:
+            threading.setprofile(self._thread_start)
+        self.main.enable()
+
+    def _thread_start(self, frame, event, arg) -> None:
+        # runs as the profile hook of each new thread; swap it for a per-thread profiler
+        prof = cProfile.Profile()
+        with self._lock:
+            self.profiles.append(prof)
+        prof.enable()
+
+    def stop(self, path: Path) -> None:
+        self.main.disable()
+        if _PER_THREAD:
+            threading.setprofile(None)
+        stats = pstats.Stats(self.main)
+        with self._lock:
+            for prof in self.profiles:
+                prof.create_stats()
+                stats.add(prof)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        stats.dump_stats(str(path))
+        buf = io.StringIO()
+        pstats.Stats(str(path), stream=buf).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        print(buf.getvalue())
+        print(f"Profile: {path} (snakeviz / python -m pstats)")
+
+
+def _labels(labels: dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels) + "}"
+
+
+def _num(v: float) -> str:
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+def _atomic_write(path: str | os.PathLike, text: str) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
@@ -0,0 +1,97 @@
+"""
+Versioned schema migrations. create_all only creates missing tables, so an index
+added to the models never reaches an existing database; each change to existing
+tables is listed in MIGRATIONS instead, and schema_migrations records the versions a
+database has applied:
+
+    migrate()               # create_all, then every pending migration, in order
+
+A migration names the indexes it builds (declared on the models, so fresh databases
+get them from create_all too) and the ones it drops. Both are idempotent, IF NOT
+EXISTS / IF EXISTS, so a fresh database just records every version. On sharded
+SQLite layouts (statline.shards) the indexes of sharded tables are built in the
+catalog and in every attached shard file; shards created later copy the models.
+`statline db audit` shows which of these indexes the hot queries rely on.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from sqlalchemy import Connection, Engine, Index, inspect, select
+from sqlalchemy.schema import CreateIndex
+from .models import Base, SchemaMigration
+from .shards import SHARDED_TABLES, route
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    create: tuple[str, ...] = ()  # index names declared on the models
+    drop: tuple[str, ...] = ()    # index names the models no longer declare
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "covering indexes for hot queries", create=(
+        "ix_stats_player_game",                      # rolling feature joins, per-player history
+        "ix_prop_lines_player_game_market_fetched",  # a player's line history per game and market
+        "ix_games_league_ext_status",                # ext_id -> (id, status) maps, without table reads
+    )),
+    Migration(2, "drop indexes made redundant by composite ones", drop=(
+        "ix_teams_ext_id", "ix_players_ext_id", "ix_games_ext_id",  # every lookup is (league_id, ext_id)
+        "ix_player_game_stats_player_id", "ix_prop_lines_player_id",
+    )),
+]
+
+
+def index(name: str) -> Index:
+    for table in Base.metadata.tables.values():
+        for idx in table.indexes:
+            if idx.name == name:
+                return idx
+    raise KeyError(f"No index {name!r} on the models")
+
+
+def applied_versions(conn: Connection) -> set[int]:
+    if not inspect(conn).has_table(SchemaMigration.__tablename__):
+        return set()
+    return set(conn.scalars(select(SchemaMigration.version)))
+
+
+def pending(conn: Connection) -> list[Migration]:
+    done = applied_versions(conn)
+    return [m for m in MIGRATIONS if m.version not in done]
+
+
+def migrate(eng: Engine | None = None) -> list[Migration]:
+    """Create missing tables and apply pending migrations; returns the ones applied."""
+    if eng is None:
+        from .db import get_engine
+        eng = get_engine()
+    Base.metadata.create_all(eng)
+    with eng.begin() as conn:
+        todo = pending(conn)
+        for m in todo:
+            apply(conn, m)
+    return todo
+
+
+def apply(conn: Connection, m: Migration) -> None:
+    """Run one migration in the connection's transaction and record it."""
+    for name in m.create:
+        idx = index(name)
+        for schema in _schemas(conn, idx.table.name):
+            conn.execute(CreateIndex(idx, if_not_exists=True), execution_options=route(schema))
+    for name in m.drop:
+        for schema in _schemas(conn, None):
+            prefix = f'"{schema}".' if schema else ""
+            conn.exec_driver_sql(f'DROP INDEX IF EXISTS {prefix}"{name}"')
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    conn.execute(SchemaMigration.__table__.insert().values(version=m.version, name=m.name, applied_at=now))
+
+
+def _schemas(conn: Connection, table: str | None) -> list[str | None]:
+    # SQLite names main explicitly: with shards attached, TEMP views shadow its sharded tables
+    if conn.dialect.name != "sqlite":
+        return [None]
+    shards = [row[1] for row in conn.exec_driver_sql("PRAGMA database_list") if row[1].startswith("shard_")]
+    return ["main", *(shards if table is None or table in SHARDED_TABLES else [])]
@@ -17,7 +17,7 @@ class Team(Base):
     __tablename__ = "teams"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     league_id: Mapped[int] = mapped_column(ForeignKey("leagues.id", ondelete="CASCADE"), index=True)
-    ext_id: Mapped[str] = mapped_column(String(32), index=True)  # provider id
+    ext_id: Mapped[str] = mapped_column(String(32))  # provider id
     name: Mapped[str] = mapped_column(String(100))
     abbreviation: Mapped[Optional[str]] = mapped_column(String(10))
     __table_args__ = (UniqueConstraint("league_id", "ext_id", name="uq_team_league_ext"),)
@@ -26,7 +26,7 @@ class Player(Base):
     __tablename__ = "players"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     league_id: Mapped[int] = mapped_column(ForeignKey("leagues.id", ondelete="CASCADE"), index=True)
-    ext_id: Mapped[str] = mapped_column(String(32), index=True)
+    ext_id: Mapped[str] = mapped_column(String(32))
     first_name: Mapped[str] = mapped_column(String(60))
     last_name: Mapped[str] = mapped_column(String(60))
     position: Mapped[Optional[str]] = mapped_column(String(10))
@@ -37,7 +37,7 @@ class Game(Base):
     __tablename__ = "games"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     league_id: Mapped[int] = mapped_column(ForeignKey("leagues.id", ondelete="CASCADE"), index=True)
-    ext_id: Mapped[str] = mapped_column(String(32), index=True)
+    ext_id: Mapped[str] = mapped_column(String(32))
     season: Mapped[int] = mapped_column(Integer, index=True)
     date: Mapped[datetime] = mapped_column(DateTime, index=True)
     home_team_id: Mapped[int] = mapped_column(ForeignKey("teams.id", ondelete="CASCADE"))
@@ -46,6 +46,7 @@ class Game(Base):
     __table_args__ = (
         UniqueConstraint("league_id", "ext_id", name="uq_game_league_ext"),
         Index("ix_games_league_date", "league_id", "date"),
+        Index("ix_games_league_ext_status", "league_id", "ext_id", "status"),
     )
 
 class PlayerGameStat(Base):
@@ -53,7 +54,7 @@ class PlayerGameStat(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     league_id: Mapped[int] = mapped_column(ForeignKey("leagues.id", ondelete="CASCADE"), index=True)
     game_id: Mapped[int] = mapped_column(ForeignKey("games.id", ondelete="CASCADE"), index=True)
-    player_id: Mapped[int] = mapped_column(ForeignKey("players.id", ondelete="CASCADE"), index=True)
+    player_id: Mapped[int] = mapped_column(ForeignKey("players.id", ondelete="CASCADE"))
     minutes: Mapped[Optional[float]] = mapped_column(Float)
     pts: Mapped[Optional[float]] = mapped_column(Float)
     reb: Mapped[Optional[float]] = mapped_column(Float)
@@ -67,15 +68,122 @@ class PlayerGameStat(Base):
     fta: Mapped[Optional[float]] = mapped_column(Float)
     ftm: Mapped[Optional[float]] = mapped_column(Float)
     turnovers: Mapped[Optional[float]] = mapped_column(Float)
-    __table_args__ = (UniqueConstraint("league_id", "game_id", "player_id", name="uq_stat_game_player"),)
+    __table_args__ = (
+        UniqueConstraint("league_id", "game_id", "player_id", name="uq_stat_game_player"),
+        Index("ix_stats_player_game", "player_id", "game_id"),
+    )
 
 class PropLine(Base):
     __tablename__ = "prop_lines"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     league_id: Mapped[int] = mapped_column(ForeignKey("leagues.id", ondelete="CASCADE"), index=True)
-    player_id: Mapped[int] = mapped_column(ForeignKey("players.id", ondelete="CASCADE"), index=True)
+    player_id: Mapped[int] = mapped_column(ForeignKey("players.id", ondelete="CASCADE"))
     game_id: Mapped[int] = mapped_column(ForeignKey("games.id", ondelete="CASCADE"), index=True)
     market: Mapped[str] = mapped_column(String(32))
     line: Mapped[float] = mapped_column(Float)
     source: Mapped[str] = mapped_column(String(32))
     fetched_at: Mapped[datetime] = mapped_column(DateTime)
+    __table_args__ = (
+        Index("ix_prop_lines_player_game_market_fetched", "player_id", "game_id", "market", "fetched_at"),
+    )
+
+class IngestState(Base):
+    __tablename__ = "ingest_state"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    league_id: Mapped[int] = mapped_column(ForeignKey("leagues.id", ondelete="CASCADE"), unique=True)
+    watermark: Mapped[datetime] = mapped_column(DateTime)  # every game before this date is stored as Final
+    updated_at: Mapped[datetime] = mapped_column(DateTime)
+
+class IngestRun(Base):
+    """One backfill of a league's seasons; resumable until it completes (see etl.ledger)."""
+    __tablename__ = "ingest_runs"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    league_id: Mapped[int] = mapped_column(ForeignKey("leagues.id", ondelete="CASCADE"), index=True)
+    seasons: Mapped[str] = mapped_column(String(200))  # comma-separated, as passed to the backfill
+    status: Mapped[str] = mapped_column(String(16))    # running | complete | incomplete | failed
+    started_at: Mapped[datetime] = mapped_column(DateTime)
+    updated_at: Mapped[datetime] = mapped_column(DateTime)   # last checkpoint commit
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    resumes: Mapped[int] = mapped_column(Integer, default=0)
+    games_ok: Mapped[int] = mapped_column(Integer, default=0)
+    games_failed: Mapped[int] = mapped_column(Integer, default=0)
+    games_skipped: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[Optional[str]] = mapped_column(String(500))  # why a failed run stopped
+
+class IngestCheckpoint(Base):
+    """Outcome of one game within an ingest run: ok (rows committed), failed (retried on resume) or skipped."""
+    __tablename__ = "ingest_checkpoints"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    run_id: Mapped[int] = mapped_column(ForeignKey("ingest_runs.id", ondelete="CASCADE"))
+    ext_id: Mapped[str] = mapped_column(String(32))
+    season: Mapped[Optional[str]] = mapped_column(String(16))
+    outcome: Mapped[str] = mapped_column(String(16))
+    error: Mapped[Optional[str]] = mapped_column(String(500))
+    payload_hash: Mapped[Optional[str]] = mapped_column(String(64))  # sha256 of the fetched provider payload
+    attempts: Mapped[int] = mapped_column(Integer, default=1)
+    updated_at: Mapped[datetime] = mapped_column(DateTime)
+    __table_args__ = (UniqueConstraint("run_id", "ext_id", name="uq_checkpoint_run_ext"),)
+
+class JobLock(Base):
+    """Lease on a league's ingest, so scheduler jobs and CLI runs never overlap (see statline.jobs)."""
+    __tablename__ = "job_locks"
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)  # league code
+    owner: Mapped[Optional[str]] = mapped_column(String(128))        # host:pid:nonce, NULL when free
+    acquired_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime)  # stale leases of dead processes lapse
+
+class JobState(Base):
+    """Persisted state of one scheduler job, e.g. poll:MLB, so the service resumes after a restart."""
+    __tablename__ = "job_state"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(64), unique=True)
+    window_start: Mapped[Optional[datetime]] = mapped_column(DateTime)  # poll jobs: the planned game window
+    window_end: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    last_started_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    last_finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    last_success_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    last_status: Mapped[Optional[str]] = mapped_column(String(16))  # ok | failed | skipped
+    last_error: Mapped[Optional[str]] = mapped_column(String(500))
+    runs: Mapped[int] = mapped_column(Integer, default=0)
+
+class PlayerRollingFeature(Base):
+    """Trailing-window aggregate of one stat as of (and including) a player's game."""
+    __tablename__ = "player_rolling_features"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    league_id: Mapped[int] = mapped_column(ForeignKey("leagues.id", ondelete="CASCADE"), index=True)
+    player_id: Mapped[int] = mapped_column(ForeignKey("players.id", ondelete="CASCADE"))
+    game_id: Mapped[int] = mapped_column(ForeignKey("games.id", ondelete="CASCADE"), index=True)
+    date: Mapped[datetime] = mapped_column(DateTime)  # games.date, denormalized for as-of reads
+    stat: Mapped[str] = mapped_column(String(16))
+    window: Mapped[int] = mapped_column(Integer)
+    value: Mapped[float] = mapped_column(Float)
+    __table_args__ = (
+        UniqueConstraint("player_id", "game_id", "stat", "window", name="uq_rolling_player_game_stat_window"),
+        Index("ix_rolling_league_stat_window_player_date", "league_id", "stat", "window", "player_id", "date"),
+    )
+
+class Shard(Base):
+    """A league/season database file holding that season's games, stats and features (see statline.shards)."""
+    __tablename__ = "shards"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    league_id: Mapped[int] = mapped_column(ForeignKey("leagues.id", ondelete="CASCADE"))
+    season: Mapped[int] = mapped_column(Integer)
+    name: Mapped[str] = mapped_column(String(64), unique=True)  # e.g. nba_2025, attached as shard_nba_2025
+    path: Mapped[str] = mapped_column(String(255))
+    modified_at: Mapped[Optional[datetime]] = mapped_column(DateTime)   # last ingest write
+    optimized_at: Mapped[Optional[datetime]] = mapped_column(DateTime)  # last db optimize
+    __table_args__ = (UniqueConstraint("league_id", "season", name="uq_shard_league_season"),)
+
+class StatsVersion(Base):
+    """Bumped in every commit that changes a league's stats or features; read caches compare it (see features.lookup)."""
+    __tablename__ = "stats_versions"
+    league_id: Mapped[int] = mapped_column(ForeignKey("leagues.id", ondelete="CASCADE"), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=1)
+    changed_at: Mapped[datetime] = mapped_column(DateTime)
+
+class SchemaMigration(Base):
+    """One applied schema migration (see statline.migrations)."""
+    __tablename__ = "schema_migrations"
+    version: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(100))
+    applied_at: Mapped[datetime] = mapped_column(DateTime)
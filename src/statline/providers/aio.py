@@ -0,0 +1,129 @@
+from __future__ import annotations
+import asyncio
+import time
+from typing import Any, Callable
+from urllib.parse import urlsplit
+from ..metrics import http_error, observe_http
+from . import http
+from .cache import LIVE_TTL
+from .ratelimit import LIMITER
+
+
+def _httpx():
+    try:
+        import httpx
+    except ImportError as e:  # optional dependency
+        raise RuntimeError("Async providers need httpx: pip install 'statline-core[async]'") from e
+    return httpx
+
+
+class AsyncClient:
+    """
+    One pooled httpx.AsyncClient shared by every provider, with a per-host
+    concurrency limit, the shared per-host rate limiter, and the same retry/backoff
+    policy as http.build_session (RETRY_TOTAL attempts on connect/read errors and
+    RETRY_STATUSES, exponential backoff from RETRY_BACKOFF, Retry-After honored on 503;
+    429s are paced by the rate limiter).
+
+        async with AsyncClient(per_host=16) as client:
+            box = await mlb.aget_boxscore(client, 745000)
+    """
+
+    def __init__(self, per_host: int = 16, max_connections: int = 64, transport: Any = None,
+                 user_agent: str = "statline-core/async"):
+        httpx = _httpx()
+        self.per_host = per_host
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        if transport is None and http.active_transport() is not None:
+            transport = http.active_transport().async_transport(limits)
+        self._client = httpx.AsyncClient(
+            limits=limits,
+            timeout=http.DEFAULT_TIMEOUT,
+            headers={"User-Agent": user_agent},
+            transport=transport,
+        )
+        self._limits: dict[str, asyncio.Semaphore] = {}
+        self.retries = 0
+
+    async def __aenter__(self) -> "AsyncClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def _limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        sem = self._limits.get(host)
+        if sem is None:
+            sem = self._limits[host] = asyncio.Semaphore(self.per_host)
+        return sem
+
+    async def get_json(
+        self,
+        url: str,
+        params: dict | None = None,
+        ttl: float | None = LIVE_TTL,
+        final: bool | Callable[[Any], bool] = False,
+        headers: dict | None = None,
+    ) -> Any:
+        """
+        Async twin of http.get_json, sharing its on-disk cache when one is enabled.
+        `headers` go on this request only (e.g. a provider's API key; the client is shared).
+        """
+        cache = http.active_cache()
+        if cache is None:
+            resp = await self._get(url, params, headers)
+            resp.raise_for_status()
+            return resp.json()
+
+        key, entry = http.cache_lookup(cache, url, params)
+        if entry is not None and entry.is_fresh():
+            return entry.body
+        if entry is not None:
+            headers = {**(headers or {}), **entry.validators()}
+        resp = await self._get(url, params, headers)
+        return http.cache_response(cache, key, entry, resp, ttl, final)
+
+    async def _get(self, url: str, params: dict | None, headers: dict | None = None):
+        httpx = _httpx()
+        bucket = LIMITER.bucket(url)
+        attempt = 0
+        while True:
+            try:
+                async with self._limit(url):
+                    await bucket.aacquire()
+                    started = time.perf_counter()
+                    resp = await self._client.get(url, params=params or {}, headers=headers or {})
+                    elapsed = time.perf_counter() - started
+                    bucket.observe(resp.status_code, resp.headers, elapsed)
+                    observe_http(url, resp.status_code, elapsed, len(resp.content), int(attempt > 0))
+            except httpx.TransportError as e:
+                if attempt >= http.RETRY_TOTAL:
+                    http_error(url, e)
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                if resp.status_code not in http.RETRY_STATUSES or attempt >= http.RETRY_TOTAL:
+                    return resp
+                # the bucket already paused itself for a 429's Retry-After
+                delay = 0.0 if resp.status_code == 429 else (_retry_after(resp) or self._backoff(attempt))
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(http.RETRY_BACKOFF * (2 ** attempt), http.RETRY_BACKOFF_MAX)
+
+
+def _retry_after(resp) -> float | None:
+    if resp.status_code != 503:
+        return None
+    value = resp.headers.get("Retry-After")
+    try:
+        return min(float(value), http.RETRY_BACKOFF_MAX) if value is not None else None
+    except ValueError:
+        return None  # HTTP-date form; fall back to exponential backoff
@@ -0,0 +1,95 @@
+from __future__ import annotations
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import urlencode
+
+# Game states whose payloads never change again; responses for them are cached forever.
+FINAL_STATES = frozenset({"Final", "Game Over", "Completed Early"})
+
+SCHEDULE_TTL = 10 * 60        # schedule pages: new games and status changes show up quickly
+LIVE_TTL = 60                 # box scores / feeds of games that are not final yet
+REFERENCE_TTL = 24 * 60 * 60  # teams, players
+
+
+@dataclass
+class CacheEntry:
+    body: Any
+    fetched_at: float
+    ttl: Optional[float]              # None = never expires
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def is_fresh(self, now: float | None = None) -> bool:
+        if self.ttl is None:
+            return True
+        return (now or time.time()) - self.fetched_at < self.ttl
+
+    def validators(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    Gzipped JSON responses on disk, one file per request addressed by the
+    SHA-256 of its URL and sorted query params (data/http_cache/ab/abcdef....json.gz).
+    Writes go through a temp file + rename so concurrent fetch workers never see partial files.
+    """
+
+    def __init__(self, root: str | os.PathLike):
+        self.root = Path(root)
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stores = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str, params: dict | None = None) -> str:
+        query = urlencode(sorted((params or {}).items()), doseq=True)
+        return hashlib.sha256(f"{url}?{query}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json.gz"
+
+    def load(self, key: str) -> CacheEntry | None:
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return CacheEntry(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError):
+            return None  # truncated or from an older layout; refetch
+
+    def store(self, key: str, entry: CacheEntry) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(json.dumps(entry.__dict__, separators=(",", ":")).encode("utf-8"))
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.count("stores")
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "revalidated": self.revalidated, "stores": self.stores}
@@ -0,0 +1,237 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import Any, Callable
+from weakref import WeakKeyDictionary
+import requests
+from urllib3.util.retry import Retry
+from requests.adapters import HTTPAdapter
+from ..metrics import http_error, observe_http
+from .cache import CacheEntry, ResponseCache, LIVE_TTL
+from .ratelimit import LIMITER
+
+DEFAULT_TIMEOUT = 15  # seconds
+POOL_MAXSIZE = 32     # keep-alive connections kept per host
+
+# Retry policy shared by the requests sessions and the asyncio client (providers/aio.py)
+RETRY_TOTAL = 5
+RETRY_BACKOFF = 0.8   # exponential backoff: 0.8, 1.6, 3.2, ...
+RETRY_BACKOFF_MAX = 120
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+# every provider session, so set_transport can remount them
+_SESSIONS: WeakKeyDictionary[requests.Session, int] = WeakKeyDictionary()
+_TRANSPORT: Any = None
+
+
+def build_session(user_agent: str, pool_maxsize: int = POOL_MAXSIZE, headers: dict | None = None) -> requests.Session:
+    """
+    Build a pooled keep-alive Session with robust retries for transient network/DNS hiccups.
+    The pool is sized so concurrent fetch workers can share one Session without
+    discarding connections.
+    """
+    s = requests.Session()
+    _SESSIONS[s] = pool_maxsize
+    _mount(s, pool_maxsize)
+    s.headers.update({"User-Agent": user_agent, **(headers or {})})
+    return s
+
+
+def lazy_session(
+    user_agent: str, pool_maxsize: int = POOL_MAXSIZE, headers: dict | None = None,
+) -> Callable[[], requests.Session]:
+    """
+    A getter for a provider's Session that builds it on the first call (safely from
+    concurrent fetch workers) and returns the same Session afterwards, so importing
+    a provider module does not construct connection pools.
+    """
+    lock = threading.Lock()
+    built: list[requests.Session] = []
+
+    def get() -> requests.Session:
+        if not built:
+            with lock:
+                if not built:
+                    built.append(build_session(user_agent, pool_maxsize, headers))
+        return built[0]
+
+    return get
+
+
+def lazy_module_session(module: str, session: Callable[[], requests.Session]) -> Callable[[str], Any]:
+    """
+    A module __getattr__ exposing a provider's lazy_session as `_SESSION`, built on
+    first access like the getter itself:
+
+        __getattr__ = lazy_module_session(__name__, _session)
+    """
+
+    def __getattr__(name: str) -> Any:
+        if name == "_SESSION":
+            return session()
+        raise AttributeError(f"module {module!r} has no attribute {name!r}")
+
+    return __getattr__
+
+
+def _mount(s: requests.Session, pool_maxsize: int) -> None:
+    retry = Retry(
+        total=RETRY_TOTAL,          # total attempts
+        connect=RETRY_TOTAL,        # DNS/connect retries
+        read=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF,
+        # 429s are left to the rate limiter (see _send) so it can slow the whole host down
+        status_forcelist=tuple(c for c in RETRY_STATUSES if c != 429),
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False,
+    )
+    kwargs = dict(max_retries=retry, pool_connections=4, pool_maxsize=pool_maxsize)
+    adapter = _TRANSPORT.adapter(**kwargs) if _TRANSPORT is not None else HTTPAdapter(**kwargs)
+    for old in s.adapters.values():
+        old.close()
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+
+
+def set_transport(transport: Any) -> None:
+    """
+    Send every provider request, sync and async, through `transport`
+    (providers.transport.Recorder or Replay), or straight to the APIs again with None.
+    """
+    global _TRANSPORT
+    _TRANSPORT = transport
+    for s, pool_maxsize in list(_SESSIONS.items()):
+        _mount(s, pool_maxsize)
+
+
+def active_transport() -> Any:
+    return _TRANSPORT
+
+
+_CACHE: ResponseCache | None = None
+
+
+def enable_cache(root: str | os.PathLike) -> ResponseCache:
+    """Route every provider GET through an on-disk ResponseCache rooted at `root`."""
+    global _CACHE
+    _CACHE = ResponseCache(root)
+    return _CACHE
+
+
+def disable_cache() -> None:
+    global _CACHE
+    _CACHE = None
+
+
+def active_cache() -> ResponseCache | None:
+    return _CACHE
+
+
+def cache_stats() -> dict[str, int] | None:
+    return _CACHE.stats() if _CACHE is not None else None
+
+
+def rate_limit_stats() -> dict[str, dict[str, Any]]:
+    return LIMITER.stats()
+
+
+def get_json(
+    session: requests.Session,
+    url: str,
+    params: dict | None = None,
+    ttl: float | None = LIVE_TTL,
+    final: bool | Callable[[Any], bool] = False,
+) -> Any:
+    """
+    GET a JSON document, consulting the response cache when one is enabled.
+
+    `ttl` is how long the response stays fresh (None = forever). Responses for
+    final games are stored without expiry: pass final=True when the caller
+    already knows, or a predicate evaluated on the payload. Stale entries are
+    revalidated with If-None-Match / If-Modified-Since when the API sent validators.
+    """
+    cache = _CACHE
+    if cache is None:
+        resp = _send(session, url, params)
+        resp.raise_for_status()
+        return resp.json()
+
+    key, entry = cache_lookup(cache, url, params)
+    if entry is not None and entry.is_fresh():
+        return entry.body
+    headers = entry.validators() if entry is not None else {}
+    resp = _send(session, url, params, headers)
+    return cache_response(cache, key, entry, resp, ttl, final)
+
+
+def _send(session: requests.Session, url: str, params: dict | None, headers: dict | None = None) -> requests.Response:
+    """
+    GET through the per-host token bucket. A 429 slows the bucket down and pauses it for
+    Retry-After, then the request is re-sent once the bucket lets it through.
+    """
+    bucket = LIMITER.bucket(url)
+    for attempt in range(RETRY_TOTAL + 1):
+        bucket.acquire()
+        started = time.perf_counter()
+        try:
+            resp = session.get(url, params=params or {}, timeout=DEFAULT_TIMEOUT, headers=headers or {})
+        except requests.RequestException as e:
+            http_error(url, e)
+            raise
+        elapsed = time.perf_counter() - started
+        bucket.observe(resp.status_code, resp.headers, elapsed)
+        observe_http(url, resp.status_code, elapsed, *_wire_stats(resp, attempt))
+        if resp.status_code != 429:
+            break
+    return resp
+
+
+def _wire_stats(resp: requests.Response, attempt: int) -> tuple[int, int]:
+    """Body bytes and retries behind one response: urllib3's own backoff retries plus 429 re-sends."""
+    if not isinstance(resp, requests.Response):  # test doubles
+        return 0, int(attempt > 0)
+    retries = getattr(resp.raw, "retries", None)
+    return len(resp.content), (len(retries.history) if retries is not None else 0) + int(attempt > 0)
+
+
+def cache_lookup(cache: ResponseCache, url: str, params: dict | None) -> tuple[str, CacheEntry | None]:
+    """Find the cache entry for a request, counting a hit when it is still fresh."""
+    key = cache.key(url, params)
+    entry = cache.load(key)
+    if entry is not None and entry.is_fresh():
+        cache.count("hits")
+    return key, entry
+
+
+def cache_response(
+    cache: ResponseCache,
+    key: str,
+    entry: CacheEntry | None,
+    resp: Any,
+    ttl: float | None,
+    final: bool | Callable[[Any], bool],
+) -> Any:
+    """
+    Settle a (possibly conditional) response against the cache and return its JSON body.
+    Works for both requests and httpx responses.
+    """
+    if resp.status_code == 304 and entry is not None:
+        cache.count("revalidated")
+        entry.fetched_at = time.time()
+        cache.store(key, entry)
+        return entry.body
+    resp.raise_for_status()
+    body = resp.json()
+    cache.count("misses")
+
+    permanent = final(body) if callable(final) else final
+    cache.store(key, CacheEntry(
+        body=body,
+        fetched_at=time.time(),
+        ttl=None if permanent else ttl,
+        etag=resp.headers.get("ETag"),
+        last_modified=resp.headers.get("Last-Modified"),
+    ))
+    return body
@@ -1,25 +1,73 @@
 from __future__ import annotations
-import requests
-from typing import Iterator, Dict, Any
+from datetime import date
+from typing import AsyncIterator, Iterator, Dict, Any
+from .cache import FINAL_STATES, SCHEDULE_TTL, LIVE_TTL
+from .http import get_json, lazy_module_session, lazy_session
 
 MLB_BASE = "https://statsapi.mlb.com/api/v1"
 
-def iter_season_game_ids(season: int) -> Iterator[int]:
+_session = lazy_session("statline-core/mlb")
+
+__getattr__ = lazy_module_session(__name__, _session)
+
+
+def _get_json(path: str, params: dict | None = None, ttl: float | None = LIVE_TTL, final=False) -> Any:
+    return get_json(_session(), f"{MLB_BASE}{path}", params=params, ttl=ttl, final=final)
+
+def _feed_is_final(feed: Dict[str, Any]) -> bool:
+    return (feed.get("gameData", {}).get("status", {}) or {}).get("detailedState") in FINAL_STATES
+
+def iter_season_games(season: int) -> Iterator[Dict[str, Any]]:
+    """
+    Yields full schedule game metadata for the season: gamePk, gameDate, season,
+    status (abstractGameState/detailedState) and teams.home/away.team (id, name).
+    """
     params = {"sportId": 1, "season": season}
-    r = requests.get(f"{MLB_BASE}/schedule", params=params)
-    r.raise_for_status()
-    data = r.json()
-    for date in data.get("dates", []):
-        for g in date.get("games", []):
+    data = _get_json("/schedule", params=params, ttl=SCHEDULE_TTL)
+    for d in data.get("dates", []):
+        for g in d.get("games", []):
             if g.get("gamePk"):
-                yield int(g["gamePk"])
+                yield g
+
+def iter_season_game_ids(season: int) -> Iterator[int]:
+    for g in iter_season_games(season):
+        yield int(g["gamePk"])
 
-def get_boxscore(game_pk: int) -> Dict[str, Any]:
-    r = requests.get(f"{MLB_BASE}/game/{game_pk}/boxscore")
-    r.raise_for_status()
-    return r.json()
+def get_boxscore(game_pk: int, final: bool = False) -> Dict[str, Any]:
+    """Boxscores carry no game state; pass final=True when the caller knows the game is over."""
+    return _get_json(f"/game/{game_pk}/boxscore", final=final)
 
 def get_game_feed(game_pk: int) -> Dict[str, Any]:
-    r = requests.get(f"{MLB_BASE}/game/{game_pk}/feed/live")
-    r.raise_for_status()
-    return r.json()
+    return _get_json(f"/game/{game_pk}/feed/live", final=_feed_is_final)
+
+def iter_schedule(start_date: date, end_date: date) -> Iterator[Dict[str, Any]]:
+    """
+    Yields raw schedule game dicts (gamePk, gameDate, season, status, teams) between two dates, inclusive.
+    """
+    params = {"sportId": 1, "startDate": start_date.isoformat(), "endDate": end_date.isoformat()}
+    data = _get_json("/schedule", params=params, ttl=SCHEDULE_TTL)
+    for d in data.get("dates", []):
+        for g in d.get("games", []):
+            if g.get("gamePk"):
+                yield g
+
+
+# ---- asyncio variants (see providers/aio.py) ----
+
+async def aiter_season_games(client, season: int) -> AsyncIterator[Dict[str, Any]]:
+    params = {"sportId": 1, "season": season}
+    data = await client.get_json(f"{MLB_BASE}/schedule", params=params, ttl=SCHEDULE_TTL)
+    for d in data.get("dates", []):
+        for g in d.get("games", []):
+            if g.get("gamePk"):
+                yield g
+
+async def aiter_season_game_ids(client, season: int) -> AsyncIterator[int]:
+    async for g in aiter_season_games(client, season):
+        yield int(g["gamePk"])
+
+async def aget_boxscore(client, game_pk: int, final: bool = False) -> Dict[str, Any]:
+    return await client.get_json(f"{MLB_BASE}/game/{game_pk}/boxscore", final=final)
+
+async def aget_game_feed(client, game_pk: int) -> Dict[str, Any]:
+    return await client.get_json(f"{MLB_BASE}/game/{game_pk}/feed/live", final=_feed_is_final)
@@ -1,33 +1,83 @@
 from __future__ import annotations
-import time
-from typing import Iterator
-import requests
+from datetime import date
+from typing import AsyncIterator, Iterator
+from ..config import settings
+from .cache import SCHEDULE_TTL, LIVE_TTL, REFERENCE_TTL
+from .http import get_json, lazy_module_session, lazy_session
 
 BASE = "https://api.balldontlie.io/v1"
+PER_PAGE = 100  # the API's largest page
 
-def _paginate(endpoint: str, params: dict) -> Iterator[dict]:
-    page = 1
-    while True:
-        resp = requests.get(f"{BASE}/{endpoint}", params={**params, "page": page, "per_page": 100})
-        resp.raise_for_status()
-        data = resp.json()
+def _auth() -> dict | None:
+    return {"Authorization": settings.balldontlie_api_key} if settings.balldontlie_api_key else None
+
+_session = lazy_session("statline-core/nba", headers=_auth())
+
+__getattr__ = lazy_module_session(__name__, _session)
+
+def _next_page(params: dict, meta: dict) -> dict | None:
+    """
+    Query for the page after the one `meta` describes: cursor pagination (meta.next_cursor)
+    when the API sends a cursor, page numbers (meta.total_pages) otherwise; None at the end.
+    """
+    if meta.get("next_cursor") is not None:
+        return {**{k: v for k, v in params.items() if k != "page"}, "cursor": meta["next_cursor"]}
+    if "next_cursor" in meta or params.get("page", 1) >= (meta.get("total_pages") or 1):
+        return None
+    return {**params, "page": params.get("page", 1) + 1}
+
+def _paginate(endpoint: str, params: dict, ttl: float | None = LIVE_TTL, final: bool = False) -> Iterator[dict]:
+    query: dict | None = {**params, "page": 1, "per_page": PER_PAGE}
+    while query is not None:
+        data = get_json(_session(), f"{BASE}/{endpoint}", params=query, ttl=ttl, final=final)
         for item in data.get("data", []):
             yield item
-        meta = data.get("meta", {})
-        total_pages = meta.get("total_pages") or 1
-        if page >= total_pages:
-            break
-        page += 1
-        time.sleep(0.2)
+        query = _next_page(query, data.get("meta", {}))
+
+def _dates(start: date, end: date) -> dict:
+    return {"start_date": start.isoformat(), "end_date": end.isoformat()}
 
 def iter_season_games(season: int) -> Iterator[dict]:
-    yield from _paginate("games", {"seasons[]": season})
+    yield from _paginate("games", {"seasons[]": season}, ttl=SCHEDULE_TTL)
+
+def iter_games(start: date, end: date) -> Iterator[dict]:
+    yield from _paginate("games", _dates(start, end), ttl=SCHEDULE_TTL)
+
+def get_game_stats(game_id: int, final: bool = False) -> list[dict]:
+    """Pass final=True for finished games so their stat pages are cached for good."""
+    return list(_paginate("stats", {"game_ids[]": game_id}, final=final))
 
-def get_game_stats(game_id: int) -> list[dict]:
-    return list(_paginate("stats", {"game_ids[]": game_id}))
+def iter_season_stats(season: int, final: bool = False) -> Iterator[dict]:
+    """
+    Every player line of a season, PER_PAGE per request, each with its game, team and
+    player embedded. Pass final=True once every game of the season is Final.
+    """
+    yield from _paginate("stats", {"seasons[]": season}, final=final)
+
+def iter_stats(start: date, end: date) -> Iterator[dict]:
+    """Every player line of the games played from `start` through `end`."""
+    yield from _paginate("stats", _dates(start, end))
 
 def iter_players() -> Iterator[dict]:
-    yield from _paginate("players", {})
+    yield from _paginate("players", {}, ttl=REFERENCE_TTL)
 
 def iter_teams() -> Iterator[dict]:
-    yield from _paginate("teams", {})
+    yield from _paginate("teams", {}, ttl=REFERENCE_TTL)
+
+# ---- asyncio variants (see providers/aio.py) ----
+
+async def _apaginate(client, endpoint: str, params: dict, ttl: float | None = LIVE_TTL, final: bool = False) -> AsyncIterator[dict]:
+    query: dict | None = {**params, "page": 1, "per_page": PER_PAGE}
+    while query is not None:
+        # the AsyncClient is shared across providers, so the key goes on each request
+        data = await client.get_json(f"{BASE}/{endpoint}", params=query, ttl=ttl, final=final, headers=_auth())
+        for item in data.get("data", []):
+            yield item
+        query = _next_page(query, data.get("meta", {}))
+
+async def aiter_season_games(client, season: int) -> AsyncIterator[dict]:
+    async for g in _apaginate(client, "games", {"seasons[]": season}, ttl=SCHEDULE_TTL):
+        yield g
+
+async def aget_game_stats(client, game_id: int, final: bool = False) -> list[dict]:
+    return [s async for s in _apaginate(client, "stats", {"game_ids[]": game_id}, final=final)]
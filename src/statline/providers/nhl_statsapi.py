@@ -1,57 +1,73 @@
 from __future__ import annotations
-import requests
-from typing import Iterator, Dict, Any
-from urllib3.util.retry import Retry
-from requests.adapters import HTTPAdapter
+from datetime import date
+from typing import AsyncIterator, Iterator, Dict, Any
+from .cache import SCHEDULE_TTL, LIVE_TTL
+from .http import get_json, lazy_module_session, lazy_session
 
 NHL_BASE = "https://statsapi.web.nhl.com/api/v1"
-_DEFAULT_TIMEOUT = 15  # seconds
 
 
-def _session() -> requests.Session:
-    """
-    Build a Session with robust retries for transient network/DNS hiccups.
-    """
-    s = requests.Session()
-    retry = Retry(
-        total=5,                # total attempts
-        connect=5,              # DNS/connect retries
-        read=5,
-        backoff_factor=0.8,     # exponential backoff: 0.8, 1.6, 3.2, ...
-        status_forcelist=(429, 500, 502, 503, 504),
-        allowed_methods=frozenset(["GET"]),
-        raise_on_status=False,
-    )
-    adapter = HTTPAdapter(max_retries=retry)
-    s.mount("https://", adapter)
-    s.mount("http://", adapter)
-    s.headers.update({"User-Agent": "statline-core/nhl"})
-    return s
+# pooled Session with robust retries for transient network/DNS hiccups, built on first request
+_session = lazy_session("statline-core/nhl")
 
+__getattr__ = lazy_module_session(__name__, _session)
 
-_SESSION = _session()
 
+def _get_json(path: str, params: dict | None = None, ttl: float | None = LIVE_TTL, final=False) -> Any:
+    return get_json(_session(), f"{NHL_BASE}{path}", params=params, ttl=ttl, final=final)
 
-def _get(path: str, params: dict | None = None) -> requests.Response:
-    resp = _SESSION.get(f"{NHL_BASE}{path}", params=params or {}, timeout=_DEFAULT_TIMEOUT)
-    resp.raise_for_status()
-    return resp
+
+def iter_season_schedule(season_str: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yields raw schedule game dicts (gamePk, gameDate, season, status, teams) for the NHL season.
+    Retries network issues automatically via the session.
+    """
+    data = _get_json("/schedule", params={"season": season_str}, ttl=SCHEDULE_TTL)
+    for d in data.get("dates", []):
+        for g in d.get("games", []):
+            if g.get("gamePk"):
+                yield g
 
 
 def iter_season_game_ids(season_str: str) -> Iterator[int]:
     """
     Yields gamePk for the NHL season (e.g., '20232024').
-    Retries network issues automatically via the session.
     """
-    r = _get("/schedule", params={"season": season_str})
-    data = r.json()
+    for g in iter_season_schedule(season_str):
+        yield int(g["gamePk"])
+
+
+def get_boxscore(game_pk: int, final: bool = False) -> Dict[str, Any]:
+    """Boxscores carry no game state; pass final=True when the caller knows the game is over."""
+    return _get_json(f"/game/{game_pk}/boxscore", final=final)
+
+
+def iter_schedule(start_date: date, end_date: date) -> Iterator[Dict[str, Any]]:
+    """
+    Yields raw schedule game dicts (gamePk, gameDate, season, status, teams) between two dates, inclusive.
+    """
+    params = {"startDate": start_date.isoformat(), "endDate": end_date.isoformat()}
+    data = _get_json("/schedule", params=params, ttl=SCHEDULE_TTL)
     for d in data.get("dates", []):
         for g in d.get("games", []):
-            game_pk = g.get("gamePk")
-            if game_pk:
-                yield int(game_pk)
+            if g.get("gamePk"):
+                yield g
+
+
+# ---- asyncio variants (see providers/aio.py) ----
+
+async def aiter_season_schedule(client, season_str: str) -> AsyncIterator[Dict[str, Any]]:
+    data = await client.get_json(f"{NHL_BASE}/schedule", params={"season": season_str}, ttl=SCHEDULE_TTL)
+    for d in data.get("dates", []):
+        for g in d.get("games", []):
+            if g.get("gamePk"):
+                yield g
+
+
+async def aiter_season_game_ids(client, season_str: str) -> AsyncIterator[int]:
+    async for g in aiter_season_schedule(client, season_str):
+        yield int(g["gamePk"])
 
 
-def get_boxscore(game_pk: int) -> Dict[str, Any]:
-    r = _get(f"/game/{game_pk}/boxscore")
-    return r.json()
+async def aget_boxscore(client, game_pk: int, final: bool = False) -> Dict[str, Any]:
+    return await client.get_json(f"{NHL_BASE}/game/{game_pk}/boxscore", final=final)
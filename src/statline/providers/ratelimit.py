@@ -0,0 +1,152 @@
+from __future__ import annotations
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Mapping
+from urllib.parse import urlsplit
+
+# Starting request rates (req/sec) per API host; anything else starts at DEFAULT_RATE.
+# balldontlie's 5/sec matches the fixed 0.2s page sleep this replaces.
+HOST_RATES = {
+    "api.balldontlie.io": 5.0,
+    "statsapi.mlb.com": 20.0,
+    "statsapi.web.nhl.com": 20.0,
+}
+DEFAULT_RATE = 10.0
+MIN_RATE = 0.2
+MAX_RATE = 100.0
+INCREASE_STEP = 0.1   # req/sec added per clean response while probing for headroom
+DECREASE_FACTOR = 0.5  # rate multiplier on 429
+
+
+class TokenBucket:
+    """
+    Token bucket for one API host whose rate adapts to what the server tells us:
+    X-RateLimit-Remaining / X-RateLimit-Reset (or the IETF RateLimit-* names) set
+    the rate to spend the remaining quota evenly until the reset; 429s halve the
+    rate and pause for Retry-After; clean responses without headers probe upward.
+    """
+
+    def __init__(self, rate: float, max_rate: float = MAX_RATE, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.clock = clock
+        self.tokens = 1.0
+        self.updated = clock()
+        self.blocked_until = 0.0
+        self.requests = 0
+        self.throttle_events = 0
+        self.throttled_seconds = 0.0
+        self.request_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token, returning how long the caller must wait before sending."""
+        with self._lock:
+            now = self.clock()
+            capacity = max(1.0, self.rate)
+            self.tokens = min(capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1.0
+            wait = max(0.0, -self.tokens / self.rate, self.blocked_until - now)
+            self.requests += 1
+            self.throttled_seconds += wait
+            return wait
+
+    def acquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def observe(self, status: int, headers: Mapping[str, str], elapsed: float = 0.0) -> None:
+        """Adapt the rate to a response's status and rate-limit headers."""
+        with self._lock:
+            now = self.clock()
+            self.request_seconds += elapsed
+            if status == 429:
+                self.throttle_events += 1
+                self.rate = max(MIN_RATE, self.rate * DECREASE_FACTOR)
+                pause = _seconds(headers.get("Retry-After")) or 1.0 / self.rate
+                self.blocked_until = max(self.blocked_until, now + pause)
+                self.tokens = min(self.tokens, 0.0)
+                return
+
+            remaining = _number(_header(headers, "Remaining"))
+            reset = _seconds(_header(headers, "Reset"))
+            if remaining is not None and reset is not None:
+                if remaining <= 0:
+                    self.blocked_until = max(self.blocked_until, now + reset)
+                else:
+                    self.rate = min(self.max_rate, max(MIN_RATE, remaining / max(reset, 1.0)))
+            elif status < 400:
+                self.rate = min(self.max_rate, self.rate + INCREASE_STEP)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "rate": round(self.rate, 2),
+            "throttle_events": self.throttle_events,
+            "throttled_s": round(self.throttled_seconds, 3),
+            "request_s": round(self.request_seconds, 3),
+        }
+
+
+class RateLimiter:
+    """Registry of one TokenBucket per API host, shared by sync and async fetch paths."""
+
+    def __init__(self, host_rates: Mapping[str, float] | None = None, default_rate: float = DEFAULT_RATE):
+        self.host_rates = dict(HOST_RATES if host_rates is None else host_rates)
+        self.default_rate = default_rate
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).hostname or url
+        with self._lock:
+            b = self._buckets.get(host)
+            if b is None:
+                b = self._buckets[host] = TokenBucket(self.host_rates.get(host, self.default_rate))
+            return b
+
+    def set_rate(self, host: str, rate: float, max_rate: float = MAX_RATE) -> TokenBucket:
+        """Start `host` over with a fresh bucket (e.g. to pace a replay differently from the live API)."""
+        with self._lock:
+            b = self._buckets[host] = TokenBucket(rate, max_rate)
+            return b
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {host: b.stats() for host, b in self._buckets.items()}
+
+
+LIMITER = RateLimiter()
+
+
+def _header(headers: Mapping[str, str], suffix: str) -> str | None:
+    for name in (f"X-RateLimit-{suffix}", f"RateLimit-{suffix}"):
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+def _number(value: str | None) -> float | None:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _seconds(value: str | None) -> float | None:
+    """Delta-seconds or a Unix timestamp (some APIs send epoch resets) -> seconds from now."""
+    n = _number(value)
+    if n is None:
+        return None
+    if n > 1e9:
+        n = n - time.time()
+    return max(0.0, n)
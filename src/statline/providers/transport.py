@@ -0,0 +1,330 @@
+"""
+Record/replay transport under the provider modules.
+
+Recorder saves every response the providers receive into a FixtureArchive; Replay
+sends every request to a StandInServer instead of the real API host. Both plug in
+below http.get_json (and AsyncClient), so caching, rate limiting and retries run
+exactly as they do against the live APIs:
+
+    http.set_transport(Recorder("fixtures/"))          # HTTP_RECORD_DIR=fixtures/
+    with StandInServer(FixtureArchive("fixtures/"), latency=0.05, error_rate=0.01) as srv:
+        http.set_transport(Replay(srv.url))            # HTTP_REPLAY_URL=http://127.0.0.1:8765
+        backfill_mlb([2024])
+
+Replayed URLs keep the upstream host as their first path segment
+(http://127.0.0.1:8765/statsapi.mlb.com/api/v1/schedule?...), so one server stands in
+for every provider.
+"""
+from __future__ import annotations
+import gzip
+import hashlib
+import json
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Mapping
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from requests.adapters import HTTPAdapter
+
+# response headers worth replaying; everything else is transport noise
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+def fixture_key(url: str) -> str:
+    """Scheme-less host + path + sorted query, the identity of a recorded request."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{parts.netloc}{parts.path}" + (f"?{query}" if query else "")
+
+
+@dataclass
+class Fixture:
+    url: str
+    status: int
+    headers: dict[str, str]
+    body: str
+
+
+class FixtureArchive:
+    """
+    Recorded responses on disk, one gzipped JSON file per request under its host:
+    fixtures/statsapi.mlb.com/<sha256 of fixture_key>.json.gz. Writes go through a
+    temp file + rename like ResponseCache, so concurrent fetch workers can record.
+    """
+
+    def __init__(self, root: str | os.PathLike):
+        self.root = Path(root)
+
+    def _path(self, url: str) -> Path:
+        key = fixture_key(url)
+        return self.root / urlsplit(url).netloc / f"{hashlib.sha256(key.encode()).hexdigest()}.json.gz"
+
+    def save(self, url: str, status: int, headers: Mapping[str, str], body: bytes) -> None:
+        path = self._path(url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        kept = {h: headers[h] for h in KEPT_HEADERS if headers.get(h) is not None}
+        data = {"url": url, "status": status, "headers": kept, "body": body.decode("utf-8", "replace")}
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def save_json(self, url: str, payload: Any, status: int = 200) -> None:
+        """Store a JSON document as the response to `url` (synthetic fixtures, tests)."""
+        self.save(url, status, {"Content-Type": "application/json"}, json.dumps(payload).encode("utf-8"))
+
+    def load(self, url: str) -> Fixture | None:
+        try:
+            with gzip.open(self._path(url), "rt", encoding="utf-8") as f:
+                return Fixture(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError):
+            return None  # truncated; treat as not recorded
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.root.glob("*/*.json.gz"))
+
+
+# ---- requests / httpx plumbing ---------------------------------------------------
+
+def replay_url(url: str, base_url: str) -> str:
+    """https://host/path?q -> <base_url>/host/path?q"""
+    parts = urlsplit(url)
+    return f"{base_url.rstrip('/')}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+
+def _recordable(status: int) -> bool:
+    # transient failures are not part of an API's recorded behavior
+    return status < 500 and status != 429
+
+
+class _RecordingAdapter(HTTPAdapter):
+    def __init__(self, archive: FixtureArchive, **kwargs):
+        self.archive = archive
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        resp = super().send(request, **kwargs)
+        if _recordable(resp.status_code) and resp.status_code != 304:
+            self.archive.save(request.url, resp.status_code, resp.headers, resp.content)
+        return resp
+
+
+class _ReplayAdapter(HTTPAdapter):
+    def __init__(self, base_url: str, **kwargs):
+        self.base_url = base_url
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        request.url = replay_url(request.url, self.base_url)
+        return super().send(request, **kwargs)
+
+
+class Recorder:
+    """Transport that talks to the live APIs and archives every response it gets."""
+
+    def __init__(self, archive: FixtureArchive | str | os.PathLike):
+        self.archive = archive if isinstance(archive, FixtureArchive) else FixtureArchive(archive)
+
+    def adapter(self, **kwargs) -> HTTPAdapter:
+        return _RecordingAdapter(self.archive, **kwargs)
+
+    def async_transport(self, limits: Any = None):
+        from .aio import _httpx
+        httpx = _httpx()
+        archive = self.archive
+
+        class _Recording(httpx.AsyncBaseTransport):
+            def __init__(self):
+                self.inner = httpx.AsyncHTTPTransport(limits=limits) if limits else httpx.AsyncHTTPTransport()
+
+            async def handle_async_request(self, request):
+                resp = await self.inner.handle_async_request(request)
+                if _recordable(resp.status_code) and resp.status_code != 304:
+                    body = await resp.aread()
+                    archive.save(str(request.url), resp.status_code, resp.headers, body)
+                return resp
+
+            async def aclose(self) -> None:
+                await self.inner.aclose()
+
+        return _Recording()
+
+
+class Replay:
+    """Transport that sends every provider request to a StandInServer at `base_url`."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+
+    def adapter(self, **kwargs) -> HTTPAdapter:
+        return _ReplayAdapter(self.base_url, **kwargs)
+
+    def async_transport(self, limits: Any = None):
+        from .aio import _httpx
+        httpx = _httpx()
+        base_url = self.base_url
+
+        class _Replaying(httpx.AsyncBaseTransport):
+            def __init__(self):
+                self.inner = httpx.AsyncHTTPTransport(limits=limits) if limits else httpx.AsyncHTTPTransport()
+
+            async def handle_async_request(self, request):
+                request.url = httpx.URL(replay_url(str(request.url), base_url))
+                return await self.inner.handle_async_request(request)
+
+            async def aclose(self) -> None:
+                await self.inner.aclose()
+
+        return _Replaying()
+
+
+# ---- stand-in server ----------------------------------------------------------------
+
+class StandInServer:
+    """
+    Local HTTP/1.1 keep-alive server answering replayed requests from a FixtureArchive,
+    on a background thread. Every response waits `latency` seconds plus up to `jitter`;
+    a share `error_rate` of requests (seeded, so runs are reproducible) get
+    `error_status` instead, with Retry-After: 0 for 429/503, or a dropped connection
+    when error_status is 0. Requests with no fixture get a 404.
+    """
+
+    def __init__(
+        self,
+        archive: FixtureArchive,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: int = 0,
+    ):
+        self.archive = archive
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._bodies: dict[str, Fixture | None] = {}
+        self.requests = 0
+        self.served = 0
+        self.injected = 0
+        self.missing = 0
+        self._httpd = ThreadingHTTPServer((host, port), _handler(self))
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stand-in-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def serve_forever(self) -> None:
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"requests": self.requests, "served": self.served, "injected": self.injected, "missing": self.missing}
+
+    def _draw(self) -> tuple[float, bool]:
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + (self._rng.uniform(0.0, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+            if fail:
+                self.injected += 1
+            return delay, fail
+
+    def _fixture(self, url: str) -> Fixture | None:
+        key = fixture_key(url)
+        if key not in self._bodies:
+            fixture = self.archive.load(url)
+            with self._lock:
+                self._bodies[key] = fixture
+        fixture = self._bodies[key]
+        with self._lock:
+            if fixture is None:
+                self.missing += 1
+            else:
+                self.served += 1
+        return fixture
+
+
+def _handler(server: StandInServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self) -> None:
+            super().setup()
+            # headers and body go out in separate writes; don't let Nagle hold the body back
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def do_GET(self) -> None:
+            delay, fail = server._draw()
+            if delay > 0:
+                time.sleep(delay)
+            if fail:
+                if server.error_status == 0:
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                    self.close_connection = True
+                    return
+                extra = {"Retry-After": "0"} if server.error_status in (429, 503) else {}
+                return self._send(server.error_status, b'{"message": "injected error"}', extra)
+            # the upstream host is the first path segment
+            upstream = "https://" + self.path.lstrip("/")
+            fixture = server._fixture(upstream)
+            if fixture is None:
+                return self._send(404, json.dumps({"message": f"no fixture for {fixture_key(upstream)}"}).encode())
+            etag = fixture.headers.get("ETag")
+            if etag and self.headers.get("If-None-Match") == etag:
+                return self._send(304, b"", {"ETag": etag})
+            self._send(fixture.status, fixture.body.encode("utf-8"), fixture.headers)
+
+        def _send(self, status: int, body: bytes, headers: Mapping[str, str] | None = None) -> None:
+            self.send_response(status)
+            headers = {"Content-Type": "application/json", **(headers or {})}
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body and status != 304:
+                self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
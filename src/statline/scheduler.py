@@ -1,23 +1,252 @@
+"""
+Game-day-aware ingest service. Each league gets three jobs instead of one daily
+full refresh:
+
+    plan:<LG>       daily at SCHEDULE_PLAN_AT, and on start: read the schedule around
+                    today and open a poll window from the first game's start to the
+                    last one's expected end (GAME_LENGTH + FINISH_GRACE)
+    poll:<LG>       every SCHEDULE_POLL_MINUTES inside that window: fetch only games in
+                    progress or just finished that are not stored as Final yet; stops
+                    early once the last game has started and nothing is left open
+    reconcile:<LG>  nightly at SCHEDULE_RECONCILE_AT: the incremental refresh from the
+                    league watermark, which catches anything the polls missed and
+                    advances the watermark, then PRAGMA optimize
+
+Polls and reconciliations hold the league's lock (statline.jobs), so they never
+overlap each other or a manual `statline ingest`, and every job records its outcome
+in job_state. After a restart, a window planned earlier that is still open resumes
+without re-reading the schedule, and a reconciliation missed while the service was
+down runs right away (on a fresh database that first one is the two-year backfill).
+
+    statline schedule --leagues MLB,NHL
+"""
 from __future__ import annotations
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Iterable
+from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.schedulers.blocking import BlockingScheduler
-from .cli import ingest_two_years
-
-def _job():
-    print(f"[{datetime.now(timezone.utc).isoformat()}] Daily two-year backfill starting...")
-    ingest_two_years()
-    print(f"[{datetime.now(timezone.utc).isoformat()}] Done.")
-
-def main(run_days: int = 7):
-    sched = BlockingScheduler(timezone="UTC")
-    sched.add_job(_job, "interval", days=1, next_run_time=datetime.now(timezone.utc))
-    end_time = datetime.now(timezone.utc) + timedelta(days=run_days, seconds=5)
-    try:
-        while datetime.now(timezone.utc) < end_time:
-            sched._main_loop()
-    finally:
-        try: sched.shutdown(wait=False)
-        except Exception: pass
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from . import jobs
+from .config import settings
+from .etl.incremental import game_date, is_void
+from .metrics import instrument_run
+
+# start to Final for a typical game, extra innings / overtime included
+GAME_LENGTH = {"MLB": timedelta(hours=3, minutes=30), "NHL": timedelta(hours=3)}
+# keep polling this long past a game's expected end (delays, late stat corrections)
+FINISH_GRACE = timedelta(hours=2)
+# a plan covers games starting before the next one
+PLAN_HORIZON = timedelta(days=1)
+# a reconciliation older than this on start means the nightly run was missed
+RECONCILE_EVERY = timedelta(days=1, hours=1)
+
+
+def game_window(
+    scheduled: Iterable[dict[str, Any]], game_length: timedelta, now: datetime, horizon: timedelta = PLAN_HORIZON,
+) -> tuple[datetime, datetime] | None:
+    """
+    (first start, last start + game_length + FINISH_GRACE) over the schedule games that
+    are not over yet and start within `horizon` of `now`; None on a day without games.
+    """
+    starts = [
+        d for g in scheduled
+        if not is_void(g) and (d := game_date(g)) is not None and d + game_length + FINISH_GRACE > now
+        and d < now + horizon
+    ]
+    if not starts:
+        return None
+    return min(starts), max(starts) + game_length + FINISH_GRACE
+
+
+def _schedule(code: str, start: date, end: date) -> list[dict[str, Any]]:
+    if code == "MLB":
+        from .providers.mlb_statsapi import iter_schedule
+    elif code == "NHL":
+        from .providers.nhl_statsapi import iter_schedule
+    else:
+        raise ValueError(f"League {code} not implemented")
+    return list(iter_schedule(start, end))
+
+
+def _poll(code: str, since: timedelta, workers: int) -> int:
+    if code == "MLB":
+        from .etl.ingest_mlb import poll_mlb
+        return poll_mlb(since, workers=workers)
+    from .etl.ingest_nhl import poll_nhl
+    return poll_nhl(since, workers=workers)
+
+
+def _refresh(code: str, workers: int) -> None:
+    if code == "MLB":
+        from .etl.ingest_mlb import refresh_mlb
+        return refresh_mlb(workers=workers)
+    from .etl.ingest_nhl import refresh_nhl
+    return refresh_nhl(workers=workers)
+
+
+def _utc(dt: datetime | None) -> datetime | None:
+    # job_state stores naive UTC like the rest of the schema
+    return dt.replace(tzinfo=timezone.utc) if dt is not None and dt.tzinfo is None else dt
+
+
+def _naive(dt: datetime | None) -> datetime | None:
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt is not None else None
+
+
+class Service:
+    """The plan/poll/reconcile jobs of `leagues` on one APScheduler, run one at a time."""
+
+    def __init__(
+        self,
+        leagues: Iterable[str],
+        poll_minutes: int = settings.schedule_poll_minutes,
+        workers: int = settings.ingest_workers,
+        scheduler: Any = None,
+    ):
+        self.leagues = [code.strip().upper() for code in leagues if code.strip()]
+        unknown = [code for code in self.leagues if code not in GAME_LENGTH]
+        if unknown:
+            raise ValueError(f"No game-day schedule for {unknown}; expected some of {sorted(GAME_LENGTH)}")
+        self.poll_minutes = poll_minutes
+        self.workers = workers
+        # one worker: SQLite takes one writer anyway, and the metrics registry is per run
+        self.scheduler = scheduler or BlockingScheduler(
+            timezone=timezone.utc,
+            executors={"default": ThreadPoolExecutor(1)},
+            job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 15 * 60},
+        )
+
+    def setup(self, now: datetime | None = None) -> None:
+        """Add the daily jobs and restore each league's persisted state."""
+        now = now or datetime.now(timezone.utc)
+        plan_h, plan_m = _hhmm(settings.schedule_plan_at)
+        rec_h, rec_m = _hhmm(settings.schedule_reconcile_at)
+        for code in self.leagues:
+            self.scheduler.add_job(self.plan, CronTrigger(hour=plan_h, minute=plan_m, timezone=timezone.utc),
+                                   args=[code], id=f"plan:{code}", replace_existing=True)
+            self.scheduler.add_job(self.reconcile, CronTrigger(hour=rec_h, minute=rec_m, timezone=timezone.utc),
+                                   args=[code], id=f"reconcile:{code}", replace_existing=True)
+            self._restore(code, now)
+
+    def _restore(self, code: str, now: datetime) -> None:
+        plan = jobs.load_state(f"plan:{code}") or {}
+        planned = _utc(plan.get("last_success_at"))
+        if planned is not None and now - planned < PLAN_HORIZON:
+            window = jobs.load_state(f"poll:{code}") or {}
+            start, end = _utc(window.get("window_start")), _utc(window.get("window_end"))
+            if start is not None and end is not None and end > now:
+                print(f"{code}: resuming the poll window {start:%H:%M}..{end:%H:%M} UTC")
+                self._schedule_polls(code, start, end, now)
+        else:
+            self.scheduler.add_job(self.plan, DateTrigger(now), args=[code], id=f"plan-now:{code}", replace_existing=True)
+        reconciled = _utc((jobs.load_state(f"reconcile:{code}") or {}).get("last_success_at"))
+        if reconciled is None or now - reconciled > RECONCILE_EVERY:
+            self.scheduler.add_job(self.reconcile, DateTrigger(now), args=[code], id=f"reconcile-now:{code}",
+                                   replace_existing=True)
+
+    def run(self, days: float | None = None) -> None:
+        """Block running jobs until interrupted, or for `days`."""
+        self.setup()
+        if days:
+            stop_at = datetime.now(timezone.utc) + timedelta(days=days)
+            self.scheduler.add_job(lambda: self.scheduler.shutdown(wait=False), DateTrigger(stop_at), id="stop")
+        try:
+            self.scheduler.start()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+
+    # ---- jobs ----------------------------------------------------------------------
+
+    def plan(self, code: str, now: datetime | None = None) -> tuple[datetime, datetime] | None:
+        now = now or datetime.now(timezone.utc)
+
+        def run() -> tuple[datetime, datetime] | None:
+            scheduled = _schedule(code, (now - timedelta(days=1)).date(), (now + PLAN_HORIZON).date())
+            window = game_window(scheduled, GAME_LENGTH[code], now)
+            jobs.save_state(f"poll:{code}", window_start=_naive(window and window[0]), window_end=_naive(window and window[1]))
+            if window is None:
+                print(f"{code}: no games in the next {PLAN_HORIZON}; not polling")
+                return None
+            print(f"{code}: polling every {self.poll_minutes} min from {window[0]:%Y-%m-%d %H:%M} "
+                  f"to {window[1]:%Y-%m-%d %H:%M} UTC")
+            self._schedule_polls(code, window[0], window[1], now)
+            return window
+
+        return self._run(f"plan:{code}", run)
+
+    def poll(self, code: str, now: datetime | None = None) -> int | None:
+        since = GAME_LENGTH[code] + FINISH_GRACE
+
+        def run() -> int:
+            fetched = _poll(code, since, self.workers)
+            end = _utc((jobs.load_state(f"poll:{code}") or {}).get("window_end"))
+            at = now or datetime.now(timezone.utc)
+            if not fetched and (end is None or at >= end - since):
+                # the last game has started and every one since the window opened is stored Final
+                self._stop_polls(code, at)
+            return fetched
+
+        return self._run(f"poll:{code}", run, lock=code)
+
+    def reconcile(self, code: str) -> None:
+        def run() -> None:
+            from .db import optimize
+            _refresh(code, self.workers)
+            optimize()
+
+        self._run(f"reconcile:{code}", run, lock=code)
+
+    # ---- plumbing ------------------------------------------------------------------
+
+    def _schedule_polls(self, code: str, start: datetime, end: datetime, now: datetime) -> None:
+        trigger = IntervalTrigger(minutes=self.poll_minutes, start_date=max(start, now), end_date=end,
+                                  timezone=timezone.utc)
+        self.scheduler.add_job(self.poll, trigger, args=[code], id=f"poll:{code}", replace_existing=True)
+
+    def _stop_polls(self, code: str, now: datetime) -> None:
+        if self.scheduler.get_job(f"poll:{code}") is not None:
+            self.scheduler.remove_job(f"poll:{code}")
+        jobs.save_state(f"poll:{code}", window_end=_naive(now))
+        print(f"{code}: every game in the window is Final; polling stopped")
+
+    def _run(self, name: str, fn: Callable[[], Any], lock: str | None = None) -> Any:
+        """Run one job under the league lock, recording its outcome in job_state."""
+        jobs.record_start(name)
+        try:
+            with instrument_run(name, settings.run_report or None, settings.prometheus_file or None):
+                if lock is None:
+                    result = fn()
+                else:
+                    with jobs.locked(lock):
+                        result = fn()
+        except jobs.LockHeld as e:
+            print(f"⚠️ Skipping {name}: {e}")
+            jobs.record_finish(name, "skipped", str(e))
+            return None
+        except Exception as e:
+            print(f"⚠️ {name} failed: {e!r}")
+            jobs.record_finish(name, "failed", repr(e))
+            return None
+        jobs.record_finish(name, "ok")
+        return result
+
+
+def _hhmm(value: str) -> tuple[int, int]:
+    hour, _, minute = value.partition(":")
+    return int(hour), int(minute or 0)
+
+
+def main(leagues: Iterable[str] | None = None, run_days: float | None = None, http_cache: bool = settings.http_cache):
+    from .cli import _start_http_cache
+    from .db import get_engine, use_profile
+    from .migrations import migrate
+    migrate(get_engine())
+    use_profile("ingest")
+    _start_http_cache(http_cache)
+    Service(leagues or settings.schedule_leagues.split(",")).run(run_days)
+
 
 if __name__ == "__main__":
-    main(run_days=7)
+    main()
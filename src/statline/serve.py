@@ -0,0 +1,162 @@
+"""
+Local rolling-feature lookup service (features.lookup.FeatureLookup over a read-only
+connection pool, with its LRU cache invalidated by ingest commits):
+
+    statline serve --port 8766
+
+    GET  /features?league=NBA&player_id=123,124[&game_id=456]
+    POST /features   {"league": "NBA", "lookups": [{"player_id": 123, "game_id": 456}, ...]}
+    GET  /stats      cache counters and lookup latency (p50/p95 bucket bounds)
+    GET  /metrics    the lookup metrics as Prometheus text
+
+game_id asks for the features as of that game's start (earlier games only);
+without it the player's latest features are returned.
+"""
+from __future__ import annotations
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+from .config import settings
+from .features.lookup import FeatureLookup
+from .metrics import METRICS
+
+MAX_BODY = 8 * 1024 * 1024  # bytes accepted in a POST /features
+
+
+class LookupServer:
+    """ThreadingHTTPServer answering FeatureLookup requests as JSON, on a background thread or the caller's."""
+
+    def __init__(self, lookup: FeatureLookup, host: str = settings.serve_host, port: int = settings.serve_port):
+        self.lookup = lookup
+        self._httpd = ThreadingHTTPServer((host, port), _handler(self))
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "LookupServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="lookup-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "LookupServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def serve_forever(self) -> None:
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stats(self) -> dict[str, Any]:
+        latency = {
+            m["labels"]["cache"]: {k: m[k] for k in ("count", "p50", "p95")}
+            for m in METRICS.snapshot().get("statline_lookup_seconds", [])
+        }
+        return {"cache": self.lookup.cache.stats(), "latency_seconds": latency}
+
+    def features(self, league: str, lookups: list[tuple[int, int | None]]) -> dict[str, Any]:
+        return {"league": league.upper(), "results": [f.to_dict() for f in self.lookup.get_many(league, lookups)]}
+
+
+def _ids(values: list[str]) -> list[int]:
+    return [int(v) for value in values for v in value.split(",") if v.strip()]
+
+
+def _handler(server: LookupServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self) -> None:
+            super().setup()
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def do_GET(self) -> None:
+            parts = urlsplit(self.path)
+            if parts.path == "/stats":
+                return self._json(200, server.stats())
+            if parts.path == "/metrics":
+                return self._send(200, METRICS.to_prometheus().encode(), "text/plain; version=0.0.4")
+            if parts.path != "/features":
+                return self._json(404, {"error": f"no route {parts.path}"})
+            q = parse_qs(parts.query)
+            try:
+                players = _ids(q.get("player_id", []))
+                games = _ids(q.get("game_id", []))
+                if not q.get("league") or not players or len(games) > 1:
+                    raise ValueError("expected league, player_id (comma-separated ids) and at most one game_id")
+                game = games[0] if games else None
+                self._answer(q["league"][0], [(p, game) for p in players])
+            except ValueError as e:
+                self._json(400, {"error": str(e)})
+
+        def do_POST(self) -> None:
+            if urlsplit(self.path).path != "/features":
+                return self._json(404, {"error": f"no route {self.path}"})
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_BODY:
+                    raise ValueError(f"body over {MAX_BODY} bytes")
+                body = json.loads(self.rfile.read(length) or b"{}")
+                lookups = [(int(x["player_id"]), x.get("game_id")) for x in body.get("lookups", [])]
+                if not body.get("league"):
+                    raise ValueError("expected a league")
+                self._answer(body["league"], lookups)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                self._json(400, {"error": f"bad request: {e}"})
+
+        def _answer(self, league: str, lookups: list[tuple[int, int | None]]) -> None:
+            self._json(200, server.features(league, lookups))
+
+        def _json(self, status: int, payload: Any) -> None:
+            self._send(status, json.dumps(payload, separators=(",", ":")).encode(), "application/json")
+
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def main(
+    host: str = settings.serve_host,
+    port: int = settings.serve_port,
+    cache_size: int = settings.serve_cache_size,
+    check_every: float = settings.serve_check_seconds,
+) -> None:
+    from .db import get_engine, read_only_engine
+    from .migrations import migrate
+    migrate(get_engine())  # stats_versions and the lookup indexes may predate this database
+    lookup = FeatureLookup(read_only_engine(), cache_size, check_every)
+    server = LookupServer(lookup, host, port)
+    print(f"Serving rolling features ({', '.join(f'{s}_{w}' for s, w in lookup.specs)}) at {server.url}; Ctrl-C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print("Lookup cache: " + ", ".join(f"{k}={v}" for k, v in lookup.cache.stats().items()))
+
+
+if __name__ == "__main__":
+    main()
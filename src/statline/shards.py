@@ -0,0 +1,332 @@
+"""
+Optional sharded SQLite layout: the DATABASE_URL file becomes a catalog holding
+leagues, teams, players, prop lines and ingest state, while each league/season's
+games, player_game_stats and player_rolling_features live in their own file under
+SQLITE_SHARD_DIR. A daily refresh then rewrites only the current season's shard
+(plus the small catalog) instead of one file holding every season.
+
+Every pooled connection ATTACHes the registered shards on checkout and shadows the
+sharded tables with TEMP views (main UNION ALL each shard), so SessionLocal and the
+feature/backtest readers keep querying `games` etc. as one logical database. Writers
+target a physical table with route(): a per-statement schema_translate_map.
+
+Shard ids are disjoint: each shard's AUTOINCREMENT sequence starts at
+shard.id * SHARD_ID_SPAN, so game ids stay unique across files. SQLite caps
+attached databases per connection (SQLITE_LIMIT_ATTACHED, 10 by default), so
+ensure_shard refuses to register a shard past that limit, and a catalog that holds
+more (registered under a build with a higher cap) attaches the first ones that fit
+instead of failing every checkout. merge_shards (`statline db merge-shards`) folds
+old seasons back into the catalog to stay under it. Commits spanning several files in WAL mode are
+atomic per file, not across files.
+"""
+from __future__ import annotations
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, Iterator
+from sqlalchemy import Connection, Engine, MetaData, create_engine, delete, event, func, select, text, update
+from sqlalchemy.orm import Session
+from .config import settings
+from .models import Base, League, Shard
+
+SHARDED_TABLES = ("games", "player_game_stats", "player_rolling_features")
+SHARD_ID_SPAN = 10**10
+# per-database pragmas applied to each attached shard; the rest are per connection
+_SCHEMA_PRAGMAS = ("synchronous", "cache_size", "mmap_size")
+_NAME = re.compile(r"^[a-z0-9_]+$")
+_warned: set[str] = set()  # unattachable shards already reported by this process
+
+
+def schema_name(name: str) -> str:
+    return f"shard_{name}"
+
+
+def route(schema: str | None) -> dict[str, Any]:
+    """Execution options sending a single-table statement to one physical copy of the table."""
+    return {"schema_translate_map": {None: schema}} if schema else {}
+
+
+def install(eng: Engine, pragmas: Callable[[], dict[str, Any]] | None = None) -> None:
+    """Attach registered shards (and rebuild the TEMP views) whenever `eng` hands out a connection."""
+
+    @event.listens_for(eng, "checkout")
+    def _attach(dbapi_conn, _record, _proxy):
+        attach_all(dbapi_conn, pragmas() if pragmas else {})
+
+
+def attach_all(dbapi_conn: sqlite3.Connection, pragmas: dict[str, Any] | None = None) -> list[str]:
+    """ATTACH shards registered since this connection last looked; returns the new schema names."""
+    cur = dbapi_conn.cursor()
+    try:
+        try:
+            registered = cur.execute("SELECT name, path FROM main.shards ORDER BY id").fetchall()
+        except sqlite3.OperationalError:  # catalog not initialized yet
+            return []
+        attached = {row[1] for row in cur.execute("PRAGMA database_list")}
+        new = [(schema_name(n), p) for n, p in registered if schema_name(n) not in attached]
+        if not new or dbapi_conn.in_transaction:  # ATTACH is refused inside a transaction
+            return []
+        room = attach_limit(dbapi_conn) - len(attached - {"main", "temp"})
+        for schema, path in new:
+            if room <= 0:
+                if schema not in _warned:
+                    _warned.add(schema)
+                    print(f"⚠️ Skipping shard {schema}: SQLite attaches at most {attach_limit(dbapi_conn)} "
+                          f"databases, so reads leave out its rows; run `statline db merge-shards`")
+                continue
+            if not os.path.exists(path):
+                print(f"⚠️ Skipping shard {schema}: {path} is missing")
+                continue
+            cur.execute(f'ATTACH DATABASE ? AS "{schema}"', (path,))
+            attached.add(schema)
+            room -= 1
+            for name in _SCHEMA_PRAGMAS:
+                if name in (pragmas or {}):
+                    cur.execute(f'PRAGMA "{schema}".{name}={pragmas[name]}')
+        _create_views(cur, [schema_name(n) for n, _ in registered if schema_name(n) in attached])
+        return [schema for schema, _ in new if schema in attached]
+    finally:
+        cur.close()
+
+
+def attach_limit(dbapi_conn: sqlite3.Connection) -> int:
+    """Most databases this connection can ATTACH besides main and temp."""
+    return dbapi_conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+
+
+def _create_views(cur: sqlite3.Cursor, schemas: list[str]) -> None:
+    for table in SHARDED_TABLES:
+        cols = ", ".join(f'"{c.name}"' for c in Base.metadata.tables[table].columns)
+        parts = [f'SELECT {cols} FROM main."{table}"'] + [f'SELECT {cols} FROM "{sc}"."{table}"' for sc in schemas]
+        cur.execute(f'DROP VIEW IF EXISTS temp."{table}"')
+        cur.execute(f'CREATE TEMP VIEW "{table}" AS ' + " UNION ALL ".join(parts))
+
+
+@contextmanager
+def views_dropped(conn: Connection) -> Iterator[None]:
+    """Lift the TEMP views for the duration (VACUUM refuses to run while they shadow main's tables)."""
+    attached = [row[1] for row in conn.exec_driver_sql("PRAGMA database_list") if row[1].startswith("shard_")]
+    cur = conn.connection.dbapi_connection.cursor()
+    try:
+        for table in SHARDED_TABLES:
+            cur.execute(f'DROP VIEW IF EXISTS temp."{table}"')
+        yield
+    finally:
+        if attached:
+            _create_views(cur, attached)
+        cur.close()
+
+
+class ShardMap:
+    """
+    Where each season of one league physically lives: its shard, or "main" for
+    seasons stored before sharding was enabled. Disabled (every schema None) when
+    SQLITE_SHARD_DIR is unset and the league has no shards.
+    """
+
+    def __init__(self, s: Session, league_id: int):
+        self.s = s
+        self.league_id = league_id
+        self.shards: dict[int, str] = {
+            season: schema_name(name)
+            for season, name in s.execute(select(Shard.season, Shard.name).where(Shard.league_id == league_id))
+        }
+        self.enabled = bool(self.shards) or bool(settings.sqlite_shard_dir)
+        self.main_seasons: set[int] = set()
+        if self.enabled:
+            q = text("SELECT DISTINCT season FROM main.games WHERE league_id = :lid")
+            self.main_seasons = set(s.scalars(q, {"lid": league_id}))
+
+    def schema(self, season: int, create: bool = True) -> str | None:
+        """
+        Schema holding `season`, creating its shard when `create`. Creating commits the
+        session first (ATTACH cannot run inside a transaction).
+        """
+        if not self.enabled:
+            return None
+        if season in self.main_seasons:
+            return "main"
+        if season not in self.shards and create:
+            self.s.commit()
+            self.shards[season] = ensure_shard(self.s, self.league_id, season)
+        return self.shards.get(season)
+
+    def schemas(self) -> list[str]:
+        """Every physical location of the league's sharded rows (empty when disabled)."""
+        if not self.enabled:
+            return []
+        return (["main"] if self.main_seasons else []) + sorted(self.shards.values())
+
+
+def ensure_shard(s: Session, league_id: int, season: int, directory: str | None = None) -> str:
+    """
+    Register and create the shard file for a league/season if needed and return its
+    schema name; the session's next connection has it attached. Commits.
+    """
+    row = s.scalars(select(Shard).where(Shard.league_id == league_id, Shard.season == season)).one_or_none()
+    if row is None:
+        code = s.scalar(select(League.code).where(League.id == league_id))
+        name = f"{code.lower()}_{season}"
+        if not _NAME.match(name):
+            raise ValueError(f"Cannot derive a shard name from league {code!r} season {season!r}")
+        registered = s.scalar(select(func.count()).select_from(Shard))
+        limit = attach_limit(s.connection().connection.dbapi_connection)
+        if registered >= limit:
+            raise RuntimeError(
+                f"Cannot add shard {name}: {registered} shards are registered and SQLite attaches "
+                f"at most {limit} databases per connection; fold old seasons back into the catalog "
+                f"with `statline db merge-shards`"
+            )
+        directory = directory or settings.sqlite_shard_dir or _existing_dir(s)
+        if not directory:
+            raise RuntimeError("Set SQLITE_SHARD_DIR to create SQLite shards")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.sqlite3")
+        shard_id = (s.scalar(select(Shard.id).order_by(Shard.id.desc()).limit(1)) or 0) + 1
+        create_shard_file(path, shard_id * SHARD_ID_SPAN)
+        row = Shard(id=shard_id, league_id=league_id, season=season, name=name, path=path)
+        s.add(row)
+    s.commit()
+    return schema_name(row.name)
+
+
+def create_shard_file(path: str, first_id: int) -> None:
+    """Sharded tables with AUTOINCREMENT ids starting after `first_id`, in WAL mode."""
+    eng = create_engine(f"sqlite:///{path}")
+    try:
+        with eng.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        md = _shard_metadata()
+        with eng.begin() as conn:
+            md.create_all(conn, tables=[md.tables[t] for t in SHARDED_TABLES])
+            for table in SHARDED_TABLES:
+                conn.exec_driver_sql(
+                    "INSERT INTO sqlite_sequence (name, seq) SELECT ?, ? "
+                    "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)",
+                    (table, first_id, table),
+                )
+    finally:
+        eng.dispose()
+
+
+def mark_modified(s: Session, schemas: Iterable[str]) -> None:
+    names = [sc.removeprefix("shard_") for sc in schemas if sc.startswith("shard_")]
+    if names:
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        s.execute(update(Shard).where(Shard.name.in_(names)).values(modified_at=now))
+
+
+def stale_shards(conn: Connection) -> list[str]:
+    """Attached shards written since their last optimize."""
+    attached = {row[1] for row in conn.exec_driver_sql("PRAGMA database_list")} - {"main", "temp"}
+    if not attached:
+        return []
+    q = select(Shard.name).where(
+        Shard.modified_at.is_not(None),
+        (Shard.optimized_at.is_(None)) | (Shard.optimized_at < Shard.modified_at),
+    )
+    return [schema_name(n) for n in conn.scalars(q) if schema_name(n) in attached]
+
+
+def mark_optimized(conn: Connection, schemas: Iterable[str]) -> None:
+    names = [sc.removeprefix("shard_") for sc in schemas]
+    if names:
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        conn.execute(update(Shard).where(Shard.name.in_(names)).values(optimized_at=now))
+
+
+def split_database(s: Session, directory: str | None = None) -> dict[str, int]:
+    """
+    Move every league/season's rows out of the catalog's own sharded tables into
+    shard files, keeping their ids. Returns games moved per shard. Commits per shard.
+    """
+    moved: dict[str, int] = {}
+    pairs = s.execute(text("SELECT DISTINCT league_id, season FROM main.games ORDER BY league_id, season")).all()
+    for league_id, season in pairs:
+        schema = ensure_shard(s, league_id, season, directory)
+        conn = s.connection()  # checked out after ensure_shard's commit, so the shard is attached
+        cols = {t: ", ".join(f'"{c.name}"' for c in Base.metadata.tables[t].columns) for t in SHARDED_TABLES}
+        in_season = "SELECT id FROM main.games WHERE league_id = ? AND season = ?"
+        args = (league_id, season)
+        for table, where in (
+            ("games", f"id IN ({in_season})"),
+            ("player_game_stats", f"game_id IN ({in_season})"),
+            ("player_rolling_features", f"game_id IN ({in_season})"),
+        ):
+            conn.exec_driver_sql(
+                f'INSERT INTO "{schema}"."{table}" ({cols[table]}) SELECT {cols[table]} FROM main."{table}" WHERE {where}',
+                args,
+            )
+        for table in ("player_rolling_features", "player_game_stats"):
+            conn.exec_driver_sql(f'DELETE FROM main."{table}" WHERE game_id IN ({in_season})', args)
+        moved[schema] = conn.exec_driver_sql('DELETE FROM main."games" WHERE league_id = ? AND season = ?', args).rowcount
+        mark_modified(s, [schema])
+        s.commit()
+    return moved
+
+
+def merge_shards(s: Session, keep: int) -> dict[str, int]:
+    """
+    Fold every shard but each league's `keep` newest seasons back into the catalog's own
+    tables, keeping their ids (the inverse of split_database), then unregister and delete
+    the files. Returns games moved per shard. Commits per shard. Other pooled connections
+    still have the merged shards attached (and read their rows twice through the TEMP
+    views), so dispose the engine afterwards.
+    """
+    moved: dict[str, int] = {}
+    rows = s.execute(select(Shard.league_id, Shard.season, Shard.name, Shard.path)
+                     .order_by(Shard.league_id, Shard.season.desc())).all()
+    seen: dict[int, int] = {}
+    retire = []
+    for league_id, season, name, path in rows:
+        seen[league_id] = seen.get(league_id, 0) + 1
+        if seen[league_id] > keep:
+            retire.append((name, path))
+    cols = {t: ", ".join(f'"{c.name}"' for c in Base.metadata.tables[t].columns) for t in SHARDED_TABLES}
+    merged: set[str] = set()
+    for name, path in retire:
+        schema = schema_name(name)
+        s.commit()  # ATTACH/DETACH cannot run inside a transaction
+        conn = s.connection()
+        cur = conn.connection.dbapi_connection.cursor()
+        try:
+            attached = {row[1] for row in cur.execute("PRAGMA database_list")}
+            if attached & merged:  # free their slots for shards that were past the attach limit
+                for gone in attached & merged:
+                    cur.execute(f'DETACH DATABASE "{gone}"')
+                attached -= merged
+                _create_views(cur, sorted(sc for sc in attached if sc.startswith("shard_")))
+            if schema not in attached:
+                cur.execute(f'ATTACH DATABASE ? AS "{schema}"', (path,))
+        finally:
+            cur.close()
+        for table in SHARDED_TABLES:
+            conn.exec_driver_sql(f'INSERT INTO main."{table}" ({cols[table]}) SELECT {cols[table]} FROM "{schema}"."{table}"')
+        moved[schema] = conn.exec_driver_sql(f'SELECT COUNT(*) FROM "{schema}"."games"').scalar()
+        s.execute(delete(Shard).where(Shard.name == name))
+        s.commit()
+        merged.add(schema)
+        os.remove(path)
+    return moved
+
+
+def _existing_dir(s: Session) -> str | None:
+    path = s.scalar(select(Shard.path).limit(1))
+    return os.path.dirname(path) if path else None
+
+
+_shard_md: MetaData | None = None
+
+
+def _shard_metadata() -> MetaData:
+    global _shard_md
+    if _shard_md is None:
+        md = MetaData()
+        for t in Base.metadata.sorted_tables:
+            copy = t.to_metadata(md)
+            if t.name in SHARDED_TABLES:
+                copy.dialect_options["sqlite"]["autoincrement"] = True
+        _shard_md = md
+    return _shard_md
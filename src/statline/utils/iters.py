@@ -0,0 +1,7 @@
+from __future__ import annotations
+from typing import Iterable
+
+def chunks(items: list, size: int) -> Iterable[list]:
+    """Consecutive slices of `items` of at most `size`, e.g. to keep IN (...) lists bounded."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
@@ -0,0 +1,138 @@
+import asyncio
+import dataclasses
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+httpx = pytest.importorskip("httpx")
+from statline.providers import http, mlb_statsapi as mlb, nba_balldontlie as nba
+from statline.providers.aio import AsyncClient
+from statline.etl.ingest_async import fetch_ordered_async, write_ordered
+
+def test_async_client_retries_and_limits_per_host(monkeypatch):
+    monkeypatch.setattr(http, "RETRY_BACKOFF", 0)
+    state = {"calls": 0, "cur": 0, "peak": 0}
+
+    async def handler(request):
+        state["calls"] += 1
+        if request.url.path.endswith("/schedule") and state["calls"] == 1:
+            return httpx.Response(503)
+        state["cur"] += 1; state["peak"] = max(state["peak"], state["cur"])
+        await asyncio.sleep(0.01)
+        state["cur"] -= 1
+        if request.url.path.endswith("/schedule"):
+            return httpx.Response(200, json={"dates": [{"games": [{"gamePk": 1}, {"gamePk": 2}]}]})
+        return httpx.Response(200, json={"pk": int(request.url.path.split("/")[-2])})
+
+    async def run():
+        async with AsyncClient(per_host=2, transport=httpx.MockTransport(handler)) as client:
+            ids = [pk async for pk in mlb.aiter_season_game_ids(client, 2025)]
+            boxes = await asyncio.gather(*(mlb.aget_boxscore(client, pk) for pk in range(10)))
+            return ids, boxes, client.retries
+
+    ids, boxes, retries = asyncio.run(run())
+    assert ids == [1, 2] and retries == 1
+    assert [b["pk"] for b in boxes] == list(range(10))
+    assert state["peak"] <= 2
+
+def test_async_nba_requests_carry_the_api_key(monkeypatch, tmp_path):
+    monkeypatch.setattr(nba, "settings", dataclasses.replace(nba.settings, balldontlie_api_key="k"))
+    seen = []
+
+    async def handler(request):
+        seen.append((request.url.path, request.headers.get("Authorization")))
+        return httpx.Response(200, json={"data": [{"id": 1}], "meta": {"next_cursor": None}})
+
+    async def run():
+        async with AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            games = [g async for g in nba.aiter_season_games(client, 2024)]
+            return games, await nba.aget_game_stats(client, 1)
+
+    assert asyncio.run(run()) == ([{"id": 1}], [{"id": 1}])
+    http.enable_cache(tmp_path)  # the cached path sends it too
+    try:
+        asyncio.run(run())
+    finally:
+        http.disable_cache()
+    assert [auth for _, auth in seen] == ["k"] * 4
+
+def test_fetch_ordered_async_keeps_input_order():
+    async def fetch(i):
+        await asyncio.sleep(0.01 * (5 - i % 5))
+        if i == 2: raise ValueError(i)
+        return i * 2
+
+    async def run():
+        return [(i, r, e is not None) async for i, r, e in fetch_ordered_async(fetch, range(6), in_flight=3)]
+
+    assert asyncio.run(run()) == [(0, 0, False), (1, 2, False), (2, None, True), (3, 6, False), (4, 8, False), (5, 10, False)]
+
+class _Writer:
+    def __init__(self, log):
+        self.log = log
+        log.append(("open", threading.current_thread().name))
+
+    def __exit__(self, *exc):
+        self.log.append(("commit", threading.current_thread().name))
+
+def test_write_ordered_keeps_db_work_off_the_event_loop():
+    log, ticks = [], []
+
+    def write(writer, row):
+        time.sleep(0.02)  # a flush: blocks the writer thread, not the loop
+        log.append((row, threading.current_thread().name))
+
+    async def rows(n, fail=False):
+        for i in range(n):
+            await asyncio.sleep(0)
+            yield i
+        if fail:
+            raise RuntimeError("fetch failed")
+
+    async def ticker():
+        while True:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.005)
+
+    async def run():
+        tick = asyncio.ensure_future(ticker())
+        with ThreadPoolExecutor(1, thread_name_prefix="db") as db:
+            await write_ordered(db, lambda: _Writer(log), rows(5), write, queue_size=2)
+            with pytest.raises(RuntimeError):
+                await write_ordered(db, lambda: _Writer(log), rows(2, fail=True), write, queue_size=2)
+        tick.cancel()
+
+    asyncio.run(run())
+    assert [e for e, _ in log] == ["open", 0, 1, 2, 3, 4, "commit", "open", 0, 1]  # no commit after the failure
+    assert {t for _, t in log} == {"db_0"}
+    assert len(ticks) > 10  # the loop kept running while rows were written
+
+def test_async_backfill_writes_from_the_writer_thread(tmp_path, monkeypatch):
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import sessionmaker
+    from statline.db import make_engine
+    from statline.etl import ingest_async
+    from statline.models import Game
+    eng = make_engine(f"sqlite:///{tmp_path / 'async.sqlite3'}")
+    monkeypatch.setattr(ingest_async, "get_engine", lambda: eng)
+    monkeypatch.setattr(ingest_async, "SessionLocal", sessionmaker(bind=eng))
+    sched = [{"gamePk": pk, "gameDate": f"2024-06-{pk:02d}T23:05:00Z", "season": "2024",
+              "status": {"abstractGameState": "Final", "detailedState": "Final"},
+              "teams": {"home": {"team": {"id": 1, "name": "H"}}, "away": {"team": {"id": 2, "name": "A"}}}}
+             for pk in range(1, 5)]
+    box = {"teams": {"home": {"players": {"ID9": {"person": {"id": 9, "fullName": "A B"},
+                                                   "stats": {"batting": {"runs": 1}}}}}, "away": {"players": {}}}}
+
+    async def games(client, season):
+        for g in sched:
+            yield g
+
+    async def boxscore(client, pk, final=False):
+        return box
+
+    monkeypatch.setattr(mlb, "aiter_season_games", games)
+    monkeypatch.setattr(mlb, "aget_boxscore", boxscore)
+    ingest_async.backfill_mlb_async([2024], in_flight=2, per_host=2)
+    with eng.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(Game)) == 4
+    eng.dispose()
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from statline.backtest.core import simple_over_under
+from statline.backtest.engine import grade, payout, run_backtest
+from statline.etl.bulk import BulkWriter, ensure_league
+from statline.etl.records import GameRecord, PlayerLine, TeamRecord
+from statline.models import Base, Game, Player, PropLine
+
+T0 = datetime(2025, 1, 1, 19)
+
+def _lines(rows):
+    return pd.DataFrame(rows, columns=["line_id", "player_id", "game_id", "market", "line", "fetched_at", "game_date"])
+
+def test_grade_is_point_in_time():
+    day = lambda i: pd.Timestamp(T0 + timedelta(days=i))
+    feats = pd.DataFrame({"player_id": [1, 1, 1], "game_id": [10, 11, 12], "date": [day(0), day(1), day(2)],
+                          "value": [10.0, 30.0, 25.0], "feature": [10.0, 20.0, 21.7]})
+    lines = _lines([
+        (1, 1, 12, "pts", 15.0, day(2) - timedelta(hours=1), day(2)),   # sees game 11 -> 20.0, over, 25 wins
+        (2, 1, 12, "pts", 15.0, day(1) + timedelta(hours=2), day(2)),   # game 11 still running -> 10.0, under, loses
+        (3, 1, 11, "pts", 30.0, day(0) + timedelta(hours=12), day(1)),  # 10.0 under 30, actual 30 -> push
+        (4, 1, 10, "pts", 5.0, day(0) - timedelta(hours=1), day(0)),    # no history -> no bet
+    ])
+    g = grade(lines, feats)
+    assert list(g["feature"].fillna(-1)) == [20.0, 10.0, 10.0, -1]
+    assert list(g["pick"]) == [1, -1, -1, 0]
+    assert list(g["win"]) == [True, False, False, False] and list(g["push"]) == [False, False, True, False]
+    np.testing.assert_allclose(g["profit"], [payout(-110), -1.0, 0.0, 0.0])
+
+def test_run_backtest_end_to_end():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as s:
+        league = ensure_league(s, "NBA", "NBA")
+        with BulkWriter(s, league.id, update_features=False) as w:
+            for i in range(8):
+                rec = GameRecord(str(i), 2025, T0 + timedelta(days=i), "Final", TeamRecord("h", "H"), TeamRecord("a", "A"))
+                rec.lines.append(PlayerLine("p", "F", "L", team_ext="h", stats={"pts": 20.0 + i, "reb": 5.0}))
+                w.write_game(rec)
+        pid = s.scalar(select(Player.id))
+        for gid, when in s.execute(select(Game.id, Game.date)).all()[2:]:
+            s.add(PropLine(league_id=league.id, player_id=pid, game_id=gid, market="points", line=20.0,
+                           source="test", fetched_at=when - timedelta(hours=2)))
+            s.add(PropLine(league_id=league.id, player_id=pid, game_id=gid, market="rebounds", line=5.5,
+                           source="test", fetched_at=when - timedelta(hours=2)))
+        s.commit()
+        res = run_backtest(league.id, window=3, bind=s.connection())
+    summary = res.summary.set_index("market")
+    assert summary.loc["points", "bets"] == 6 and summary.loc["points", "hit_rate"] == 1.0
+    assert summary.loc["rebounds", "wins"] == 6 and summary.loc["rebounds", "roi"] > 0.9
+    assert set(res.calibration["market"]) == {"points", "rebounds"}
+
+def test_simple_over_under_is_vectorized():
+    df = simple_over_under(pd.DataFrame({"player_id": [1, 2], "game_id": [1, 1], "rolling_pts_avg": [10.0, 5.0]}),
+                           pd.DataFrame({"player_id": [1, 2], "game_id": [1, 1], "line": [8.0, 6.0]}))
+    assert list(df["pick"]) == ["OVER", "UNDER"]
@@ -0,0 +1,37 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+BENCH = Path(__file__).resolve().parents[1] / "benchmarks"
+
+
+def _load(name):
+    sys.path.insert(0, str(BENCH))
+    try:
+        spec = importlib.util.spec_from_file_location(name, BENCH / f"{name}.py")
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[name] = mod  # dataclasses resolve annotations through it
+        spec.loader.exec_module(mod)
+        return mod
+    finally:
+        sys.path.remove(str(BENCH))
+
+
+def test_synth_fills_schema(tmp_path):
+    synth = _load("synth")
+    size = synth.Size("t", 900, 5_000, 6)
+    counts = synth.build_database(str(tmp_path / "s.sqlite3"), size)
+    assert counts["players"] == 900
+    assert counts["player_game_stats"] == size.games * 2 * synth.ACTIVE
+    assert 0 < counts["prop_lines"] <= size.games * 6
+
+
+def test_suite_reports_and_flags_regressions(tmp_path):
+    suite = _load("bench_suite")
+    report = suite.run_suite(["tiny"], ["db_init", "last_n_avg_pts", "simple_over_under"], repeat=1, data_dir=str(tmp_path))
+    assert [r["case"] for r in report["results"]] == ["db_init", "last_n_avg_pts", "simple_over_under"]
+    for r in report["results"]:
+        assert r["size"] == "tiny" and r["rows"] > 0 and r["seconds_min"] > 0 and r["peak_mb"] >= 0
+    slower = {**report, "results": [{**r, "seconds_min": r["seconds_min"] * 3} for r in report["results"]]}
+    assert suite.regressions(report, report, 0.25) == []
+    assert len(suite.regressions(slower, report, 0.25)) == 3
@@ -0,0 +1,32 @@
+from datetime import datetime
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+from statline.models import Base, Team, Player, Game, PlayerGameStat
+from statline.etl.bulk import BulkWriter, ensure_league
+from statline.etl.records import GameRecord, PlayerLine, TeamRecord
+
+def _game(ext, status="Final", pts=1.0, n_players=3):
+    rec = GameRecord(ext, 2025, datetime(2025, 6, 1), status, TeamRecord("h", "Home"), TeamRecord("a", "Away"))
+    for i in range(n_players):
+        rec.lines.append(PlayerLine(f"p{i}", "F", "L", team_ext="h", stats={"pts": pts + i}))
+    return rec
+
+def test_bulk_writer_is_idempotent_and_updates_progressed_games():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as s:
+        league = ensure_league(s, "MLB", "Major League Baseball")
+        with BulkWriter(s, league.id, batch_size=2, commit_every=1) as w:
+            w.write_game(_game("1", status="In Progress", pts=0.0))
+            w.write_game(_game("2"))
+        # a fresh writer preloads ext_id maps and upserts instead of duplicating
+        with BulkWriter(s, league.id) as w:
+            assert set(w.players) == {"p0", "p1", "p2"} and set(w.teams) == {"h", "a"}
+            w.write_game(_game("1", status="Final", pts=5.0))
+
+        count = lambda m: s.scalar(select(func.count()).select_from(m))
+        assert (count(Team), count(Player), count(Game), count(PlayerGameStat)) == (2, 3, 2, 6)
+        assert s.scalar(select(Game.status).where(Game.ext_id == "1")) == "Final"
+        g1 = s.scalar(select(Game.id).where(Game.ext_id == "1"))
+        assert sorted(s.scalars(select(PlayerGameStat.pts).where(PlayerGameStat.game_id == g1))) == [5.0, 6.0, 7.0]
+        assert s.scalar(select(Player.team_id).where(Player.ext_id == "p0")) == s.scalar(select(Team.id).where(Team.ext_id == "h"))
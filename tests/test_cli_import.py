@@ -0,0 +1,29 @@
+import re, subprocess, sys
+
+HEAVY = ("pandas", "numpy", "sqlalchemy", "requests", "urllib3")
+IMPORT_BUDGET_S = 0.4  # cumulative `import statline.cli`; about 0.08s locally, ~1s when everything loaded eagerly
+
+def _run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    r = subprocess.run([sys.executable, *flags, "-c", code], capture_output=True, text=True)
+    assert r.returncode == 0, r.stderr
+    return r
+
+def test_cli_import_skips_heavy_dependencies():
+    r = _run(f"import sys, statline.cli; print([m for m in {HEAVY!r} if m in sys.modules])")
+    assert r.stdout.strip() == "[]"
+
+def test_cli_import_time_budget():
+    r = _run("import statline.cli", "-X", "importtime")
+    # "import time: self [us] | cumulative | imported package"
+    cumulative = [int(m.group(1)) for m in re.finditer(r"\|\s*(\d+) \|\s*statline\.cli$", r.stderr, re.M)]
+    assert cumulative and cumulative[0] / 1e6 < IMPORT_BUDGET_S
+
+def test_engine_and_sessions_are_built_on_first_use():
+    r = _run(
+        "from statline import db\n"
+        "from statline.providers import http, mlb_statsapi, nba_balldontlie, nhl_statsapi\n"
+        "print(db._engine is None, len(http._SESSIONS))\n"
+        "print(nhl_statsapi._SESSION is nhl_statsapi._session(), len(http._SESSIONS))\n"
+        "print(db.engine is db.get_engine(), db.SessionLocal().get_bind() is db.engine)"
+    )
+    assert r.stdout.split() == ["True", "0", "True", "1", "True", "True"]
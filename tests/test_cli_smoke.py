@@ -1,6 +1,36 @@
-import subprocess, sys
+import dataclasses, os, subprocess, sys
+from contextlib import contextmanager
+from typer.testing import CliRunner
+from statline import cli
+from statline.etl import ingest, ingest_mlb, ingest_nhl
 
 def test_cli_help():
     r = subprocess.run([sys.executable, "-m", "statline.cli", "--help"], capture_output=True, text=True)
     assert r.returncode == 0
     assert "StatLine Core CLI" in r.stdout
+
+def test_async_incremental_is_rejected_before_any_work(tmp_path):
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'x.sqlite3'}"}
+    for args in (["ingest", "MLB", "--async", "--incremental"], ["ingest-two-years", "--async", "--incremental"]):
+        r = subprocess.run([sys.executable, "-m", "statline.cli", *args], capture_output=True, text=True, env=env)
+        assert r.returncode == 2 and "drop --async" in r.stdout
+    assert not (tmp_path / "x.sqlite3").exists()
+
+def test_two_year_ingest_skips_nba_without_an_api_key(monkeypatch):
+    calls = []
+    @contextmanager
+    def lock(*codes):
+        calls.append(("lock", codes))
+        yield
+    monkeypatch.setattr(cli, "settings", dataclasses.replace(cli.settings, balldontlie_api_key=""))
+    monkeypatch.setattr(cli, "_league_lock", lock)
+    monkeypatch.setattr(cli, "_optimize_db", lambda: None)
+    for module, fn in ((ingest_mlb, "backfill_mlb"), (ingest_nhl, "backfill_nhl"), (ingest, "backfill_nba")):
+        monkeypatch.setattr(module, fn, lambda seasons, fn=fn, **kw: calls.append((fn, len(seasons))))
+    r = CliRunner().invoke(cli.app, ["ingest-two-years", "--no-http-cache", "--report", ""])
+    assert r.exit_code == 0, r.output
+    assert "Skipping NBA" in r.output and "MLB + NHL backfilled" in r.output
+    assert calls == [("lock", ("MLB", "NHL")), ("backfill_mlb", 2), ("backfill_nhl", 2)]
+
+    r = CliRunner().invoke(cli.app, ["ingest", "NBA", "--seasons", "2024"])
+    assert r.exit_code == 2 and "BALLDONTLIE_API_KEY" in r.output
@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import text
+from statline.db import make_engine, optimize, pragmas_for, use_profile
+
+def _pragma(eng, name):
+    with eng.connect() as c:
+        return c.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+def test_profiles_apply_on_connect_and_switch(tmp_path):
+    eng = make_engine(f"sqlite:///{tmp_path / 'x.sqlite3'}", profile="ingest")
+    assert _pragma(eng, "journal_mode") == "wal"
+    assert _pragma(eng, "synchronous") == 1  # NORMAL
+    assert _pragma(eng, "cache_size") == -262144
+    assert _pragma(eng, "temp_store") == 2  # MEMORY
+    assert _pragma(eng, "busy_timeout") == 30000
+    use_profile("read", eng)
+    assert _pragma(eng, "cache_size") == -131072
+
+def test_pragma_overrides_are_validated():
+    assert pragmas_for("ingest", "synchronous=OFF; cache_size=-1000")["synchronous"] == "OFF"
+    with pytest.raises(ValueError):
+        pragmas_for("ingest", "synchronous=OFF; DROP TABLE x")
+    with pytest.raises(ValueError):
+        pragmas_for("bulk")
+
+def test_optimize_vacuums_fragmented_file_and_truncates_wal(tmp_path):
+    path = tmp_path / "x.sqlite3"
+    eng = make_engine(f"sqlite:///{path}")
+    with eng.begin() as c:
+        c.execute(text("CREATE TABLE t (v TEXT)"))
+        c.execute(text("INSERT INTO t VALUES (:v)"), [{"v": "x" * 1000}] * 2000)
+        c.execute(text("DELETE FROM t"))
+    stats = optimize(eng)
+    assert stats["vacuumed"] and stats["pages_after"] < stats["pages_before"]
+    assert (tmp_path / "x.sqlite3-wal").stat().st_size == 0
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from statline.etl.bulk import BulkWriter, ensure_league
+from statline.etl.records import GameRecord, PlayerLine, TeamRecord
+from statline.features.engine import build_features, build_specs, load_stats
+from statline.models import Base
+
+pytest.importorskip("pyarrow")
+from statline.etl.export import export_parquet, read_stats  # noqa: E402
+
+T0 = datetime(2024, 1, 1, 19)
+
+def _write(engine, season, days, player="p"):
+    with Session(engine) as s:
+        league = ensure_league(s, "NBA", "NBA")
+        with BulkWriter(s, league.id, update_features=False) as w:
+            for i in days:
+                rec = GameRecord(f"{season}-{i}", season, T0 + timedelta(days=365 * (season - 2024) + i), "Final",
+                                 TeamRecord("h", "H"), TeamRecord("a", "A"))
+                rec.lines.append(PlayerLine(player, "F", "L", team_ext="h", stats={"pts": 10.0 + i, "reb": None}))
+                w.write_game(rec)
+        return league.id
+
+def test_export_rewrites_only_changed_partitions(tmp_path):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    _write(engine, 2024, range(5))
+    league_id = _write(engine, 2025, range(3))
+
+    first = export_parquet(tmp_path, bind=engine)
+    assert sorted(first.written) == [
+        "games/league=NBA/season=2024", "games/league=NBA/season=2025",
+        "player_game_stats/league=NBA/season=2024", "player_game_stats/league=NBA/season=2025",
+        "players/league=NBA",
+    ]
+    assert export_parquet(tmp_path, bind=engine).written == []
+
+    _write(engine, 2025, [2, 3])  # one updated stat row and one new game
+    again = export_parquet(tmp_path, bind=engine)
+    assert sorted(again.written) == ["games/league=NBA/season=2025", "player_game_stats/league=NBA/season=2025"]
+    assert again.unchanged == 3
+
+    df = read_stats(tmp_path, "NBA", ["pts", "reb"])
+    expected = load_stats(["pts", "reb"], league_id, bind=engine)
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+    assert list(read_stats(tmp_path, "NBA", ["pts"], seasons=[2025])["season"].unique()) == [2025]
+
+    specs = build_specs(["pts"], [3], ["mean"])
+    from_parquet = build_features(specs, league_id, seasons=[2025], df=df)
+    from_sqlite = build_features(specs, league_id, seasons=[2025], bind=engine)
+    assert (from_parquet.values == from_sqlite.values).all()
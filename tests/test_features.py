@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+import pandas as pd
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+from statline.models import Base, PlayerRollingFeature
+from statline.etl.bulk import BulkWriter, ensure_league
+from statline.etl.records import GameRecord, PlayerLine, TeamRecord
+from statline.features.materialized import (
+    compute_rolling_features, load_rolling_features, rebuild_rolling_features,
+)
+
+def _game(i, players):
+    rec = GameRecord(str(i), 2025, datetime(2025, 4, 1) + timedelta(days=i), "Final",
+                     TeamRecord("h", "Home"), TeamRecord("a", "Away"))
+    for p in players:
+        rec.lines.append(PlayerLine(p, "F", "L", team_ext="h", stats={"pts": float((i * 7 + len(p)) % 5)}))
+    return rec
+
+def _features(s, league_id):
+    return load_rolling_features(s, league_id, "pts", 5).sort_values(["player_id", "game_id"]).reset_index(drop=True)
+
+def test_ingest_maintains_rolling_features_incrementally():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as s:
+        league = ensure_league(s, "MLB", "Major League Baseball")
+        with BulkWriter(s, league.id) as w:
+            for i in range(12):
+                w.write_game(_game(i, ["p1", "p22"]))
+        before = s.scalar(select(func.count()).select_from(PlayerRollingFeature))
+        with BulkWriter(s, league.id) as w:
+            w.write_game(_game(12, ["p1", "p333"]))
+        # p1 gains a row per window (p333 is below min_periods); p22's rows are untouched
+        assert s.scalar(select(func.count()).select_from(PlayerRollingFeature)) == before + 3
+
+        incremental = _features(s, league.id)
+        rebuild_rolling_features(s, league.id)
+        pd.testing.assert_frame_equal(incremental, _features(s, league.id))
+        on_the_fly = compute_rolling_features(s, league.id, "pts", 5).dropna().sort_values(["player_id", "game_id"])
+        assert list(on_the_fly["rolling_pts_avg"]) == list(incremental["rolling_pts_avg"])
+
+def test_incremental_seed_skips_games_without_the_stat():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as s:
+        league = ensure_league(s, "MLB", "Major League Baseball")
+        with BulkWriter(s, league.id) as w:
+            for i in range(30):
+                rec = _game(i, ["p1"])
+                if i >= 10:  # DNPs: lines without points fill every game the lookback reaches
+                    rec.lines[0].stats = {}
+                w.write_game(rec)
+        with BulkWriter(s, league.id) as w:
+            w.write_game(_game(30, ["p1"]))
+        incremental = _features(s, league.id)
+        assert incremental["game_id"].iloc[-1] == 31  # seeded by games 6-9, not by the NULL rows
+        rebuild_rolling_features(s, league.id)
+        pd.testing.assert_frame_equal(incremental, _features(s, league.id))
@@ -0,0 +1,24 @@
+import threading, time
+from statline.etl.fetch import fetch_ordered
+
+def test_fetch_ordered_serial_and_concurrent_match():
+    def fetch(i):
+        if i == 3: raise ValueError("boom")
+        time.sleep(0.01 * (i % 3))
+        return i * 10
+    serial = [(i, r, type(e)) for i, r, e in fetch_ordered(fetch, range(8), workers=1)]
+    threaded = [(i, r, type(e)) for i, r, e in fetch_ordered(fetch, range(8), workers=4)]
+    assert serial == threaded
+    assert serial[3] == (3, None, ValueError)
+    assert [r for _, r, _ in serial if r is not None] == [0, 10, 20, 40, 50, 60, 70]
+
+def test_fetch_ordered_bounds_in_flight():
+    lock = threading.Lock(); state = {"cur": 0, "peak": 0}
+    def fetch(i):
+        with lock:
+            state["cur"] += 1; state["peak"] = max(state["peak"], state["cur"])
+        time.sleep(0.005)
+        with lock: state["cur"] -= 1
+        return i
+    assert [i for i, _, _ in fetch_ordered(fetch, range(50), workers=3)] == list(range(50))
+    assert state["peak"] <= 3
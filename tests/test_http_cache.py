@@ -0,0 +1,42 @@
+import pytest
+from statline.providers import http
+
+class Resp:
+    def __init__(self, data, status=200, headers=None):
+        self._data = data; self.status_code = status; self.headers = headers or {}
+    def raise_for_status(self): pass
+    def json(self): return self._data
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses); self.calls = []
+    def get(self, url, params=None, timeout=None, headers=None):
+        self.calls.append(headers or {})
+        return self.responses.pop(0)
+
+@pytest.fixture
+def cache(tmp_path):
+    c = http.enable_cache(tmp_path)
+    yield c
+    http.disable_cache()
+
+def test_final_responses_never_expire(cache):
+    sess = FakeSession(Resp({"box": 1}))
+    assert http.get_json(sess, "https://x/box", {"a": 1}, ttl=0, final=True) == {"box": 1}
+    assert http.get_json(sess, "https://x/box", {"a": 1}, ttl=0, final=True) == {"box": 1}
+    assert len(sess.calls) == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "revalidated": 0, "stores": 1}
+
+def test_stale_entries_revalidate_with_etag(cache):
+    sess = FakeSession(Resp({"v": 1}, headers={"ETag": '"abc"'}), Resp(None, status=304))
+    http.get_json(sess, "https://x/schedule", ttl=0)
+    assert http.get_json(sess, "https://x/schedule", ttl=0) == {"v": 1}
+    assert sess.calls[1] == {"If-None-Match": '"abc"'}
+    assert cache.revalidated == 1
+
+def test_final_predicate_is_evaluated_on_payload(cache):
+    sess = FakeSession(Resp({"state": "Live"}), Resp({"state": "Final"}), Resp({"state": "Final"}))
+    is_final = lambda body: body["state"] == "Final"
+    for _ in range(3):
+        http.get_json(sess, "https://x/feed", ttl=0, final=is_final)
+    assert len(sess.calls) == 2 and cache.hits == 1
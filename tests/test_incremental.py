@@ -0,0 +1,51 @@
+from datetime import date, datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from statline.models import Base, League, Team, Game, IngestState
+from statline.etl.incremental import refresh_window, pending_games, advance_watermark
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    s = Session(engine)
+    s.add(League(id=1, code="MLB", name="MLB")); s.add(Team(id=1, league_id=1, ext_id="1", name="A"))
+    s.commit()
+    return s
+
+def _sched(pk, day, state="Final", detailed="Final"):
+    return {"gamePk": pk, "gameDate": f"2025-06-{day:02d}T23:05:00Z",
+            "status": {"abstractGameState": state, "detailedState": detailed}}
+
+def _game(pk, status):
+    return Game(league_id=1, ext_id=str(pk), season=2025, date=datetime(2025, 6, 1),
+                home_team_id=1, visitor_team_id=1, status=status)
+
+def test_pending_skips_final_and_unstarted_games():
+    s = _session()
+    s.add_all([_game(1, "Final"), _game(2, "In Progress")]); s.commit()
+    scheduled = [_sched(1, 1), _sched(2, 2, "Live", "In Progress"), _sched(3, 3),
+                 _sched(4, 4, "Preview", "Scheduled"), _sched(5, 4, "Final", "Postponed")]
+    assert [g["gamePk"] for g in pending_games(s, 1, scheduled)] == [2, 3]
+
+def test_watermark_stops_at_first_open_game():
+    s = _session()
+    assert refresh_window(s, 1, today=date(2025, 6, 10)) == (date(2023, 6, 11), date(2025, 6, 10))
+    s.add_all([_game(1, "Final"), _game(2, "In Progress")]); s.commit()
+    wm = advance_watermark(s, 1, [_sched(1, 1), _sched(2, 2, "Live", "In Progress")], end=date(2025, 6, 10))
+    assert wm == datetime(2025, 6, 2, 23, 5)
+    assert refresh_window(s, 1, today=date(2025, 6, 10))[0] == date(2025, 5, 31)
+
+    s.query(Game).filter_by(ext_id="2").one().status = "Final"; s.commit()
+    advance_watermark(s, 1, [_sched(1, 1), _sched(2, 2)], end=date(2025, 6, 10))
+    assert s.query(IngestState).one().watermark == datetime(2025, 6, 10)
+
+def test_live_games_only_recent_and_open():
+    from datetime import timedelta, timezone
+    from statline.etl.incremental import live_games
+    s = _session()
+    s.add(_game(1, "Final")); s.commit()
+    now = datetime(2025, 6, 3, 1, 0, tzinfo=timezone.utc)
+    scheduled = [_sched(1, 2, "Live", "In Progress"), _sched(2, 2, "Live", "In Progress"), _sched(3, 2),
+                 _sched(4, 1), _sched(5, 3, "Preview", "Scheduled")]
+    # 1 is already stored Final, 4 started two days ago, 5 has not started
+    assert [g["gamePk"] for g in live_games(s, 1, scheduled, now, timedelta(hours=5))] == [2, 3]
@@ -0,0 +1,26 @@
+from statline.etl import ingest_mlb
+
+SCHEDULED = {
+    "gamePk": 745000, "season": "2024", "gameDate": "2024-04-01T23:05:00Z",
+    "status": {"abstractGameState": "Final", "detailedState": "Final"},
+    "teams": {"home": {"team": {"id": 147, "name": "New York Yankees"}},
+              "away": {"team": {"id": 111, "name": "Boston Red Sox"}}},
+}
+BOX = {"teams": {"home": {"players": {"ID1": {"person": {"id": 1, "fullName": "Aaron Judge"},
+                                              "stats": {"batting": {"runs": 1, "rbi": 2}}}}},
+                 "away": {"players": {}}}}
+
+def test_complete_schedule_entry_skips_feed(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ingest_mlb.mlb, "get_game_feed", lambda pk: calls.append(pk))
+    monkeypatch.setattr(ingest_mlb.mlb, "get_boxscore", lambda pk, final=False: BOX)
+    feed, box = ingest_mlb._fetch_game(SCHEDULED)
+    assert calls == [] and feed is None
+
+    rec = ingest_mlb.parse_game(SCHEDULED, feed, box)
+    assert (rec.season, rec.status, rec.home.name, rec.away.ext_id) == (2024, "Final", "New York Yankees", "111")
+    assert rec.lines[0].stats == {"pts": 3.0}
+
+def test_incomplete_schedule_entry_falls_back_to_feed():
+    assert ingest_mlb.needs_feed({"gamePk": 1, "gameDate": "2024-04-01T23:05:00Z"})
+    assert not ingest_mlb.needs_feed(SCHEDULED)
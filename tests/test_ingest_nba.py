@@ -0,0 +1,65 @@
+from datetime import date
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+from statline.db import make_engine
+from statline.etl import ingest
+from statline.models import Game, IngestRun, Player, PlayerGameStat
+
+TEAMS = {1: {"id": 1, "full_name": "Boston Celtics", "abbreviation": "BOS"},
+         2: {"id": 2, "full_name": "New York Knicks", "abbreviation": "NYK"}}
+
+def _game(gid, day, status="Final", period=4):
+    return {"id": gid, "date": f"2024-10-{day:02d}", "datetime": f"2024-10-{day:02d}T23:30:00.000Z", "season": 2024,
+            "status": status, "period": period, "home_team": TEAMS[1], "visitor_team": TEAMS[2]}
+
+def _stat(gid, pid, pts):
+    return {"game": {"id": gid}, "team": TEAMS[1], "pts": pts, "reb": 5, "min": "30",
+            "player": {"id": pid, "first_name": "P", "last_name": str(pid), "position": "G"}}
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    eng = make_engine(f"sqlite:///{tmp_path / 'nba.sqlite3'}")
+    monkeypatch.setattr(ingest, "get_engine", lambda: eng)
+    monkeypatch.setattr(ingest, "SessionLocal", sessionmaker(bind=eng))
+    monkeypatch.setattr(ingest.nba, "iter_players", lambda: pytest.fail("players are not paged"))
+    monkeypatch.setattr(ingest.nba, "get_game_stats", lambda *a, **k: pytest.fail("no per-game stats requests"))
+    yield eng
+    eng.dispose()
+
+def test_backfill_writes_season_stats_in_bulk(db, monkeypatch):
+    games = [_game(11, 22), _game(12, 23), _game(13, 24), _game(14, 30, status="2024-10-30T23:30:00Z", period=0)]
+    stats = [_stat(11, 100, 20), _stat(11, 101, 8), _stat(12, 100, 31), _stat(99, 102, 4)]
+    calls = []
+    monkeypatch.setattr(ingest.nba, "iter_season_games", lambda season: iter(games))
+    monkeypatch.setattr(ingest.nba, "iter_season_stats",
+                        lambda season, final=False: calls.append((season, final)) or iter(stats))
+    ingest.backfill_nba([2024])
+    assert calls == [(2024, False)]  # one game still to play: the season is not final
+    with db.connect() as conn:
+        assert sorted(conn.scalars(select(Game.ext_id))) == ["11", "12"]  # 13 has no stats yet, 14 not started
+        assert conn.scalar(select(func.count()).select_from(Player)) == 2
+        assert conn.scalar(select(func.sum(PlayerGameStat.pts))) == 59
+        run = conn.execute(select(IngestRun)).one()
+    assert (run.status, run.games_ok, run.games_failed) == ("incomplete", 2, 1)
+
+    # the resumed run only needs game 13
+    stats.append(_stat(13, 103, 12))
+    ingest.backfill_nba(None, resume=True)
+    with db.connect() as conn:
+        assert sorted(conn.scalars(select(Game.ext_id))) == ["11", "12", "13"]
+        assert conn.scalar(select(IngestRun.status)) == "complete"
+
+def test_refresh_fetches_stats_for_pending_dates_only(db, monkeypatch):
+    games = [_game(21, 1), _game(22, 2, status="3rd Qtr", period=3), _game(23, 3, status="2024-10-03T23:30:00Z", period=0)]
+    ranges = []
+    monkeypatch.setattr(ingest.nba, "iter_games", lambda start, end: iter(games))
+    monkeypatch.setattr(ingest.nba, "iter_stats",
+                        lambda start, end: ranges.append((start, end)) or iter([_stat(21, 1, 10), _stat(22, 2, 7)]))
+    ingest.refresh_nba(today=date(2024, 10, 3))
+    assert ranges == [(date(2024, 10, 1), date(2024, 10, 2))]
+    games[1] = _game(22, 2)
+    ingest.refresh_nba(today=date(2024, 10, 3))
+    assert ranges[-1] == (date(2024, 10, 2), date(2024, 10, 2))  # game 21 was already Final
+    with db.connect() as conn:
+        assert dict(conn.execute(select(Game.ext_id, Game.status)).all()) == {"21": "Final", "22": "Final"}
@@ -0,0 +1,72 @@
+import dataclasses
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+from statline.db import make_engine
+from statline.etl import bulk, ingest_mlb
+from statline.models import Game, IngestCheckpoint, IngestRun
+
+BOX = {"teams": {"home": {"players": {"ID9": {"person": {"id": 9, "fullName": "A B"},
+                                               "stats": {"batting": {"runs": 1, "rbi": 0}}}}},
+                 "away": {"players": {}}}}
+
+def _sched(pk):
+    return {"gamePk": pk, "gameDate": f"2024-06-{pk:02d}T23:05:00Z", "season": "2024",
+            "status": {"abstractGameState": "Final", "detailedState": "Final"},
+            "teams": {"home": {"team": {"id": 1, "name": "H"}}, "away": {"team": {"id": 2, "name": "A"}}}}
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    eng = make_engine(f"sqlite:///{tmp_path / 'ledger.sqlite3'}")
+    monkeypatch.setattr(ingest_mlb, "get_engine", lambda: eng)
+    monkeypatch.setattr(ingest_mlb, "SessionLocal", sessionmaker(bind=eng))
+    # commit after every game, so an interrupted run keeps what it wrote
+    monkeypatch.setattr(bulk, "settings", dataclasses.replace(bulk.settings, ingest_commit_every=1))
+    monkeypatch.setattr(ingest_mlb.mlb, "iter_season_games", lambda season: iter([_sched(pk) for pk in range(1, 7)]))
+    yield eng
+    eng.dispose()
+
+def test_resume_skips_written_games_and_retries_failed_ones(db, monkeypatch):
+    calls, broken = [], {3, 5}
+
+    def boxscore(pk, final=False):
+        calls.append(pk)
+        if pk == 5 and 5 in broken:
+            raise SystemExit("runner killed")  # not a per-game error: stops the run
+        if pk in broken:
+            raise RuntimeError("timeout")
+        return BOX
+
+    monkeypatch.setattr(ingest_mlb.mlb, "get_boxscore", boxscore)
+    with pytest.raises(SystemExit):
+        ingest_mlb.backfill_mlb([2024])
+    with db.connect() as conn:
+        run = conn.execute(select(IngestRun)).one()
+        outcomes = dict(conn.execute(select(IngestCheckpoint.ext_id, IngestCheckpoint.outcome)).all())
+    assert run.status == "failed" and "runner killed" in run.error
+    assert outcomes == {"1": "ok", "2": "ok", "3": "failed", "4": "ok"}
+
+    calls.clear(); broken.discard(5)
+    ingest_mlb.backfill_mlb(None, resume=True)
+    assert calls == [3, 5, 6]
+    with db.connect() as conn:
+        run = conn.execute(select(IngestRun)).one()
+        error = conn.scalar(select(IngestCheckpoint.error).where(IngestCheckpoint.ext_id == "3"))
+    assert (run.status, run.games_ok, run.games_failed, run.resumes) == ("incomplete", 5, 1, 1)
+    assert "timeout" in error
+
+    calls.clear(); broken.clear()
+    ingest_mlb.backfill_mlb([2024], resume=True)
+    assert calls == [3]
+    with db.connect() as conn:
+        run = conn.execute(select(IngestRun)).one()
+        hashes = conn.scalars(select(IngestCheckpoint.payload_hash)).all()
+        assert conn.scalar(select(IngestCheckpoint.attempts).where(IngestCheckpoint.ext_id == "3")) == 3
+        assert len(conn.execute(select(Game.id)).all()) == 6
+    assert run.status == "complete" and run.games_ok == 6
+    assert len(set(hashes)) == 1 and len(hashes[0]) == 64  # same payload for every game
+
+def test_resume_without_unfinished_run(db):
+    from statline.etl.ledger import NothingToResume
+    with pytest.raises(NothingToResume):
+        ingest_mlb.backfill_mlb(None, resume=True)
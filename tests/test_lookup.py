@@ -0,0 +1,91 @@
+import json
+import urllib.request
+from datetime import datetime
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from statline.db import make_engine, read_only_engine
+from statline.etl.bulk import BulkWriter, ensure_league
+from statline.etl.records import GameRecord, PlayerLine, TeamRecord
+from statline.features.lookup import FeatureLookup, LRUCache
+from statline.metrics import METRICS
+from statline.models import Base, Game, Player
+from statline.serve import LookupServer
+
+SPECS = [("pts", 5)]  # one of the default FEATURE_STATS x FEATURE_WINDOWS, so ingest materializes it
+
+def _game(day, pts):
+    rec = GameRecord(f"g{day}", 2025, datetime(2025, 1, day, 19), "Final", TeamRecord("h", "Home"), TeamRecord("a", "Away"))
+    rec.lines = [PlayerLine("p1", "A", "One", stats={"pts": pts}), PlayerLine("p2", "B", "Two", stats={"pts": pts * 2})]
+    return rec
+
+@pytest.fixture
+def db(tmp_path):
+    url = f"sqlite:///{tmp_path / 'serve.sqlite3'}"
+    eng = make_engine(url)
+    Base.metadata.create_all(eng)
+    with Session(eng) as s:
+        league_id = ensure_league(s, "NBA", "NBA").id
+    yield eng, url, league_id
+    eng.dispose()
+
+def _write(eng, league_id, *games):
+    with Session(eng) as s, BulkWriter(s, league_id) as w:
+        for g in games:
+            w.write_game(g)
+
+def _ids(eng):
+    with Session(eng) as s:
+        return dict(s.execute(select(Player.ext_id, Player.id)).all()), dict(s.execute(select(Game.ext_id, Game.id)).all())
+
+def test_latest_and_as_of_game_lookups_are_cached_and_invalidated_by_ingest(db):
+    eng, url, league_id = db
+    _write(eng, league_id, _game(1, 10.0), _game(2, 20.0), _game(3, 30.0))
+    players, games = _ids(eng)
+    lookup = FeatureLookup(read_only_engine(url), cache_size=10, check_every=0, specs=SPECS)
+
+    latest = lookup.get("nba", players["p1"])
+    assert latest.values == {"pts_5": 20.0} and latest.as_of_game_id == games["g3"]
+    before_g3 = lookup.get("NBA", players["p1"], games["g3"])  # games before g3 only
+    assert before_g3.values == {"pts_5": 15.0} and before_g3.as_of == datetime(2025, 1, 2, 19)
+    assert lookup.get("NBA", players["p2"], games["g1"]).values == {}
+    batch = lookup.get_many("NBA", [(players["p1"], None), (players["p2"], None), (players["p2"], games["g3"])])
+    assert [f.values["pts_5"] for f in batch] == [20.0, 40.0, 30.0]
+    assert lookup.cache.stats()["hits"] == 1
+
+    _write(eng, league_id, _game(4, 40.0))
+    assert lookup.get("NBA", players["p1"]).values == {"pts_5": 25.0}  # version moved: cache dropped
+    assert lookup.cache.stats()["invalidations"] == 5
+    with pytest.raises(ValueError):
+        lookup.get("NHL", players["p1"])
+    with read_only_engine(url).connect() as conn, pytest.raises(Exception, match="readonly"):
+        conn.execute(text("DELETE FROM games"))
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1); cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and len(cache) == 2
+    assert cache.stats()["evictions"] == 1
+
+def test_server_answers_single_and_batch_lookups(db):
+    eng, url, league_id = db
+    _write(eng, league_id, _game(1, 10.0), _game(2, 20.0), _game(3, 30.0))
+    players, games = _ids(eng)
+    lookup = FeatureLookup(read_only_engine(url), specs=SPECS)
+    METRICS.reset()
+    with LookupServer(lookup, port=0) as server:
+        with urllib.request.urlopen(f"{server.url}/features?league=NBA&player_id={players['p1']},{players['p2']}") as r:
+            body = json.load(r)
+        assert [x["features"]["pts_5"] for x in body["results"]] == [20.0, 40.0]
+        req = urllib.request.Request(f"{server.url}/features", method="POST", data=json.dumps(
+            {"league": "NBA", "lookups": [{"player_id": players["p1"], "game_id": games["g3"]}]}).encode())
+        with urllib.request.urlopen(req) as r:
+            assert json.load(r)["results"][0]["features"] == {"pts_5": 15.0}
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(f"{server.url}/features?league=NBA")
+        assert e.value.code == 400
+        with urllib.request.urlopen(f"{server.url}/stats") as r:
+            stats = json.load(r)
+        assert stats["cache"]["misses"] == 3 and stats["latency_seconds"]["miss"]["count"] == 2
@@ -0,0 +1,100 @@
+import json
+import threading
+import pytest
+from statline import metrics
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from statline.etl.bulk import BulkWriter, ensure_league
+from statline.etl.pipeline import run_pipeline
+from statline.etl.records import GameRecord, PlayerLine, TeamRecord
+from statline.metrics import METRICS, Metrics, endpoint, instrument_run
+from statline.models import Base
+from statline.providers import http, mlb_statsapi as mlb
+from statline.providers.transport import FixtureArchive, Replay, StandInServer
+
+
+def _value(name, **labels):
+    rows = METRICS.snapshot().get(name, [])
+    return next((r.get("value", r.get("count")) for r in rows if r["labels"] == {k: str(v) for k, v in labels.items()}), 0)
+
+
+def test_prometheus_histograms_are_cumulative():
+    m = Metrics()
+    for v in (0.0002, 0.003, 0.003, 7.0):
+        m.observe("statline_db_seconds", v, op="flush")
+    m.inc("statline_db_rows_total", 5, table="games", outcome="inserted")
+    text = m.to_prometheus()
+    assert "# TYPE statline_db_seconds histogram" in text
+    assert 'statline_db_seconds_bucket{op="flush",le="0.0005"} 1' in text
+    assert 'statline_db_seconds_bucket{op="flush",le="0.005"} 3' in text
+    assert 'statline_db_seconds_bucket{op="flush",le="+Inf"} 4' in text
+    assert 'statline_db_rows_total{outcome="inserted",table="games"} 5' in text
+
+
+def test_endpoint_collapses_ids():
+    assert endpoint("https://statsapi.mlb.com/api/v1/game/745000/boxscore?x=1") == ("statsapi.mlb.com", "/api/v1/game/{id}/boxscore")
+
+
+def test_bulk_writer_counts_row_outcomes():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    def game(status):
+        rec = GameRecord("1", 2025, datetime(2025, 6, 1), status, TeamRecord("h", "H"), TeamRecord("a", "A"))
+        rec.lines = [PlayerLine(p, "F", "L", team_ext="h", stats={"pts": 1.0}) for p in ("p0", "p1", "p1")]
+        return rec
+
+    with instrument_run("test"):
+        with Session(engine) as s:
+            league = ensure_league(s, "MLB", "MLB")
+            with BulkWriter(s, league.id, update_features=False) as w:
+                w.write_game(game("In Progress"))
+                w.write_game(game("Final"))
+                w.write_game(game("Final"))
+        rows = lambda table, outcome: _value("statline_db_rows_total", outcome=outcome, table=table)
+        assert (rows("games", "inserted"), rows("games", "updated"), rows("games", "skipped")) == (1, 1, 1)
+        assert (rows("player_game_stats", "inserted"), rows("player_game_stats", "updated")) == (2, 4)
+        assert rows("player_game_stats", "skipped") == 3
+        assert rows("players", "inserted") == 2 and rows("teams", "inserted") == 2
+        assert _value("statline_db_seconds", op="commit") >= 1
+
+
+def _fetch_on_worker():
+    return mlb.get_boxscore(1)
+
+
+def test_run_report_covers_http_and_profile(tmp_path):
+    archive = FixtureArchive(tmp_path / "fixtures")
+    archive.save_json("https://statsapi.mlb.com/api/v1/game/1/boxscore", {"pk": 1})
+    report, prom = tmp_path / "run.json", tmp_path / "run.prom"
+    try:
+        with StandInServer(archive) as server:
+            http.set_transport(Replay(server.url))
+            with instrument_run("ingest MLB", report, prom, profile=True):
+                t = threading.Thread(target=_fetch_on_worker)
+                t.start()
+                t.join()
+                mlb.get_boxscore(1)
+    finally:
+        http.set_transport(None)
+    data = json.loads(report.read_text())
+    assert data["run"] == "ingest MLB" and data["status"] == "ok"
+    [latency] = data["metrics"]["statline_http_request_seconds"]
+    assert latency["labels"] == {"host": "statsapi.mlb.com", "endpoint": "/api/v1/game/{id}/boxscore"}
+    assert latency["count"] == 2
+    assert data["metrics"]["statline_http_response_bytes_total"][0]["value"] == 2 * len('{"pk": 1}')
+    assert "statline_run_success{run=\"ingest MLB\"} 1" in prom.read_text()
+    import pstats
+    funcs = {f[2] for f in pstats.Stats(str(report.with_suffix(".prof"))).stats}
+    assert "_fetch_on_worker" in funcs  # worker threads are profiled too
+
+
+@pytest.mark.parametrize("per_thread", [True, False])  # False: the 3.12+ single-profiler path
+def test_profiled_pipeline_runs_its_worker_threads(tmp_path, monkeypatch, per_thread):
+    monkeypatch.setattr(metrics, "_PER_THREAD", per_thread)
+    out = []
+    with instrument_run("ingest MLB", tmp_path / "run.json", profile=True):
+        stats = run_pipeline(range(20), lambda i: i * 2, lambda i, r, e: r, out.append, workers=3, queue_size=2)
+    assert out == [i * 2 for i in range(20)] and stats.stages[0].items == 20
+    assert (tmp_path / "run.prof").exists()
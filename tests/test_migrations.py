@@ -0,0 +1,82 @@
+import dataclasses
+import sqlite3
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from statline import shards
+from statline.audit import audit, providing_migrations
+from statline.db import make_engine
+from statline.etl.bulk import ensure_league
+from statline.migrations import MIGRATIONS, migrate, pending
+from statline.models import Base, SchemaMigration
+
+NEW = ("ix_stats_player_game", "ix_prop_lines_player_game_market_fetched", "ix_games_league_ext_status")
+OLD = {"ix_games_ext_id": "games (ext_id)", "ix_player_game_stats_player_id": "player_game_stats (player_id)",
+       "ix_prop_lines_player_id": "prop_lines (player_id)"}
+
+def _downgrade(path, tables=None):
+    # the index layout of a database created before the migrations existed
+    c = sqlite3.connect(path)
+    for name in NEW:
+        c.execute(f"DROP INDEX IF EXISTS {name}")
+    for name, on in OLD.items():
+        if tables is None or on.split()[0] in tables:
+            c.execute(f"CREATE INDEX {name} ON {on}")
+    c.execute("DROP TABLE IF EXISTS schema_migrations")
+    c.commit()
+    c.close()
+
+def _indexes(path):
+    with sqlite3.connect(path) as c:
+        return {r[0] for r in c.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")}
+
+def test_migrate_brings_an_old_database_to_the_model_indexes(tmp_path):
+    old, fresh = tmp_path / "old.sqlite3", tmp_path / "fresh.sqlite3"
+    eng = create_engine(f"sqlite:///{old}")
+    Base.metadata.create_all(eng)
+    _downgrade(old)
+
+    assert [m.version for m in migrate(eng)] == [m.version for m in MIGRATIONS]
+    assert migrate(eng) == []
+    with Session(eng) as s:
+        assert s.scalars(select(SchemaMigration.version)).all() == [m.version for m in MIGRATIONS]
+    # a fresh database records every version and ends up with the same indexes
+    migrate(create_engine(f"sqlite:///{fresh}"))
+    assert _indexes(old) == _indexes(fresh)
+    assert set(NEW) <= _indexes(old) and not set(OLD) & _indexes(old)
+
+def test_audit_flags_queries_until_their_indexes_are_migrated(tmp_path):
+    path = tmp_path / "x.sqlite3"
+    eng = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(eng)
+    _downgrade(path)
+    with eng.connect() as conn:
+        plans = {p.name: p for p in audit(conn)}
+        assert [m.version for m in pending(conn)] == [1, 2]
+    assert plans["etl.bulk.game_states"].flagged
+    assert plans["features.materialized.load_history"].missing == ["ix_stats_player_game"]
+    assert not plans["features.lookup.latest"].flagged
+    assert providing_migrations(list(plans.values()))["ix_games_league_ext_status"] == 1
+
+    migrate(eng)
+    with eng.connect() as conn:
+        plans = audit(conn)
+        assert pending(conn) == []
+    assert not [p.name for p in plans if p.flagged]
+    assert any("ix_stats_player_game" in line for p in plans for line in p.plan)
+
+def test_migrate_builds_indexes_in_attached_shards(tmp_path, monkeypatch):
+    monkeypatch.setattr(shards, "settings", dataclasses.replace(shards.settings, sqlite_shard_dir=str(tmp_path)))
+    eng = make_engine(f"sqlite:///{tmp_path / 'catalog.sqlite3'}")
+    migrate(eng)
+    with Session(eng) as s:
+        league = ensure_league(s, "NBA", "NBA")
+        shards.ensure_shard(s, league.id, 2024)
+    shard = tmp_path / "nba_2024.sqlite3"
+    assert set(NEW) - {"ix_prop_lines_player_game_market_fetched"} <= _indexes(shard)
+    _downgrade(shard, tables=shards.SHARDED_TABLES)
+    _downgrade(tmp_path / "catalog.sqlite3")
+    eng.dispose()  # reconnect so the shard is attached to a fresh connection
+
+    assert len(migrate(eng)) == len(MIGRATIONS)
+    assert {"ix_stats_player_game", "ix_games_league_ext_status"} <= _indexes(shard)
+    assert not set(OLD) & _indexes(shard)
@@ -0,0 +1,31 @@
+import threading, time
+import pytest
+from statline.etl.pipeline import run_pipeline
+
+def test_pipeline_keeps_order_skips_and_reports_stages():
+    def fetch(i):
+        if i == 3: raise ValueError("boom")
+        time.sleep(0.002 * (i % 4))
+        return i * 10
+    parse = lambda i, r, e: None if e is not None else (i, r)
+    out = []
+    stats = run_pipeline(range(40), fetch, parse, out.append, workers=4, queue_size=4)
+    assert out == [(i, i * 10) for i in range(40) if i != 3]
+    assert (stats.stage("fetch").items, stats.stage("parse").items, stats.stage("write").items) == (40, 40, 39)
+    assert stats.stage("write").max_depth <= 4
+    assert "fetch: 40 items" in stats.summary()
+
+def test_pipeline_write_error_stops_upstream_stages():
+    before = threading.active_count()
+    def write(rec):
+        if rec == 5: raise RuntimeError("disk full")
+    with pytest.raises(RuntimeError, match="disk full"):
+        run_pipeline(range(10_000), lambda i: i, lambda i, r, e: r, write, workers=2, queue_size=2)
+    assert threading.active_count() == before
+
+def test_pipeline_parse_error_is_reraised():
+    def parse(i, r, e):
+        if i == 2: raise KeyError("gamePk")
+        return r
+    with pytest.raises(KeyError):
+        run_pipeline(range(5), lambda i: i, parse, lambda rec: None)
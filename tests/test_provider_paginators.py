@@ -1,6 +1,8 @@
 from statline.providers import nba_balldontlie as nba, mlb_statsapi as mlb, nhl_statsapi as nhl
 
 class Dummy:
+    status_code = 200
+    headers = {}
     def __init__(self, data): self._data=data
     def raise_for_status(self): pass
     def json(self): return self._data
@@ -11,19 +13,33 @@ def test_nba_paginate(monkeypatch):
         {"data": [{"id": 2}], "meta": {"total_pages": 2}},
     ]
     calls = {"i": 0}
-    def fake_get(url, params=None):
+    def fake_get(url, params=None, **kwargs):
         i = calls["i"]; calls["i"] += 1
         return Dummy(pages[i])
-    monkeypatch.setattr(nba.requests, "get", fake_get)
+    monkeypatch.setattr(nba._SESSION, "get", fake_get)
     out = list(nba._paginate("games", {}))
     assert [o["id"] for o in out] == [1,2]
 
 def test_mlb_iter_ids(monkeypatch):
     data = {"dates":[{"games":[{"gamePk":111},{"gamePk":222}]}]}
-    monkeypatch.setattr(mlb.requests, "get", lambda *a, **k: Dummy(data))
+    monkeypatch.setattr(mlb._SESSION, "get", lambda *a, **k: Dummy(data))
     assert list(mlb.iter_season_game_ids(2025)) == [111,222]
 
 def test_nhl_iter_ids(monkeypatch):
     data = {"dates":[{"games":[{"gamePk":333},{"gamePk":444}]}]}
-    monkeypatch.setattr(nhl.requests, "get", lambda *a, **k: Dummy(data))
+    monkeypatch.setattr(nhl._SESSION, "get", lambda *a, **k: Dummy(data))
     assert list(nhl.iter_season_game_ids("20242025")) == [333,444]
+
+def test_nba_paginate_cursor(monkeypatch):
+    pages = {
+        None: {"data": [{"id": 1}], "meta": {"next_cursor": 7, "per_page": 100}},
+        7: {"data": [{"id": 2}], "meta": {"next_cursor": None, "per_page": 100}},
+    }
+    seen = []
+    def fake_get(url, params=None, **kwargs):
+        seen.append(dict(params))
+        return Dummy(pages[params.get("cursor")])
+    monkeypatch.setattr(nba._SESSION, "get", fake_get)
+    out = list(nba._paginate("stats", {"seasons[]": 2024}))
+    assert [o["id"] for o in out] == [1, 2]
+    assert seen[1] == {"seasons[]": 2024, "per_page": nba.PER_PAGE, "cursor": 7}
@@ -0,0 +1,34 @@
+from statline.providers.ratelimit import TokenBucket, RateLimiter
+
+class Clock:
+    def __init__(self): self.t = 100.0
+    def __call__(self): return self.t
+
+def test_bucket_paces_requests_at_rate():
+    clock = Clock()
+    b = TokenBucket(rate=2.0, clock=clock)
+    waits = [b.reserve() for _ in range(4)]
+    assert waits == [0.0, 0.5, 1.0, 1.5]
+    assert b.stats()["throttled_s"] == 3.0
+
+def test_bucket_follows_quota_headers_and_backs_off_on_429():
+    clock = Clock()
+    b = TokenBucket(rate=5.0, clock=clock)
+    b.observe(200, {"X-RateLimit-Remaining": "600", "X-RateLimit-Reset": "20"})
+    assert b.rate == 30.0
+    b.observe(429, {"Retry-After": "3"})
+    assert b.rate == 15.0 and b.throttle_events == 1
+    assert b.reserve() == 3.0
+    b.observe(200, {"RateLimit-Remaining": "0", "RateLimit-Reset": "7"})
+    assert b.reserve() >= 7.0
+
+def test_bucket_probes_upward_without_headers():
+    b = TokenBucket(rate=5.0, clock=Clock())
+    for _ in range(10):
+        b.observe(200, {})
+    assert round(b.rate, 6) == 6.0
+
+def test_limiter_keeps_one_bucket_per_host():
+    lim = RateLimiter({"a.example": 3.0}, default_rate=1.0)
+    assert lim.bucket("https://a.example/x") is lim.bucket("https://a.example/y?z=1")
+    assert lim.bucket("https://a.example/x").rate == 3.0 and lim.bucket("https://b.example/").rate == 1.0
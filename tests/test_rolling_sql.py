@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from statline.models import Base
+from statline.etl.bulk import BulkWriter, ensure_league
+from statline.etl.records import GameRecord, PlayerLine, TeamRecord
+from statline.features.rolling import iter_rolling_sql, rolling_sql
+
+def _db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    rng = np.random.default_rng(7)
+    with Session(engine) as s:
+        ids = {}
+        for code, season in (("NBA", 2024), ("MLB", 2024)):
+            league = ensure_league(s, code, code)
+            ids[code] = league.id
+            with BulkWriter(s, league.id, update_features=False) as w:
+                for i in range(60):
+                    rec = GameRecord(f"{code}{i}", season + (i >= 30), datetime(2024, 1, 1) + timedelta(days=i), "Final",
+                                     TeamRecord("h", "H"), TeamRecord("a", "A"))
+                    for p in range(6):
+                        if rng.random() < 0.8:
+                            pts = None if rng.random() < 0.1 else float(rng.integers(0, 40))
+                            rec.lines.append(PlayerLine(f"{code}p{p}", "F", "L", team_ext="h", stats={"pts": pts}))
+                    w.write_game(rec)
+    return engine, ids
+
+def _reference(df, n):
+    df = df.dropna(subset=["pts"]).sort_values(["player_id", "date"]).reset_index(drop=True)
+    df["rolling_pts_avg"] = df.groupby("player_id")["pts"].rolling(n, min_periods=max(1, n // 2)).mean().reset_index(level=0, drop=True)
+    return df
+
+def test_sql_window_matches_pandas_rolling_and_filters():
+    engine, ids = _db()
+    full = rolling_sql("pts", 10, bind=engine)
+    ref = _reference(full[["player_id", "game_id", "date", "pts"]].copy(), 10)
+    np.testing.assert_allclose(full["rolling_pts_avg"], ref["rolling_pts_avg"])
+    assert full["player_id"].dtype == np.int64 and full["date"].dtype.kind == "M"
+
+    nba = rolling_sql("pts", 10, league_id=ids["NBA"], seasons=[2025], bind=engine)
+    # filtered rows still carry windows seeded by earlier games
+    merged = nba.merge(full, on=["player_id", "game_id"], suffixes=("", "_full"))
+    assert len(merged) == len(nba)
+    np.testing.assert_allclose(merged["rolling_pts_avg"], merged["rolling_pts_avg_full"])
+
+    recent = rolling_sql("pts", 5, start=datetime(2024, 2, 20), end=datetime(2024, 2, 25), bind=engine)
+    assert recent["date"].between(pd.Timestamp(2024, 2, 20), pd.Timestamp(2024, 2, 25)).all()
+    # seeded from each player's last values before `start`, not the whole history
+    full5 = rolling_sql("pts", 5, bind=engine)
+    merged = recent.merge(full5, on=["player_id", "game_id"], suffixes=("", "_full"))
+    assert len(merged) == len(recent) > 0
+    np.testing.assert_allclose(merged["rolling_pts_avg"], merged["rolling_pts_avg_full"])
+
+def test_sql_window_streams_in_chunks():
+    engine, _ = _db()
+    chunks = list(iter_rolling_sql("pts", 10, bind=engine, chunk_rows=100))
+    assert all(len(c) <= 100 for c in chunks) and len(chunks) > 1
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), rolling_sql("pts", 10, bind=engine))
@@ -0,0 +1,85 @@
+import dataclasses
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from apscheduler.schedulers.background import BackgroundScheduler
+from statline import jobs, scheduler
+from statline.db import make_engine
+from statline.models import Base
+
+NOW = datetime(2025, 6, 2, 18, 0, tzinfo=timezone.utc)
+
+@pytest.fixture
+def eng(tmp_path, monkeypatch):
+    eng = make_engine(f"sqlite:///{tmp_path / 'jobs.sqlite3'}")
+    Base.metadata.create_all(eng)
+    monkeypatch.setattr(jobs, "get_engine", lambda: eng)
+    # no run report files from the jobs
+    monkeypatch.setattr(scheduler, "settings", dataclasses.replace(scheduler.settings, run_report="", prometheus_file=""))
+    yield eng
+    eng.dispose()
+
+def _service(**kw):
+    return scheduler.Service(["MLB"], scheduler=BackgroundScheduler(timezone=timezone.utc), **kw)
+
+def _sched(pk, start, detailed="Scheduled"):
+    return {"gamePk": pk, "gameDate": start.strftime("%Y-%m-%dT%H:%M:%SZ"), "status": {"detailedState": detailed}}
+
+def test_game_window_spans_todays_games():
+    length = scheduler.GAME_LENGTH["MLB"]
+    scheduled = [_sched(1, NOW - timedelta(days=1)), _sched(2, NOW + timedelta(hours=1)),
+                 _sched(3, NOW + timedelta(hours=5)), _sched(4, NOW + timedelta(hours=2), "Postponed"),
+                 _sched(5, NOW + timedelta(days=2))]
+    start, end = scheduler.game_window(scheduled, length, NOW)
+    assert start == NOW + timedelta(hours=1)
+    assert end == NOW + timedelta(hours=5) + length + scheduler.FINISH_GRACE
+    assert scheduler.game_window([scheduled[0]], length, NOW) is None
+
+def test_lock_is_exclusive_until_released_or_expired(eng):
+    t0 = NOW.replace(tzinfo=None)
+    assert jobs.acquire("MLB", "a", now=t0, bind=eng)
+    assert not jobs.acquire("MLB", "b", now=t0, bind=eng)
+    jobs.release("MLB", "a", bind=eng)
+    assert jobs.acquire("MLB", "b", now=t0, bind=eng)
+    # b died holding it; the lease lapses after its TTL
+    assert not jobs.acquire("MLB", "c", now=t0 + jobs.LOCK_TTL - timedelta(minutes=1), bind=eng)
+    assert jobs.acquire("MLB", "c", now=t0 + jobs.LOCK_TTL + timedelta(minutes=1), bind=eng)
+
+def test_locked_renews_the_lease_while_the_holder_runs_past_its_ttl(eng):
+    ttl = timedelta(seconds=0.5)
+    with jobs.locked("NHL", ttl=ttl, bind=eng) as owner:
+        time.sleep(4 * ttl.total_seconds())
+        assert not jobs.acquire("NHL", "other", ttl, bind=eng)
+        assert jobs.holder("NHL", eng)[0] == owner
+    assert jobs.holder("NHL", eng)[0] is None
+    assert jobs.acquire("NHL", "other", ttl, bind=eng)
+
+def test_plan_persists_window_and_restart_resumes_it(eng, monkeypatch):
+    calls = []
+    monkeypatch.setattr(scheduler, "_schedule", lambda code, a, b: calls.append(code) or [_sched(1, NOW + timedelta(hours=1))])
+    window = _service().plan("MLB", now=NOW)
+    assert window[0] == NOW + timedelta(hours=1) and calls == ["MLB"]
+
+    restarted = _service()
+    restarted.setup(now=NOW + timedelta(hours=2))
+    ids = {job.id for job in restarted.scheduler.get_jobs()}
+    # window restored without reading the schedule again; reconcile never ran, so it runs now
+    assert {"poll:MLB", "plan:MLB", "reconcile:MLB", "reconcile-now:MLB"} == ids
+    assert calls == ["MLB"]
+
+def test_poll_skips_when_locked_and_stops_once_all_final(eng, monkeypatch):
+    monkeypatch.setattr(scheduler, "_poll", lambda code, since, workers: 0)
+    service = _service()
+    last_start = NOW - timedelta(hours=1)
+    end = last_start + scheduler.GAME_LENGTH["MLB"] + scheduler.FINISH_GRACE
+    service._schedule_polls("MLB", last_start - timedelta(hours=3), end, NOW)
+    jobs.save_state("poll:MLB", window_start=last_start.replace(tzinfo=None), window_end=end.replace(tzinfo=None))
+
+    with jobs.locked("MLB"):
+        assert service.poll("MLB", now=NOW) is None
+    assert jobs.load_state("poll:MLB")["last_status"] == "skipped"
+
+    assert service.poll("MLB", now=NOW) == 0
+    state = jobs.load_state("poll:MLB")
+    assert state["last_status"] == "ok" and state["runs"] == 2
+    assert service.scheduler.get_job("poll:MLB") is None
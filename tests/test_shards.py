@@ -0,0 +1,148 @@
+import dataclasses
+import hashlib
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import Session
+from statline import shards
+from statline.db import make_engine, optimize
+from statline.etl.bulk import BulkWriter, ensure_league
+from statline.etl.records import GameRecord, PlayerLine, TeamRecord
+from statline.features.rolling import rolling_sql
+from statline.models import Base, Game, PlayerRollingFeature, Shard
+
+T0 = datetime(2024, 1, 1, 19)
+
+def _ingest(engine, season, days):
+    with Session(engine) as s:
+        league = ensure_league(s, "NBA", "NBA")
+        with BulkWriter(s, league.id) as w:
+            for i in days:
+                rec = GameRecord(f"{season}-{i}", season, T0 + timedelta(days=365 * (season - 2024) + i), "Final",
+                                 TeamRecord("h", "H"), TeamRecord("a", "A"))
+                rec.lines.append(PlayerLine("p", "F", "L", team_ext="h", stats={"pts": 10.0 + i}))
+                w.write_game(rec)
+        return league.id
+
+def _sha(path):
+    return hashlib.sha1(path.read_bytes()).hexdigest()
+
+def _set_shard_dir(monkeypatch, path):
+    monkeypatch.setattr(shards, "settings", dataclasses.replace(shards.settings, sqlite_shard_dir=str(path)))
+
+def test_sharded_writes_stay_in_their_season_file(tmp_path, monkeypatch):
+    plain = create_engine("sqlite://")
+    Base.metadata.create_all(plain)
+    _set_shard_dir(monkeypatch, "")
+    _ingest(plain, 2024, range(6))
+    _ingest(plain, 2025, range(4))
+
+    shard_dir = tmp_path / "shards"
+    _set_shard_dir(monkeypatch, shard_dir)
+    engine = make_engine(f"sqlite:///{tmp_path / 'catalog.sqlite3'}")
+    Base.metadata.create_all(engine)
+    _ingest(engine, 2024, range(6))
+    league_id = _ingest(engine, 2025, range(4))
+
+    assert sorted(p.name for p in shard_dir.glob("*.sqlite3")) == ["nba_2024.sqlite3", "nba_2025.sqlite3"]
+    with engine.connect() as conn:
+        assert conn.scalar(text("SELECT COUNT(*) FROM main.games")) == 0
+        ids = conn.scalars(select(Game.id)).all()
+        assert len(ids) == len(set(ids)) == 10 and min(ids) > shards.SHARD_ID_SPAN
+        # windows run across the season boundary exactly as in a single file
+        sharded = rolling_sql("pts", 5, league_id=league_id, bind=conn)
+        n_features = conn.scalar(select(func.count()).select_from(PlayerRollingFeature))
+    expected = rolling_sql("pts", 5, league_id=league_id, bind=plain)
+    assert sharded["rolling_pts_avg"].fillna(-1).tolist() == expected["rolling_pts_avg"].fillna(-1).tolist()
+    with Session(plain) as s:
+        assert n_features == s.scalar(select(func.count()).select_from(PlayerRollingFeature))
+
+    optimize(engine, full=True)
+    before = _sha(shard_dir / "nba_2024.sqlite3")
+    _ingest(engine, 2025, [4])
+    stats = optimize(engine, full=True)
+    engine.dispose()
+    assert stats["shards"] == 1
+    assert _sha(shard_dir / "nba_2024.sqlite3") == before
+
+def test_split_database_moves_rows_and_keeps_ids(tmp_path, monkeypatch):
+    engine = make_engine(f"sqlite:///{tmp_path / 'statline.sqlite3'}")
+    Base.metadata.create_all(engine)
+    _set_shard_dir(monkeypatch, "")
+    _ingest(engine, 2024, range(3))
+    league_id = _ingest(engine, 2025, range(3))
+    with engine.connect() as conn:
+        games = conn.execute(select(Game.id, Game.ext_id).order_by(Game.id)).all()
+        features = rolling_sql("pts", 3, league_id=league_id, bind=conn)
+    with Session(engine) as s:
+        moved = shards.split_database(s, str(tmp_path / "shards"))
+    assert moved == {"shard_nba_2024": 3, "shard_nba_2025": 3}
+    with engine.connect() as conn:
+        assert conn.scalar(text("SELECT COUNT(*) FROM main.player_game_stats")) == 0
+        assert conn.execute(select(Game.id, Game.ext_id).order_by(Game.id)).all() == games
+        assert rolling_sql("pts", 3, league_id=league_id, bind=conn).equals(features)
+    # later games of a moved season land in its shard
+    _ingest(engine, 2025, [3])
+    with engine.connect() as conn:
+        assert conn.scalar(text("SELECT COUNT(*) FROM shard_nba_2025.games")) == 4
+
+def test_shards_past_the_attach_limit_never_break_checkout(tmp_path, monkeypatch, capsys):
+    shard_dir = tmp_path / "shards"
+    _set_shard_dir(monkeypatch, shard_dir)
+    engine = make_engine(f"sqlite:///{tmp_path / 'catalog.sqlite3'}")
+    Base.metadata.create_all(engine)
+    league_id = _ingest(engine, 2024, range(2))
+    with engine.connect() as conn:
+        limit = shards.attach_limit(conn.connection.dbapi_connection)
+    # a registry filled under a SQLite build with a higher cap
+    shard_dir.mkdir(exist_ok=True)
+    with Session(engine) as s:
+        for i in range(2, limit + 3):
+            path = str(shard_dir / f"nba_{2024 - i}.sqlite3")
+            shards.create_shard_file(path, i * shards.SHARD_ID_SPAN)
+            s.add(Shard(id=i, league_id=league_id, season=2024 - i, name=f"nba_{2024 - i}", path=path))
+        s.commit()
+    engine.dispose()
+
+    with engine.connect() as conn:
+        attached = [r[1] for r in conn.exec_driver_sql("PRAGMA database_list") if r[1].startswith("shard_")]
+        assert len(attached) == limit and "shard_nba_2024" in attached
+        assert conn.scalar(select(func.count()).select_from(Game)) == 2
+    assert "SQLite attaches at most" in capsys.readouterr().out
+    with Session(engine) as s, pytest.raises(RuntimeError, match="merge-shards"):
+        shards.ensure_shard(s, league_id, 2030)
+    # merging frees slots, including for shards that were never attached
+    with Session(engine) as s:
+        assert len(shards.merge_shards(s, keep=2)) == limit
+    engine.dispose()
+    with engine.connect() as conn:
+        attached = [r[1] for r in conn.exec_driver_sql("PRAGMA database_list") if r[1].startswith("shard_")]
+        assert attached == ["shard_nba_2024", "shard_nba_2022"]
+        assert conn.scalar(select(func.count()).select_from(Game)) == 2
+    engine.dispose()
+
+def test_merge_shards_folds_old_seasons_back_into_the_catalog(tmp_path, monkeypatch):
+    shard_dir = tmp_path / "shards"
+    _set_shard_dir(monkeypatch, shard_dir)
+    engine = make_engine(f"sqlite:///{tmp_path / 'catalog.sqlite3'}")
+    Base.metadata.create_all(engine)
+    for season in (2022, 2023, 2024):
+        league_id = _ingest(engine, season, range(3))
+    with engine.connect() as conn:
+        games = conn.execute(select(Game.id, Game.ext_id).order_by(Game.id)).all()
+        features = rolling_sql("pts", 3, league_id=league_id, bind=conn)
+
+    with Session(engine) as s:
+        assert shards.merge_shards(s, keep=2) == {"shard_nba_2022": 3}
+        assert s.scalars(select(Shard.name)).all() == ["nba_2023", "nba_2024"]
+    engine.dispose()
+    assert sorted(p.name for p in shard_dir.glob("*.sqlite3")) == ["nba_2023.sqlite3", "nba_2024.sqlite3"]
+    with engine.connect() as conn:
+        assert conn.scalar(text("SELECT COUNT(*) FROM main.games")) == 3
+        assert conn.execute(select(Game.id, Game.ext_id).order_by(Game.id)).all() == games
+        assert rolling_sql("pts", 3, league_id=league_id, bind=conn).equals(features)
+    # a merged season keeps its games in the catalog
+    _ingest(engine, 2022, [3])
+    with engine.connect() as conn:
+        assert conn.scalar(text("SELECT COUNT(*) FROM main.games")) == 4
+    engine.dispose()
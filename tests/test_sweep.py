@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from statline.backtest.engine import run_backtest
+from statline.backtest.sweep import SweepData, prepare, sweep
+from statline.etl.bulk import BulkWriter, ensure_league
+from statline.etl.records import GameRecord, PlayerLine, TeamRecord
+from statline.models import Base, Game, Player, PropLine
+
+T0 = datetime(2025, 1, 1, 19)
+
+def _db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    rng = np.random.default_rng(3)
+    with Session(engine) as s:
+        league = ensure_league(s, "NBA", "NBA")
+        with BulkWriter(s, league.id, update_features=False) as w:
+            for i in range(15):
+                rec = GameRecord(str(i), 2025, T0 + timedelta(days=i), "Final", TeamRecord("h", "H"), TeamRecord("a", "A"))
+                for p in ("p", "q"):
+                    rec.lines.append(PlayerLine(p, "F", p.upper(), team_ext="h",
+                                                stats={"pts": float(rng.integers(10, 30)), "reb": float(rng.integers(2, 9))}))
+                w.write_game(rec)
+        games = s.execute(select(Game.id, Game.date)).all()
+        for pid in s.scalars(select(Player.id)).all():
+            for gid, when in games[1:]:
+                for market, line in (("points", 19.5), ("rebounds", 5.0)):
+                    s.add(PropLine(league_id=league.id, player_id=pid, game_id=gid, market=market, line=line,
+                                   source="test", fetched_at=when - timedelta(hours=2)))
+        s.commit()
+        return engine, league.id
+
+def test_sweep_matches_run_backtest():
+    engine, league_id = _db()
+    with engine.connect() as conn:
+        data = prepare(league_id, [3, 5], bind=conn)
+        res = sweep(data, [0.0, 1.5], workers=1, min_bets=0)
+        for window, threshold in ((3, 0.0), (5, 1.5)):
+            expected = run_backtest(league_id, window, threshold, bind=conn).summary.set_index("market")
+            got = res[(res["window"] == window) & (res["threshold"] == threshold)].set_index("market")
+            for market in ("points", "rebounds"):
+                for col in ("bets", "wins", "losses", "pushes"):
+                    assert got.loc[market, col] == expected.loc[market, col]
+                np.testing.assert_allclose(got.loc[market, "units"], expected.loc[market, "units"])
+            assert got.loc["ALL", "bets"] == expected["bets"].sum()
+    assert sorted(res["rank"].unique()) == [1, 2, 3, 4]
+
+def test_sweep_process_pool_matches_inline():
+    rng = np.random.default_rng(0)
+    n = 5000
+    data = SweepData(
+        line=rng.integers(0, 30, n).astype(np.float64), actual=rng.integers(0, 30, n).astype(np.float64),
+        market=rng.integers(0, 2, n).astype(np.int16),
+        features=(rng.random((n, 3)) * 30).astype(np.float32), markets=["a", "b"], windows=[3, 5, 10],
+    )
+    data.actual[::7] = np.nan
+    data.features[::11, 0] = np.nan
+    grid = np.round(np.arange(0, 5, 0.1), 2)
+    inline = sweep(data, grid, workers=1)
+    pooled = sweep(data, grid, workers=2)
+    pd.testing.assert_frame_equal(inline, pooled)
+    assert len(inline) == 3 * len(grid) * 3
+    assert inline.loc[inline["market"] == "ALL", "roi"].iloc[0] == inline.loc[inline["market"] == "ALL", "roi"].max()
+
+def test_sweep_splits_windows_into_line_blocks(monkeypatch):
+    from statline.backtest import sweep as sweep_mod
+    rng = np.random.default_rng(1)
+    n = 3000
+    data = SweepData(
+        line=rng.integers(0, 30, n).astype(np.float64), actual=rng.integers(0, 30, n).astype(np.float64),
+        market=rng.integers(0, 2, n).astype(np.int16),
+        features=(rng.random((n, 2)) * 30).astype(np.float32), markets=["a", "b"], windows=[3, 5],
+    )
+    grid = np.round(np.arange(0, 4, 0.25), 2)
+    inline = sweep(data, grid, workers=1)
+    pools = []
+
+    class InlinePool:  # the process pool, minus the processes
+        def __init__(self, max_workers, initializer, initargs):
+            initializer(*initargs)
+            self.max_workers, self.tasks = max_workers, []
+            pools.append(self)
+        def __enter__(self):
+            return self
+        def __exit__(self, *exc):
+            pass
+        def map(self, fn, tasks):
+            self.tasks = [t[:3] for t in tasks]
+            return [fn(t) for t in tasks]
+
+    monkeypatch.setattr(sweep_mod, "ProcessPoolExecutor", InlinePool)
+    monkeypatch.setattr(sweep_mod, "MIN_BLOCK_LINES", 500)
+    blocked = sweep(data, grid, workers=8)
+    pd.testing.assert_frame_equal(inline, blocked)
+    # 8 workers over 2 windows: each window's lines in 4 blocks, all 8 busy
+    assert pools[0].max_workers == 8
+    assert pools[0].tasks == [(wi, lo, hi) for wi in (0, 1) for lo, hi in ((0, 750), (750, 1500), (1500, 2250), (2250, 3000))]
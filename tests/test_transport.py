@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+import requests
+from statline.providers import http, mlb_statsapi as mlb
+from statline.providers.transport import FixtureArchive, Recorder, Replay, StandInServer, fixture_key
+
+MLB = "https://statsapi.mlb.com/api/v1"
+
+
+@pytest.fixture
+def archive(tmp_path):
+    a = FixtureArchive(tmp_path / "fixtures")
+    a.save_json(f"{MLB}/schedule?sportId=1&season=2025", {"dates": [{"games": [{"gamePk": 1}, {"gamePk": 2}]}]})
+    a.save_json(f"{MLB}/game/1/boxscore", {"pk": 1})
+    yield a
+    http.set_transport(None)
+
+
+def test_fixture_key_ignores_scheme_and_param_order():
+    assert fixture_key("https://h/p?b=2&a=1") == fixture_key("http://h/p?a=1&b=2") == "h/p?a=1&b=2"
+
+
+def test_replay_serves_recorded_responses(archive):
+    with StandInServer(archive) as server:
+        http.set_transport(Replay(server.url))
+        assert list(mlb.iter_season_game_ids(2025)) == [1, 2]
+        assert mlb.get_boxscore(1) == {"pk": 1}
+        with pytest.raises(requests.HTTPError):
+            mlb.get_boxscore(2)  # never recorded -> 404
+        assert server.stats() == {"requests": 3, "served": 2, "injected": 0, "missing": 1}
+
+
+def test_injected_errors_are_retried(archive, monkeypatch):
+    monkeypatch.setattr(http, "RETRY_BACKOFF", 0)
+    with StandInServer(archive, error_rate=0.5, seed=3) as server:
+        http.set_transport(Replay(server.url))
+        for _ in range(10):
+            assert mlb.get_boxscore(1) == {"pk": 1}
+        stats = server.stats()
+    assert stats["served"] == 10 and stats["injected"] > 0
+    assert stats["requests"] == stats["served"] + stats["injected"]
+
+
+def test_recorder_archives_responses(archive, tmp_path):
+    recorded = FixtureArchive(tmp_path / "recorded")
+    with StandInServer(archive) as server:
+        session = http.build_session("test")
+        http.set_transport(Recorder(recorded))
+        url = f"{server.url}/statsapi.mlb.com/api/v1/game/1/boxscore"
+        assert http.get_json(session, url) == {"pk": 1}
+    fixture = recorded.load(url)
+    assert fixture.status == 200 and fixture.body == '{"pk": 1}'
+    assert fixture.headers["Content-Type"] == "application/json"
+
+
+def test_async_client_replays(archive):
+    pytest.importorskip("httpx")
+    from statline.providers.aio import AsyncClient
+
+    async def run():
+        async with AsyncClient() as client:
+            return [pk async for pk in mlb.aiter_season_game_ids(client, 2025)], await mlb.aget_boxscore(client, 1)
+
+    with StandInServer(archive) as server:
+        http.set_transport(Replay(server.url))
+        assert asyncio.run(run()) == ([1, 2], {"pk": 1})